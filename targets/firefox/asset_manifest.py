@@ -0,0 +1,244 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import ast
+import logging
+import os
+import threading
+import time
+
+from moziris.api.errors import APIHelperError
+from moziris.api.finder import pattern as pattern_module
+from moziris.util.path_manager import PathManager
+from targets.firefox.pattern_bundle import pattern_bundle
+
+logger = logging.getLogger(__name__)
+
+# Packages whose class constants are Patterns used by the tests.
+UI_PACKAGES = [
+    os.path.join("targets", "firefox", "firefox_ui"),
+    os.path.join("targets", "firefox", "local_web"),
+]
+# Number of test modules the prefetcher decodes ahead of the running one.
+PREFETCH_AHEAD = 2
+
+
+def build_ui_index() -> dict:
+    """Maps the Pattern constants of the Firefox UI modules to the images they reference.
+
+    :return: Dictionary of dotted name (Ex NavBar.BACK_BUTTON or DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL) to a
+    list of (module file, image name) pairs.
+    """
+    module_dir = PathManager.get_module_dir()
+    index = {}
+    for package in UI_PACKAGES:
+        for root, _, files in os.walk(os.path.join(module_dir, package)):
+            for file_name in files:
+                if not file_name.endswith(".py"):
+                    continue
+                module_file = os.path.join(root, file_name)
+                tree = _parse(module_file)
+                if tree is not None:
+                    _index_body(tree.body, "", module_file, index)
+    return index
+
+
+def get_test_assets(test_file: str, ui_index: dict) -> list:
+    """Lists the images a test module references, directly or through the Firefox UI class constants it uses.
+
+    :param test_file: Path to the test module.
+    :param ui_index: Index built by build_ui_index.
+    :return: List of (module file, image name) pairs, the module file being the one that creates the Pattern.
+    """
+    tree = _parse(test_file)
+    if tree is None:
+        return []
+
+    assets = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            image = _get_pattern_image(node)
+            if image is not None:
+                assets.append((test_file, image))
+        elif isinstance(node, (ast.Attribute, ast.Name)):
+            name = _get_dotted_name(node)
+            if name in ui_index:
+                assets.extend(ui_index[name])
+    return list(dict.fromkeys(assets))
+
+
+class AssetPrefetcher:
+    """Decodes the images of the collected tests on a background thread, in the order the tests will run.
+
+    The images of each test module are found with the static index of this module and handed to the pattern
+    bundle, so the Patterns of a test find their image decoded when they are first used. Images of tests that were
+    not collected are never loaded. The thread stays at most PREFETCH_AHEAD test modules ahead of the running one,
+    and the images a test module did not use are discarded when its tests are done, so the decoded images held in
+    memory stay bounded.
+    """
+
+    def __init__(self):
+        self.prefetched = 0
+        self.discarded = 0
+        self._thread = None
+        self._stopped = threading.Event()
+        self._condition = threading.Condition()
+        self._test_files = []
+        self._current = 0
+        self._paths = {}
+
+    def start(self, items: list):
+        test_files = list(dict.fromkeys(str(item.fspath) for item in items))
+        if len(test_files) == 0:
+            return
+        self._stopped.clear()
+        self._test_files = test_files
+        self._current = 0
+        self._paths = {}
+        self._thread = threading.Thread(
+            target=self._run, name="AssetPrefetcher", daemon=True
+        )
+        self._thread.start()
+
+    def advance(self, test_file: str):
+        """Tells the prefetcher which test module is running, before its tests start.
+
+        The images left from the test modules that are done are discarded, unless a later module also uses them.
+
+        :param test_file: Path to the test module.
+        :return: None.
+        """
+        with self._condition:
+            if test_file not in self._test_files:
+                return
+            index = self._test_files.index(test_file)
+            if index <= self._current:
+                return
+            self._current = index
+            done = [f for f in self._test_files[:index] if f in self._paths]
+            kept = set()
+            for f in self._test_files[index:]:
+                kept.update(self._paths.get(f, []))
+            for f in done:
+                self._discard(set(self._paths.pop(f)) - kept)
+            self._condition.notify_all()
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+        with self._condition:
+            for paths in self._paths.values():
+                self._discard(paths)
+            self._paths = {}
+        if self.discarded > 0:
+            logger.debug("Discarded %s unused prefetched image(s)." % self.discarded)
+
+    def _discard(self, paths):
+        for path in paths:
+            if pattern_bundle.discard(path):
+                self.discarded += 1
+
+    def _run(self):
+        start_time = time.time()
+        ui_index = build_ui_index()
+        image_paths = {}
+        for index, test_file in enumerate(self._test_files):
+            with self._condition:
+                while (
+                    index > self._current + PREFETCH_AHEAD
+                    and not self._stopped.is_set()
+                ):
+                    self._condition.wait()
+                if index < self._current:
+                    # The module is already done.
+                    continue
+            paths = []
+            for module_file, image in get_test_assets(test_file, ui_index):
+                if self._stopped.is_set():
+                    return
+                if (module_file, image) not in image_paths:
+                    try:
+                        image_paths[(module_file, image)] = (
+                            pattern_module._get_image_path(module_file, image)
+                        )
+                    except APIHelperError:
+                        image_paths[(module_file, image)] = None
+                path = image_paths[(module_file, image)]
+                if path is not None and pattern_bundle.preload(path):
+                    self.prefetched += 1
+                    paths.append(path)
+            with self._condition:
+                if index >= self._current:
+                    self._paths[test_file] = paths
+                else:
+                    self._discard(paths)
+        logger.debug(
+            "Prefetched %s image(s) for %s test file(s) in %.1fs."
+            % (self.prefetched, len(self._test_files), time.time() - start_time)
+        )
+
+
+def _parse(module_file):
+    try:
+        with open(module_file, "r", encoding="utf-8") as f:
+            return ast.parse(f.read(), module_file)
+    except (IOError, SyntaxError, ValueError) as e:
+        logger.debug("Unable to index %s: %s" % (module_file, e))
+        return None
+
+
+def _index_body(body, prefix, module_file, index):
+    for node in body:
+        if isinstance(node, ast.ClassDef):
+            _index_body(node.body, prefix + node.name + ".", module_file, index)
+        elif isinstance(node, ast.Assign):
+            image = _get_pattern_image(node.value)
+            if image is None:
+                continue
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    index.setdefault(prefix + target.id, []).append(
+                        (module_file, image)
+                    )
+
+
+def _get_pattern_image(node):
+    """Returns the image name of a Pattern("...") call, also when followed by calls such as similar()."""
+    while isinstance(node, ast.Call):
+        if (
+            isinstance(node.func, ast.Name)
+            and node.func.id == "Pattern"
+            and len(node.args) > 0
+        ):
+            return _get_string(node.args[0])
+        if not isinstance(node.func, ast.Attribute):
+            return None
+        node = node.func.value
+    return None
+
+
+def _get_string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Str):
+        return node.s
+    return None
+
+
+def _get_dotted_name(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+asset_prefetcher = AssetPrefetcher()
@@ -3,13 +3,23 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import json
 import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import bugzilla
-from github import Github
+import requests
 
-from moziris.configuration.config_parser import get_config_property, validate_section
+from moziris.configuration.config_parser import (
+    get_config_property,
+    get_config_section,
+    validate_section,
+)
 from moziris.api.os_helpers import OSHelper
+from moziris.util.path_manager import PathManager
 from targets.firefox.errors import BugManagerError
 
 logger = logging.getLogger(__name__)
@@ -21,61 +31,311 @@ bugzilla_os = {
     "osx": "macOS",
 }
 
+BLOCKERS_FILE = "blockers.json"
+BLOCKER_CACHE_TTL = 6 * 60 * 60
+# Seconds an id the tracker did not return (unknown or private bug) is remembered as unknown.
+MISSING_BLOCKER_TTL = 60 * 60
+REQUEST_TIMEOUT = 30
+DEFAULT_GITHUB_URL = "https://api.github.com/"
+DEFAULT_GITHUB_REPO_NAME = "iris2"
 
-def get_github_issue(bug_id):
-    """Get Github issues details."""
-    if len(validate_section("GitHub")) > 0:
-        return None
 
-    github_api_key = Github(get_config_property("GitHub", "github_key"))
+class BlockerCache:
+    """Bug and issue states used to decide which tests are blocked.
 
-    try:
-        repo = [x for x in github_api_key.get_user().get_repos() if x.name == "iris2"]
-        return repo[0].get_issue(bug_id)
-    except Exception:
-        return None
+    All 'blocked_by' ids of a session are resolved at once: Bugzilla bugs with a single REST query, GitHub issues with
+    a single GraphQL query, both trackers concurrently. States are kept in 'cache/blockers.json' in the working
+    directory for ttl seconds. Ids the tracker does not return are cached as unknown for missing_ttl seconds, and ids
+    whose query failed are not queried again in the same session. In offline mode only the cache is used, whatever
+    the age of its entries.
 
+    GitHub issues are looked up in the key owner's iris2 repository, unless the GitHub section of config.ini has a
+    'github_repo' property (Ex. mozilla/iris2). The 'github_url' property points to the API server.
+    """
 
-def get_bugzilla_bug(bug_id):
-    """Get Bugzilla bug details."""
-    if len(validate_section("Bugzilla")) > 0:
-        return None
+    def __init__(
+        self, ttl: int = BLOCKER_CACHE_TTL, missing_ttl: int = MISSING_BLOCKER_TTL
+    ):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.offline = False
+        self.bugzilla_url = None
+        self.github_url = None
+        self.cache_file = None
+        self._entries = None
+        self._failed = set()
+        self._lock = threading.Lock()
 
-    bugzilla_api_key = get_config_property("Bugzilla", "api_key")
-    base_url = get_config_property("Bugzilla", "bugzilla_url")
+    def resolve(self, bug_ids):
+        """Fetches the state of every bug or issue that is not cached or whose cache entry expired.
 
-    try:
-        b = bugzilla.Bugzilla(url=base_url, api_key=bugzilla_api_key)
-        return b.get_bug(bug_id)
-    except Exception:
-        return None
+        :param bug_ids: Bugzilla bug ids and GitHub issue ids (Ex. 1512345, issue_42).
+        :return: None.
+        """
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            missing = sorted(
+                {
+                    str(bug_id)
+                    for bug_id in bug_ids
+                    if bug_id
+                    and str(bug_id) not in self._failed
+                    and self._is_expired(entries.get(str(bug_id)), now)
+                }
+            )
+        if len(missing) == 0 or self.offline:
+            return
+
+        issues = [bug_id for bug_id in missing if "issue_" in bug_id]
+        bugs = [bug_id for bug_id in missing if "issue_" not in bug_id]
+        logger.debug(
+            "Resolving %s Bugzilla bug(s) and %s GitHub issue(s)."
+            % (len(bugs), len(issues))
+        )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            jobs = [
+                (bugs, executor.submit(self._fetch_bugzilla_bugs, bugs)),
+                (issues, executor.submit(self._fetch_github_issues, issues)),
+            ]
+            states = {}
+            fetched = []
+            failed = []
+            for ids, job in jobs:
+                try:
+                    result = job.result()
+                except (BugManagerError, requests.RequestException, ValueError) as e:
+                    logger.warning("Unable to resolve blocking issues: %s" % e)
+                    result = None
+                if result is None:
+                    failed.extend(ids)
+                else:
+                    states.update(result)
+                    fetched.extend(ids)
+
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            for bug_id in fetched:
+                entries[bug_id] = {"fetched": now, "state": states.get(bug_id)}
+            self._failed.update(failed)
+            self._save()
+
+    def get(self, bug_id) -> dict or None:
+        """Returns the cached state of a bug or issue, resolving it first if needed."""
+        bug_id = str(bug_id)
+        with self._lock:
+            entry = self._load().get(bug_id)
+            skip = self.offline or bug_id in self._failed
+        if not skip and self._is_expired(entry, time.time()):
+            self.resolve([bug_id])
+            with self._lock:
+                entry = self._load().get(bug_id)
+        return None if entry is None else entry.get("state")
+
+    def _is_expired(self, entry, now) -> bool:
+        if entry is None:
+            return True
+        ttl = self.ttl if entry.get("state") is not None else self.missing_ttl
+        return now - entry.get("fetched", 0) > ttl
+
+    def _fetch_bugzilla_bugs(self, bug_ids):
+        """Returns the states of the bugs Bugzilla knows, or None if Bugzilla is not configured."""
+        if len(bug_ids) == 0:
+            return {}
+        if self.bugzilla_url is None and len(validate_section("Bugzilla")) > 0:
+            return None
+
+        base_url = self.bugzilla_url or get_config_property("Bugzilla", "bugzilla_url")
+        response = requests.get(
+            "%s/bug" % base_url.rstrip("/"),
+            params={
+                "id": ",".join(bug_ids),
+                "include_fields": "id,status,op_sys,platform",
+            },
+            headers={
+                "X-BUGZILLA-API-KEY": get_config_property("Bugzilla", "api_key") or ""
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not response.ok:
+            raise BugManagerError(
+                "Bugzilla query failed with status %s" % response.status_code
+            )
+
+        states = {}
+        for bug in response.json().get("bugs", []):
+            states[str(bug.get("id"))] = {
+                "status": bug.get("status"),
+                "op_sys": bug.get("op_sys"),
+                "platform": bug.get("platform"),
+            }
+        return states
+
+    def _fetch_github_issues(self, issue_ids):
+        """Returns the states of the issues GitHub knows, or None if GitHub is not configured."""
+        if len(issue_ids) == 0:
+            return {}
+        if self.github_url is None and len(validate_section("GitHub")) > 0:
+            return None
+
+        numbers = {}
+        for issue_id in issue_ids:
+            match = re.search(r"(\d+)$", issue_id)
+            if match is None:
+                logger.warning("Invalid GitHub issue id: %s" % issue_id)
+                continue
+            numbers[issue_id] = int(match.group(1))
+        if len(numbers) == 0:
+            return {}
+
+        fields = " ".join(
+            "i%s: issue(number: %s) { state title }" % (number, number)
+            for number in sorted(set(numbers.values()))
+        )
+        repo = _get_github_repo()
+        if repo is None:
+            query = '{ viewer { repository(name: "%s") { %s } } }' % (
+                DEFAULT_GITHUB_REPO_NAME,
+                fields,
+            )
+        else:
+            owner, name = repo.split("/")
+            query = '{ repository(owner: "%s", name: "%s") { %s } }' % (
+                owner,
+                name,
+                fields,
+            )
+
+        base_url = self.github_url or _get_github_url()
+        response = requests.post(
+            "%s/graphql" % base_url.rstrip("/"),
+            json={"query": query},
+            headers={
+                "Authorization": "bearer %s"
+                % (get_config_property("GitHub", "github_key") or "")
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not response.ok:
+            raise BugManagerError(
+                "GitHub query failed with status %s" % response.status_code
+            )
+
+        data = response.json().get("data") or {}
+        repository = (data.get("viewer") or data).get("repository") or {}
+        states = {}
+        for issue_id, number in numbers.items():
+            issue = repository.get("i%s" % number)
+            if issue is not None:
+                states[issue_id] = {
+                    "state": str(issue.get("state")).lower(),
+                    "title": issue.get("title"),
+                }
+        return states
+
+    def _get_cache_file(self):
+        if self.cache_file is not None:
+            return self.cache_file
+        return os.path.join(PathManager.get_working_dir(), "cache", BLOCKERS_FILE)
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            cache_file = self._get_cache_file()
+            if os.path.exists(cache_file):
+                try:
+                    with open(cache_file, "r") as f:
+                        self._entries = json.load(f)
+                except (IOError, ValueError) as e:
+                    logger.debug("Ignoring unreadable blocker cache: %s" % e)
+        return self._entries
+
+    def _save(self):
+        cache_file = self._get_cache_file()
+        temp_file = "%s.%s.tmp" % (cache_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temp_file, "w") as f:
+                json.dump(self._entries, f, sort_keys=True, indent=True)
+            os.replace(temp_file, cache_file)
+        except (IOError, OSError) as e:
+            logger.debug("Unable to save blocker cache: %s" % e)
+
+
+def _get_github_url():
+    section = get_config_section("GitHub") or {}
+    return section.get("github_url") or DEFAULT_GITHUB_URL
+
+
+def _get_github_repo():
+    """Returns the 'owner/name' of the GitHub repository holding the issues, None to use the key owner's iris2."""
+    section = get_config_section("GitHub") or {}
+    repo = section.get("github_repo")
+    if repo and "/" in repo:
+        return repo.strip()
+    return None
+
+
+def get_blocked_by_ids(items):
+    """Returns the 'blocked_by' ids of a list of collected test items."""
+    bug_ids = set()
+    for item in items:
+        if not item.own_markers:
+            continue
+        bug_id, platform = get_blocked_by(item.own_markers[0].kwargs)
+        if bug_id:
+            bug_ids.add(bug_id)
+    return bug_ids
+
+
+def get_blocked_by(values: dict) -> tuple:
+    """Returns the bug id and platform list of a test 'blocked_by' marker."""
+    bug_id = ""
+    platform = OSHelper.get_os()
+    blocked_by = values.get("blocked_by")
+    if type(blocked_by) is str:
+        bug_id = blocked_by
+    elif type(blocked_by) is dict:
+        try:
+            bug_id = blocked_by["id"]
+            platform = blocked_by["platform"]
+        except KeyError as e:
+            logger.debug("Missing key in blocked_by field: %s" % e)
+    return bug_id, platform
+
+
+def resolve_blockers(bug_ids):
+    """Resolves the state of many bugs and issues at once, see BlockerCache."""
+    blocker_cache.resolve(bug_ids)
 
 
 def is_blocked(bug_id):
     """Checks if a Github issue/Bugzilla bug is blocked or not."""
     try:
+        bug = blocker_cache.get(bug_id)
+        if bug is None:
+            return True
         if "issue_" in bug_id:
-            bug = get_github_issue(bug_id)
-            if bug is None:
-                return True
-            if bug.state == "closed":
+            if bug.get("state") == "closed":
                 return False
             else:
-                if OSHelper.get_os() in bug.title:
+                if OSHelper.get_os() in bug.get("title", ""):
                     return True
                 return False
         else:
-            bug = get_bugzilla_bug(bug_id)
-            if bug is None:
-                return True
-            if bug.status in ["CLOSED", "RESOLVED"]:
+            if bug.get("status") in ["CLOSED", "RESOLVED"]:
                 return False
             else:
-                if bugzilla_os[
-                    OSHelper.get_os().value
-                ] == bug.op_sys or bug.platform in ["All", "Unspecified"]:
+                if bugzilla_os[OSHelper.get_os().value] == bug.get("op_sys") or bug.get(
+                    "platform"
+                ) in ["All", "Unspecified"]:
                     return True
                 return False
     except BugManagerError as e:
         logger.error(str(e))
         return True
+
+
+blocker_cache = BlockerCache()
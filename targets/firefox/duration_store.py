@@ -0,0 +1,155 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+DURATIONS_FILE = "durations.db"
+HISTORY_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    outcome TEXT,
+    duration REAL,
+    launch REAL,
+    teardown REAL,
+    firefox TEXT,
+    platform TEXT,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS test_runs_node_id ON test_runs (node_id);
+"""
+
+
+class DurationStore:
+    """SQLite history of how long each test took.
+
+    One row is written per attempt, so retries are kept apart. 'duration' is the wall time of the test call, which
+    includes the browser launch, and 'launch' and 'teardown' hold the time spent starting and closing the browser.
+    The database lives in the 'data' folder of the working directory unless another path is given, which lets
+    parallel workers write to the store of their coordinator.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._connection = None
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def get_path(self):
+        if self.path is None:
+            self.path = os.path.join(
+                PathManager.get_working_dir(), "data", DURATIONS_FILE
+            )
+        return self.path
+
+    def record(
+        self,
+        node_id: str,
+        outcome: str,
+        duration: float,
+        launch: float = None,
+        teardown: float = None,
+        firefox: str = None,
+        platform: str = None,
+    ):
+        """Stores the timing of one test attempt.
+
+        :param node_id: pytest node id of the test.
+        :param outcome: PASSED, FAILED or ERROR.
+        :param duration: Wall time of the test call in seconds.
+        :param launch: Seconds spent launching the browser.
+        :param teardown: Seconds spent closing the browser.
+        :param firefox: Firefox version under test.
+        :param platform: Operating system.
+        :return: None.
+        """
+        with self._lock:
+            attempt = self._attempts.get(node_id, 0) + 1
+            self._attempts[node_id] = attempt
+            try:
+                connection = self._connect()
+                with connection:
+                    connection.execute(
+                        "INSERT INTO test_runs (run_id, node_id, attempt, outcome, duration, launch, teardown, "
+                        "firefox, platform, recorded) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            PathManager.get_run_id(),
+                            node_id,
+                            attempt,
+                            outcome,
+                            duration,
+                            launch,
+                            teardown,
+                            firefox,
+                            platform,
+                            time.time(),
+                        ),
+                    )
+            except sqlite3.Error as e:
+                logger.debug("Unable to record test duration: %s" % e)
+
+    def get_estimates(self) -> dict:
+        """Returns the expected wall time of each known test, retries and teardown included.
+
+        :return: Dictionary of node id to average seconds per run.
+        """
+        with self._lock:
+            try:
+                rows = (
+                    self._connect()
+                    .execute(
+                        "SELECT node_id, AVG(total) FROM ("
+                        "SELECT node_id, run_id, SUM(COALESCE(duration, 0) + COALESCE(teardown, 0)) AS total "
+                        "FROM test_runs WHERE recorded > ? GROUP BY node_id, run_id"
+                        ") GROUP BY node_id",
+                        (time.time() - HISTORY_DAYS * 24 * 60 * 60,),
+                    )
+                    .fetchall()
+                )
+            except sqlite3.Error as e:
+                logger.debug("Unable to read test durations: %s" % e)
+                return {}
+        return {node_id: total for node_id, total in rows}
+
+    def close(self):
+        """Drops rows older than the history window and closes the database."""
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM test_runs WHERE recorded < ?",
+                        (time.time() - HISTORY_DAYS * 24 * 60 * 60,),
+                    )
+                self._connection.close()
+            except sqlite3.Error as e:
+                logger.debug("Unable to close test duration store: %s" % e)
+            self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            path = self.get_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(
+                path, timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+
+duration_store = DurationStore()
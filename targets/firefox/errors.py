@@ -17,3 +17,11 @@ class BugManagerError(Exception):
     def __init__(self, message):
         """Create an exception instance."""
         Exception.__init__(self, message)
+
+
+class BuildStoreError(Exception):
+    """Exception raised when a Firefox build can't be provided by the build store."""
+
+    def __init__(self, message):
+        """Create an exception instance."""
+        Exception.__init__(self, message)
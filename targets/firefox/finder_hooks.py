@@ -0,0 +1,51 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+from importlib import import_module
+
+logger = logging.getLogger(__name__)
+
+# Modules of the moziris finder holding their own reference to match_template.
+FINDER_MODULES = ["moziris.api.finder.image_search", "moziris.api.finder.finder"]
+
+# Wrappers of match_template, innermost first. A search made by the finder goes through them from last to first:
+# location_hints tries the region of the last match of a pattern, frame_cache answers from the captures and
+# locations it keeps for that region, and window_bounds limits the searches without a region to the Firefox
+# windows, so the captures and locations of the other wrappers are bounded too.
+MATCH_TEMPLATE_LAYERS = ["window_bounds", "frame_cache", "location_hints"]
+
+_original_match_template = None
+_wrappers = {}
+
+
+def wrap_match_template(layer: str, wrapper):
+    """Installs a wrapper of the moziris match_template at its place in MATCH_TEMPLATE_LAYERS.
+
+    The chain of wrappers is rebuilt from the original match_template every time, so the wrappers compose in the
+    same order whatever the order they are installed in.
+
+    :param layer: Name of the wrapper, one of MATCH_TEMPLATE_LAYERS.
+    :param wrapper: Function that takes the match_template to wrap and returns its replacement.
+    :return: None.
+    """
+    global _original_match_template
+    if layer not in MATCH_TEMPLATE_LAYERS:
+        raise ValueError("Unknown match_template layer: %s" % layer)
+    if _original_match_template is None:
+        _original_match_template = import_module(FINDER_MODULES[0]).match_template
+
+    _wrappers[layer] = wrapper
+    match_template = _original_match_template
+    for name in MATCH_TEMPLATE_LAYERS:
+        if name in _wrappers:
+            match_template = _wrappers[name](match_template)
+    for module_name in FINDER_MODULES:
+        import_module(module_name).match_template = match_template
+    logger.debug(
+        "match_template wrapped by %s"
+        % ", ".join(
+            name for name in reversed(MATCH_TEMPLATE_LAYERS) if name in _wrappers
+        )
+    )
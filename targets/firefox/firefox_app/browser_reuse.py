@@ -0,0 +1,298 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+import time
+
+import psutil
+
+from moziris.api.keyboard.key import Key
+from moziris.api.keyboard.keyboard import type
+from moziris.api.keyboard.keyboard_api import paste
+from moziris.api.os_helpers import OSHelper
+from targets.firefox.firefox_app.fx_browser import (
+    FXRunner,
+    FirefoxProfile,
+    Profiles,
+    kill_proc_tree,
+)
+from targets.firefox.firefox_app.launch_beacon import launch_beacon
+from targets.firefox.firefox_app.profile_cache import profile_templates
+from targets.firefox.firefox_app.profile_reaper import profile_reaper
+from targets.firefox.firefox_ui.helpers.keyboard_shortcuts import (
+    maximize_window,
+    open_browser_console,
+)
+from targets.firefox.settings import FirefoxSettings
+
+logger = logging.getLogger(__name__)
+
+RESET_TIMEOUT = 10
+CONSOLE_OPEN_DELAY = 2
+
+# Preferences added to the profile of reusable tests, so the reset script can run from the Browser Console.
+REUSE_PREFERENCES = {
+    "devtools.chrome.enabled": True,
+    "devtools.selfxss.count": 5,
+    "browser.tabs.warnOnCloseOtherTabs": False,
+}
+
+# Runs in the Browser Console with chrome privileges. It closes every window except the main browser window, replaces
+# all tabs with the start page, clears the history and site specific zoom levels and restores the default toolbar
+# layout when the staged profile ships with it. The start page sends the launch beacon once it has rendered.
+RESET_SCRIPT = " ".join(line.strip() for line in """
+(function () {
+    const url = %(url)s;
+    const main = Services.wm.getMostRecentWindow("navigator:browser");
+    const windows = Services.wm.getEnumerator(null);
+    const consoles = [];
+    while (windows.hasMoreElements()) {
+        const w = windows.getNext();
+        const type = w.document.documentElement.getAttribute("windowtype");
+        if (w === main) { continue; }
+        if (type === "devtools:webconsole") { consoles.push(w); } else { w.close(); }
+    }
+    const gBrowser = main.gBrowser;
+    for (const tab of Array.from(gBrowser.tabs)) { if (tab.pinned) { gBrowser.unpinTab(tab); } }
+    const principal = Services.scriptSecurityManager.getSystemPrincipal();
+    const tab = gBrowser.addTab(url, {triggeringPrincipal: principal});
+    gBrowser.selectedTab = tab;
+    gBrowser.removeAllTabsBut(tab);
+    main.PlacesUtils.history.clear();
+    Services.contentPrefs2.removeByName("browser.content.full-zoom", null);
+    if (%(reset_toolbar)s && !main.CustomizableUI.inDefaultState) { main.CustomizableUI.reset(); }
+    main.setTimeout(function () { consoles.forEach(function (w) { w.close(); }); main.focus(); }, 0);
+})();
+""".strip().splitlines())
+
+
+class BrowserReuse:
+    """Keeps one Firefox process alive across consecutive compatible tests.
+
+    Tests opt in with the 'reuse_browser=True' marker. Two tests are compatible when they run the same Firefox build
+    with the same 'profile' and 'preferences' markers. When a test passes and the next collected item is compatible,
+    teardown keeps the browser running and the next test starts with a reset instead of a launch. A failed test, an
+    exited process or a reset that doesn't bring back the start page all fall back to a fresh profile and launch.
+    """
+
+    def __init__(self):
+        self._runner = None
+        self._key = None
+        self.keep_profiles = False
+        self.reused = 0
+        self.fallbacks = 0
+
+    def acquire(self, item, app):
+        """Returns the browser kept alive for a compatible test, or None.
+
+        :param item: The pytest item that is about to run.
+        :param app: The Firefox application the test runs with.
+        :return: The FXRunner of the previous test, or None if a new browser must be launched.
+        """
+        runner, key = self._runner, self._key
+        self._runner = self._key = None
+        if runner is None:
+            return None
+
+        if key != get_reuse_key(item, app) or not _is_running(runner):
+            self._discard(runner)
+            return None
+        return runner
+
+    def keep(self, item, runner, passed: bool) -> bool:
+        """Decides at teardown if the browser of a test stays open for the next one.
+
+        :param item: The pytest item that just ran.
+        :param runner: The FXRunner of the test.
+        :param passed: True if the test passed.
+        :return: True if the browser was kept, in which case it must not be closed.
+        """
+        key = get_reuse_key(item, runner.application)
+        next_item = _get_next_item(item)
+        if (
+            not passed
+            or key is None
+            or next_item is None
+            or get_reuse_key(next_item, runner.application) != key
+            or not _is_running(runner)
+        ):
+            return False
+
+        self._runner, self._key = runner, key
+        return True
+
+    def start(self, item, runner):
+        """Starts the browser of a test, resetting a reused browser instead of launching it."""
+        if not getattr(runner, "reused", False):
+            runner.start()
+            return
+
+        runner.reused = False
+        if self.reset(item, runner):
+            self.reused += 1
+            return
+
+        logger.warning("Browser reset failed, launching a fresh browser.")
+        self.fallbacks += 1
+        self._discard(runner)
+        values = item.own_markers[0].kwargs
+        runner.profile = FirefoxProfile.make_profile(
+            values.get("profile"), get_profile_preferences(values)
+        )
+        runner.start()
+
+    def reset(self, item, runner) -> bool:
+        """Brings a running browser back to the state of a fresh launch on the test's start page."""
+        token = launch_beacon.expect()
+        if token is None:
+            return False
+
+        url = "%s%s%s" % (
+            runner.start_page,
+            "&" if "?" in runner.start_page else "?",
+            launch_beacon.get_query(token),
+        )
+        profile_type = item.own_markers[0].kwargs.get("profile")
+        script = RESET_SCRIPT % {
+            "url": json.dumps(url),
+            "reset_toolbar": "true" if _has_default_layout(profile_type) else "false",
+        }
+
+        try:
+            type(Key.ESC)
+            type(Key.ESC)
+            open_browser_console()
+            time.sleep(CONSOLE_OPEN_DELAY)
+            paste(script)
+            type(Key.ENTER)
+        except Exception as e:
+            logger.debug("Unable to send the reset script: %s" % e)
+            return False
+
+        if not launch_beacon.wait(token, RESET_TIMEOUT):
+            return False
+        maximize_window()
+        return True
+
+    def close(self):
+        """Closes the browser kept for a test that never ran."""
+        runner = self._runner
+        self._runner = self._key = None
+        if runner is not None:
+            self._discard(runner)
+        if self.reused or self.fallbacks:
+            logger.info(
+                "Browser reuse: %s reset(s), %s fresh launch fallback(s)."
+                % (self.reused, self.fallbacks)
+            )
+
+    def _discard(self, runner):
+        process_id = _get_process_id(runner)
+        _kill(runner)
+        profile_path = None if self.keep_profiles else runner.profile.profile
+        profile_reaper.reap(profile_path, process_id)
+
+
+def get_reuse_key(item, app):
+    """Returns the key shared by tests that can run in the same browser, or None if the test can't reuse one."""
+    group = get_reuse_group(item)
+    return None if group is None else (app.path,) + group
+
+
+def get_reuse_group(item):
+    """Returns the 'profile' and 'preferences' markers of a reusable test, or None if the test can't reuse a browser."""
+    if not item.own_markers:
+        return None
+    values = item.own_markers[0].kwargs
+    if not values.get("reuse_browser"):
+        return None
+    preferences = values.get("preferences")
+    return (
+        repr(values.get("profile")),
+        repr(sorted(preferences.items())) if preferences else None,
+    )
+
+
+def get_profile_preferences(values: dict) -> dict or None:
+    """Returns the profile preferences of a test, including the ones needed to reset a reused browser."""
+    preferences = values.get("preferences")
+    if not values.get("reuse_browser"):
+        return preferences
+    if preferences is None:
+        if values.get("profile") is Profiles.BRAND_NEW:
+            preferences = FirefoxSettings.DEFAULT_FX_PREFS
+        else:
+            preferences = {}
+    return dict(preferences, **REUSE_PREFERENCES)
+
+
+def group_reusable_items(items: list):
+    """Moves compatible reusable tests next to each other, in place.
+
+    Each group takes the position of its first member, and the relative order of all items is otherwise unchanged.
+    """
+    groups = {}
+    ordered = []
+    for item in items:
+        key = get_reuse_group(item)
+        if key is None:
+            ordered.append([item])
+        elif key in groups:
+            groups[key].append(item)
+        else:
+            groups[key] = [item]
+            ordered.append(groups[key])
+    items[:] = [item for group in ordered for item in group]
+
+
+def _get_next_item(item):
+    items = item.session.items
+    try:
+        return items[items.index(item) + 1]
+    except (ValueError, IndexError):
+        return None
+
+
+def _get_process_id(runner):
+    if OSHelper.is_windows():
+        process = getattr(FXRunner, "process", None)
+        return process.pid if process is not None else None
+    process_handler = getattr(getattr(runner, "runner", None), "process_handler", None)
+    return process_handler.pid if process_handler is not None else None
+
+
+def _is_running(runner) -> bool:
+    process_id = _get_process_id(runner)
+    return process_id is not None and psutil.pid_exists(process_id)
+
+
+def _kill(runner):
+    process_id = _get_process_id(runner)
+    if process_id is None:
+        return
+    try:
+        kill_proc_tree(process_id)
+    except psutil.NoSuchProcess:
+        pass
+
+
+def _has_default_layout(profile_type) -> bool:
+    """Checks if a profile type starts with the default toolbar layout, so resetting it restores the initial state."""
+    if profile_type is Profiles.BRAND_NEW:
+        return True
+    if profile_type is None:
+        profile_type = Profiles.DEFAULT
+    prefs_file = os.path.join(
+        profile_templates.get_template(profile_type.value), "prefs.js"
+    )
+    try:
+        with open(prefs_file, "r", encoding="utf-8") as f:
+            return "browser.uiCustomization.state" not in f.read()
+    except IOError:
+        return True
+
+
+browser_reuse = BrowserReuse()
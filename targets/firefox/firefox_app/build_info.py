@@ -0,0 +1,114 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+import threading
+
+import mozversion
+
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+BUILD_INFO_FILE = "build_info.json"
+
+# Files read by mozversion, relative to the directory of the Firefox binary.
+VERSION_FILES = (
+    "application.ini",
+    "platform.ini",
+    os.path.join("..", "Resources", "application.ini"),
+    os.path.join("..", "Resources", "platform.ini"),
+)
+
+
+class BuildInfoCache:
+    """Memoized mozversion data for Firefox binaries.
+
+    The version information of a binary is probed once and kept both in memory and in 'cache/build_info.json' in the
+    working directory. Entries are keyed by the binary path and validated against the modification time and size of
+    the binary and of the .ini files mozversion reads, so an update that rewrites the installation is picked up by
+    the next lookup.
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def get(self, build_path: str) -> dict:
+        """Returns the mozversion dictionary for a Firefox binary.
+
+        :param build_path: Path to the Firefox binary.
+        :return: Dictionary generated by mozversion.
+        """
+        build_path = os.path.abspath(build_path)
+        fingerprint = _get_build_fingerprint(build_path)
+
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(build_path)
+            if entry is not None and entry.get("fingerprint") == fingerprint:
+                return entry.get("info")
+
+            logger.debug("Probing build information for %s" % build_path)
+            info = mozversion.get_version(binary=build_path)
+            entries[build_path] = {"fingerprint": fingerprint, "info": info}
+            self._save()
+            return info
+
+    def invalidate(self, build_path: str = None):
+        """Drops the cached information for one binary, or for all of them."""
+        with self._lock:
+            entries = self._load()
+            if build_path is None:
+                entries.clear()
+            else:
+                entries.pop(os.path.abspath(build_path), None)
+            self._save()
+
+    @staticmethod
+    def _get_cache_file():
+        return os.path.join(PathManager.get_working_dir(), "cache", BUILD_INFO_FILE)
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            cache_file = self._get_cache_file()
+            if os.path.exists(cache_file):
+                try:
+                    with open(cache_file, "r") as f:
+                        self._entries = json.load(f)
+                except (IOError, ValueError) as e:
+                    logger.debug("Ignoring unreadable build info cache: %s" % e)
+        return self._entries
+
+    def _save(self):
+        cache_file = self._get_cache_file()
+        temp_file = "%s.%s.tmp" % (cache_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temp_file, "w") as f:
+                json.dump(self._entries, f, sort_keys=True, indent=True)
+            os.replace(temp_file, cache_file)
+        except (IOError, OSError, TypeError) as e:
+            logger.debug("Unable to save build info cache: %s" % e)
+
+
+def _get_build_fingerprint(build_path: str) -> str:
+    """Returns a string that changes whenever the binary or its version files are rewritten."""
+    build_dir = os.path.dirname(build_path)
+    parts = []
+    for path in (build_path,) + tuple(
+        os.path.normpath(os.path.join(build_dir, name)) for name in VERSION_FILES
+    ):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        parts.append("%s:%s:%s" % (path, stat.st_mtime_ns, stat.st_size))
+    return "|".join(parts)
+
+
+build_info = BuildInfoCache()
@@ -0,0 +1,317 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import mozinfo
+import requests
+from mozdownload import FactoryScraper
+from mozinstall import install, get_binary
+
+from moziris.util.path_manager import PathManager
+from targets.firefox.errors import BuildStoreError
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
+
+class BuildStore:
+    """Content-addressed store of downloaded Firefox installers and extracted installs.
+
+    Layout of the root folder, 'cache/builds' in the working directory by default:
+
+    installers/<sha256><extension>  -   Downloaded installers, named after their content hash.
+    installs/<sha256>/              -   Installs extracted from the installer with the same hash.
+    index.json                      -   Maps each resolved build, i.e. (version, locale, platform, build), to its
+                                        installer and binary, and each requested (version, locale, platform) to the
+                                        last build it resolved to, which is what offline lookups use.
+
+    Entries are evicted least recently used first once the store grows beyond max_size bytes. Builds used by the
+    current session are never evicted.
+
+    archive_url replaces https://archive.mozilla.org/pub/ as the source of the builds. It can also be a local
+    directory, or a file:// URL, laid out like the archive (Ex firefox/candidates/68.0-candidates/build1/...), which
+    is served to mozdownload over HTTP on the loopback interface.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.root = None
+        self.offline = False
+        self.archive_url = None
+        self._lock = threading.Lock()
+        self._session_builds = set()
+        self._archive_servers = {}
+
+    def get_root(self):
+        root = self.root or os.path.join(
+            PathManager.get_working_dir(), "cache", "builds"
+        )
+        for folder in ("installers", "installs", "downloads"):
+            os.makedirs(os.path.join(root, folder), exist_ok=True)
+        return root
+
+    def get_build(
+        self, version: str, locale: str, scraper_type: str, scraper_details: dict
+    ) -> str or None:
+        """Returns the path to the Firefox binary of a build, downloading and installing it if needed.
+
+        :param version: Requested Firefox version (Ex. 68.0, latest-beta, nightly).
+        :param locale: Firefox locale.
+        :param scraper_type: mozdownload scraper type.
+        :param scraper_details: mozdownload scraper arguments.
+        :return: Path to the Firefox binary. BuildStoreError is raised if the build is needed offline and was not
+        stored before.
+        """
+        platform = scraper_details.get("platform") or _get_platform()
+        alias_key = _get_key(version, locale, platform)
+
+        if self.offline:
+            return self._get_offline_build(alias_key)
+
+        if self.archive_url is not None:
+            scraper_details = dict(scraper_details, base_url=self._get_archive_url())
+        scraper_details["destination"] = os.path.join(self.get_root(), "downloads")
+
+        try:
+            scraper = FactoryScraper(scraper_type, **scraper_details)
+            build_url = scraper.url
+        except requests.exceptions.ConnectionError as e:
+            logger.warning(
+                "Archive not reachable (%s), looking up %s in the build store."
+                % (e, alias_key)
+            )
+            return self._get_offline_build(alias_key)
+
+        build_key = _get_key(version, locale, platform, build_url)
+        binary = self._lookup(build_key, alias_key)
+        if binary is not None:
+            logger.debug("Using stored build %s" % build_key)
+            return binary
+
+        logger.info("Downloading Firefox build: %s" % build_url)
+        installer = scraper.download()
+        return self._add(build_key, alias_key, build_url, installer)
+
+    def _get_archive_url(self):
+        """Returns the base URL of the archive, serving it over HTTP first if it is a local directory."""
+        archive_dir = _get_local_path(self.archive_url)
+        if archive_dir is None:
+            return self.archive_url
+        with self._lock:
+            server = self._archive_servers.get(archive_dir)
+            if server is None:
+                if not os.path.isdir(archive_dir):
+                    raise BuildStoreError(
+                        "Archive mirror %s is not a directory." % archive_dir
+                    )
+                handler = functools.partial(_ArchiveHandler, directory=archive_dir)
+                server = _ArchiveServer(("127.0.0.1", 0), handler)
+                threading.Thread(
+                    target=server.serve_forever, name="ArchiveMirror", daemon=True
+                ).start()
+                self._archive_servers[archive_dir] = server
+                logger.debug(
+                    "Serving archive mirror %s on port %s"
+                    % (archive_dir, server.server_address[1])
+                )
+            return "http://127.0.0.1:%s/" % server.server_address[1]
+
+    def _get_offline_build(self, alias_key):
+        with self._lock:
+            index = self._load_index()
+            build_key = index["aliases"].get(alias_key)
+        binary = None
+        if build_key is not None:
+            binary = self._lookup(build_key, alias_key)
+        if binary is None:
+            raise BuildStoreError(
+                "Firefox build %s is not in the build store, fetch it with tools/prefetch_builds.py before running "
+                "offline." % alias_key
+            )
+        return binary
+
+    def _lookup(self, build_key, alias_key):
+        with self._lock:
+            index = self._load_index()
+            entry = index["builds"].get(build_key)
+            if entry is None:
+                return None
+            binary = os.path.join(self.get_root(), entry["binary"])
+            if not os.path.exists(binary):
+                logger.debug("Stored build %s is missing on disk." % build_key)
+                del index["builds"][build_key]
+                self._save_index(index)
+                return None
+            entry["last_used"] = time.time()
+            index["aliases"][alias_key] = build_key
+            self._session_builds.add(build_key)
+            self._save_index(index)
+            return binary
+
+    def _add(self, build_key, alias_key, build_url, downloaded_file):
+        root = self.get_root()
+        content_hash = _get_file_hash(downloaded_file)
+        extension = _get_extension(downloaded_file)
+        installer = os.path.join(root, "installers", content_hash + extension)
+        if os.path.exists(installer):
+            os.remove(downloaded_file)
+        else:
+            os.replace(downloaded_file, installer)
+
+        install_dir = os.path.join(root, "installs", content_hash)
+        if not os.path.exists(install_dir):
+            staging_dir = "%s.%s.tmp" % (install_dir, threading.get_ident())
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            install(src=installer, dest=staging_dir)
+            try:
+                os.rename(staging_dir, install_dir)
+            except OSError:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        binary = get_binary(install_dir, "Firefox")
+        entry = {
+            "url": build_url,
+            "installer": os.path.relpath(installer, root),
+            "install": os.path.relpath(install_dir, root),
+            "binary": os.path.relpath(binary, root),
+            "size": _get_size(installer) + _get_size(install_dir),
+            "last_used": time.time(),
+        }
+
+        with self._lock:
+            index = self._load_index()
+            index["builds"][build_key] = entry
+            index["aliases"][alias_key] = build_key
+            self._session_builds.add(build_key)
+            self._evict(index)
+            self._save_index(index)
+        return binary
+
+    def _evict(self, index):
+        """Removes least recently used builds until the store fits in max_size."""
+        builds = index["builds"]
+        total_size = sum(entry.get("size", 0) for entry in builds.values())
+        candidates = sorted(
+            (key for key in builds if key not in self._session_builds),
+            key=lambda key: builds[key].get("last_used", 0),
+        )
+        for build_key in candidates:
+            if total_size <= self.max_size:
+                break
+            entry = builds.pop(build_key)
+            total_size -= entry.get("size", 0)
+            logger.debug("Evicting stored build %s" % build_key)
+
+            still_used = set()
+            for remaining in builds.values():
+                still_used.add(remaining["installer"])
+                still_used.add(remaining["install"])
+            for path in (entry["installer"], entry["install"]):
+                if path in still_used:
+                    continue
+                full_path = os.path.join(self.get_root(), path)
+                if os.path.isdir(full_path):
+                    shutil.rmtree(full_path, ignore_errors=True)
+                elif os.path.exists(full_path):
+                    os.remove(full_path)
+
+        for alias_key in list(index["aliases"]):
+            if index["aliases"][alias_key] not in builds:
+                del index["aliases"][alias_key]
+
+    def _load_index(self):
+        index_file = os.path.join(self.get_root(), INDEX_FILE)
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, "r") as f:
+                    return json.load(f)
+            except (IOError, ValueError) as e:
+                logger.warning("Ignoring unreadable build store index: %s" % e)
+        return {"builds": {}, "aliases": {}}
+
+    def _save_index(self, index):
+        index_file = os.path.join(self.get_root(), INDEX_FILE)
+        temp_file = "%s.%s.tmp" % (index_file, os.getpid())
+        with open(temp_file, "w") as f:
+            json.dump(index, f, sort_keys=True, indent=True)
+        os.replace(temp_file, index_file)
+
+
+class _ArchiveServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ArchiveHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format_arg, *args):
+        pass
+
+
+def _get_local_path(archive_url):
+    """Returns the directory of a local archive mirror, or None if the archive is a remote URL."""
+    if os.path.isdir(archive_url):
+        return archive_url
+    parsed_url = urlparse(archive_url)
+    if parsed_url.scheme == "file":
+        return url2pathname(parsed_url.path)
+    return None
+
+
+def _get_platform():
+    """Returns the platform name mozdownload detects for the current machine."""
+    if mozinfo.os == "mac" or (mozinfo.os == "linux" and mozinfo.bits == 32):
+        return mozinfo.os
+    return "%s%d" % (mozinfo.os, mozinfo.bits)
+
+
+def _get_key(version, locale, platform, build=None):
+    key = "%s|%s|%s" % (version, locale, platform)
+    if build is not None:
+        key += "|%s" % build
+    return key
+
+
+def _get_extension(path):
+    name = os.path.basename(path)
+    for extension in (".tar.bz2", ".tar.gz"):
+        if name.endswith(extension):
+            return extension
+    return os.path.splitext(name)[1]
+
+
+def _get_file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _get_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+build_store = BuildStore()
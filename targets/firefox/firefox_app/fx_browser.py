@@ -9,15 +9,10 @@ import shutil
 import signal
 import sqlite3
 import subprocess
-import time
-from distutils import dir_util
-from distutils.spawn import find_executable
 from enum import Enum
 
-import mozversion
 import psutil as psutil
 from mozdownload import FactoryScraper, errors
-from mozinstall import install, get_binary
 from mozrunner import FirefoxRunner, errors as run_errors
 from mozprofile import Profile as MozProfile
 
@@ -28,6 +23,10 @@ from moziris.api.settings import Settings
 from moziris.util.arg_parser import get_core_args
 from moziris.util.path_manager import PathManager
 from moziris.util.system import shutdown_process
+from targets.firefox.firefox_app.build_info import build_info
+from targets.firefox.firefox_app.build_store import build_store
+from targets.firefox.firefox_app.launch_beacon import launch_beacon
+from targets.firefox.firefox_app.profile_cache import profile_templates
 from targets.firefox.firefox_ui.helpers.general import confirm_firefox_launch
 from targets.firefox.firefox_ui.helpers.keyboard_shortcuts import (
     maximize_window,
@@ -88,76 +87,41 @@ class FirefoxProfile(MozProfile):
     @staticmethod
     def _get_staged_profile(profile_name, path):
         """
-        Internal-only method used to extract a given profile.
+        Internal-only method used to create a profile from a staged profile template.
         :param profile_name:
         :param path:
         :return:
         """
-        staged_profiles = os.path.join(
-            PathManager.get_module_dir(),
-            "targets",
-            "firefox",
-            "firefox_app",
-            "profiles",
-        )
-
-        sz_bin = find_executable("7z")
-        logger.debug('Using 7zip executable at "%s"' % sz_bin)
-
-        zipped_profile = os.path.join(staged_profiles, "%s.zip" % profile_name.value)
-
-        cmd = [sz_bin, "x", "-y", "-bd", "-o%s" % staged_profiles, zipped_profile]
-        logger.debug('Unzipping profile with command "%s"' % " ".join(cmd))
-        try:
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-        except subprocess.CalledProcessError as e:
-            logger.error("7zip failed: %s" % repr(e.output))
-            raise Exception("Unable to unzip profile.")
-        logger.debug("7zip succeeded: %s" % repr(output))
-
-        from_directory = os.path.join(staged_profiles, profile_name.value)
         to_directory = "%s_%s" % (
             path,
             datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
         )
+        if os.path.exists(to_directory):
+            to_directory = "%s_%s" % (
+                to_directory,
+                datetime.datetime.now().strftime("%f"),
+            )
 
         if os.path.exists(path):
-            try:
-                shutil.rmtree(path)
-                time.sleep(3)
-            except Exception as e:
-                logger.debug("Error, can't remove previous profile: %s" % e)
+            shutil.rmtree(path, ignore_errors=True)
 
         logger.debug("Creating new profile: %s" % to_directory)
 
         try:
-            logger.debug("From directory: %s" % from_directory)
-            logger.debug("To directory: %s" % to_directory)
-            dir_util.copy_tree(from_directory, to_directory)
+            profile_templates.clone(profile_name.value, to_directory)
         except Exception as e:
             logger.error("Error upon creating profile: %s" % e)
 
-        try:
-            shutil.rmtree(from_directory)
-        except WindowsError:
-            logger.debug("Error, can't remove orphaned directory, leaving in place.")
-
-        resource_fork_folder = os.path.join(staged_profiles, "__MACOSX")
-        if os.path.exists(resource_fork_folder):
-            try:
-                shutil.rmtree(resource_fork_folder)
-            except WindowsError:
-                logger.debug(
-                    "Error, can't remove orphaned directory, leaving in place."
-                )
-
         return to_directory
 
-    def make_profile(profile_type: Profiles = None, preferences: dict = None):
+    def make_profile(
+        profile_type: Profiles = None, preferences: dict = None, test_file: str = None
+    ):
         """Internal-only method used to create profiles on disk.
 
         :param profile_type: Profiles.BRAND_NEW, Profiles.LIKE_NEW, Profiles.TEN_BOOKMARKS, Profiles.DEFAULT
         :param preferences: A dictionary containing profile preferences
+        :param test_file: Path of the test the profile is created for, defaults to the current test
         """
         if profile_type is None:
             profile_type = Profiles.DEFAULT
@@ -169,8 +133,9 @@ class FirefoxProfile(MozProfile):
                 preferences = {}
 
         test_root = PathManager.get_current_tests_directory()
-        current_test = os.environ.get("CURRENT_TEST")
-        test_path = current_test.split(test_root)[1].split(".py")[0][1:]
+        if test_file is None:
+            test_file = os.environ.get("CURRENT_TEST")
+        test_path = test_file.split(test_root)[1].split(".py")[0][1:]
         profile_path = os.path.join(
             PathManager.get_current_run_dir(), test_path, "profile"
         )
@@ -231,7 +196,8 @@ class FirefoxApp:
     def _get_test_candidate(version: str, locale: str) -> str or None:
         """Download and extract a build candidate.
 
-        Build may either refer to a Firefox release identifier, package, or build directory.
+        Build may either refer to a Firefox release identifier, package, or build directory. Downloaded builds are
+        kept in the build store, so a build that was already installed is only looked up.
         :param: build: str with firefox build
         :return: Installation path for the Firefox App
         """
@@ -254,20 +220,7 @@ class FirefoxApp:
                     locale,
                 )
 
-                scraper = FactoryScraper(s_t, **s_d)
-                firefox_dmg = scraper.download()
-
-                install_dir = install(
-                    src=firefox_dmg,
-                    dest=os.path.join(
-                        PathManager.get_temp_dir(),
-                        "firefox{}{}".format(
-                            normalize_str(version), normalize_str(locale)
-                        ),
-                    ),
-                )
-
-                return get_binary(install_dir, "Firefox")
+                return build_store.get_build(version, locale, s_t, s_d)
             except errors.NotFoundError:
                 logger.critical(
                     "Specified build {} has not been found. Closing Iris ...".format(
@@ -291,6 +244,7 @@ class FXRunner:
                 value_pair = "%s=%s&" % (arg, args[arg])
                 query_string += value_pair
             self.url += query_string[:-1]
+        self.start_page = self.url
 
     def __str__(self):
         return "(profile: {}, runner: {})".format(self.profile, self.runner)
@@ -332,6 +286,20 @@ class FXRunner:
     def start(self, url=None, image=None, maximize=True):
         if url is not None:
             self.url = url
+
+        # The start page reports back as soon as it has rendered, when Iris can listen for it.
+        token = None
+        launch_url = self.url
+        if image is None and self.url == self.start_page:
+            token = launch_beacon.expect()
+            if token is not None:
+                separator = "&" if "?" in self.url else "?"
+                self.url = "%s%s%s" % (
+                    self.start_page,
+                    separator,
+                    launch_beacon.get_query(token),
+                )
+
         if not OSHelper.is_windows():
             self.runner = self.launch()
             self.runner.start()
@@ -355,7 +323,12 @@ class FXRunner:
             except subprocess.CalledProcessError:
                 logger.error("Firefox failed to start")
                 exit(1)
-        confirm_firefox_launch(image)
+        self.url = launch_url
+
+        if token is None or not launch_beacon.wait(token):
+            if token is not None:
+                logger.debug("No launch beacon received, looking for the start page.")
+            confirm_firefox_launch(image)
         if maximize:
             maximize_window()
 
@@ -529,6 +502,8 @@ class FirefoxUtils:
     def get_firefox_info(build_path: str) -> str or None:
         """Returns the application version information as a dict with the help of mozversion library.
 
+        The information is probed once per binary and cached, see BuildInfoCache.
+
         :param build_path: Path to the binary for the application or Android APK
         file.
         """
@@ -537,7 +512,7 @@ class FirefoxUtils:
 
         # import mozlog
         # mozlog.commandline.setup_logging('mozversion', None, {})
-        return mozversion.get_version(binary=build_path)
+        return build_info.get(build_path)
 
     @staticmethod
     def get_firefox_channel(build_path: str) -> str or None:
@@ -1,5 +1,10 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from targets.firefox.firefox_app.fx_browser import FirefoxApp, normalize_str
 
+logger = logging.getLogger(__name__)
+
 
 class FirefoxCollection:
     def __init__(self):
@@ -17,5 +22,32 @@ class FirefoxCollection:
         )
         return self.fx_collection.get(fx_browser_key)
 
+    def prefetch(self, versions: list, locales: list, jobs: int = 4):
+        """Resolves, downloads and installs every version and locale combination concurrently.
+
+        :param versions: List of Firefox versions (Ex. ['68.0', 'latest-beta']).
+        :param locales: List of Firefox locales (Ex. ['en-US', 'de']).
+        :param jobs: Maximum number of builds fetched at the same time.
+        :return: List of (version, locale) pairs that could not be fetched.
+        """
+        matrix = [(version, locale) for version in versions for locale in locales]
+        failed = []
+
+        def fetch(build):
+            version, locale = build
+            try:
+                self.add(version, locale)
+                logger.info(
+                    "Fetched Firefox %s %s: %s"
+                    % (version, locale, self.get(version, locale))
+                )
+            except Exception as e:
+                logger.error("Unable to fetch Firefox %s %s: %s" % (version, locale, e))
+                failed.append(build)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(fetch, matrix))
+        return failed
+
 
 FX_Collection = FirefoxCollection()
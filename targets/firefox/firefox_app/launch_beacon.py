@@ -0,0 +1,113 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+BEACON_TIMEOUT = 30
+
+
+class _BeaconServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _BeaconHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self._handle_beacon()
+
+    def do_GET(self):
+        self._handle_beacon()
+
+    def _handle_beacon(self):
+        request = urlparse(self.path)
+        token = parse_qs(request.query).get("token", [None])[0]
+        if request.path == "/ready" and token is not None:
+            self.server.beacon.signal(token)
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+    def log_message(self, format_arg, *args):
+        pass
+
+
+class LaunchBeacon:
+    """Receives the 'page rendered' signal of the Iris start page.
+
+    The local web server runs in its own process, so the start page reports back to this small HTTP listener, which
+    runs in the test process on an ephemeral port. Each launch expects its own token, so a late beacon from a previous
+    browser can't satisfy the next launch.
+    """
+
+    def __init__(self):
+        self._server = None
+        self._events = {}
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server else None
+
+    def expect(self) -> str or None:
+        """Registers a new launch and returns its token, or None if the listener can't be started."""
+        if not self._start():
+            return None
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._events[token] = threading.Event()
+        return token
+
+    def get_query(self, token: str) -> str:
+        """Returns the query string parameters that make the start page send the beacon for a launch."""
+        return "beacon=%s&token=%s" % (self.port, token)
+
+    def wait(self, token: str, timeout: float = BEACON_TIMEOUT) -> bool:
+        """Blocks until the start page of a launch has rendered.
+
+        :param token: Token returned by expect().
+        :param timeout: Maximum number of seconds to wait.
+        :return: True if the beacon was received.
+        """
+        with self._lock:
+            event = self._events.get(token)
+        if event is None:
+            return False
+        try:
+            return event.wait(timeout)
+        finally:
+            with self._lock:
+                self._events.pop(token, None)
+
+    def signal(self, token: str):
+        with self._lock:
+            event = self._events.get(token)
+        if event is not None:
+            logger.debug("Launch beacon received: %s" % token)
+            event.set()
+
+    def _start(self):
+        with self._lock:
+            if self._server is not None:
+                return True
+            try:
+                self._server = _BeaconServer(("127.0.0.1", 0), _BeaconHandler)
+            except OSError as e:
+                logger.warning("Unable to start launch beacon listener: %s" % e)
+                return False
+            self._server.beacon = self
+            thread = threading.Thread(
+                target=self._server.serve_forever, name="LaunchBeacon", daemon=True
+            )
+            thread.start()
+            logger.debug("Launch beacon listening on port %s" % self.port)
+            return True
+
+
+launch_beacon = LaunchBeacon()
@@ -0,0 +1,209 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from distutils.spawn import find_executable
+
+from moziris.api.os_helpers import OSHelper
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+# Files Firefox creates while a profile is in use. They must never be shared between clones.
+PROFILE_LOCK_FILES = ("lock", ".parentlock", "parent.lock")
+# Prefix of the folders profiles are extracted into before they are renamed to templates.
+STAGING_PREFIX = ".staging_"
+
+
+class ProfileTemplateCache:
+    """Extracted copies of the staged profiles, shared by every test in a session.
+
+    Each zipped profile is extracted once per content hash into the 'cache/profiles' folder of the working
+    directory, so the extraction also survives across sessions. Test profiles are then produced by cloning the
+    extracted template: a copy-on-write clone where the file system supports it, a plain copy otherwise.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_staged_profiles_dir():
+        return os.path.join(
+            PathManager.get_module_dir(),
+            "targets",
+            "firefox",
+            "firefox_app",
+            "profiles",
+        )
+
+    @staticmethod
+    def get_cache_dir():
+        cache_dir = os.path.join(PathManager.get_working_dir(), "cache", "profiles")
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    def get_template(self, profile_name: str) -> str:
+        """Returns the path of the extracted template for a staged profile, extracting it if needed.
+
+        :param profile_name: Name of the staged profile (Ex. like_new, ten_bookmarks).
+        :return: Path to the extracted template directory.
+        """
+        with self._lock:
+            template = self._templates.get(profile_name)
+            if template is not None and os.path.isdir(template):
+                return template
+
+            zipped_profile = os.path.join(
+                self.get_staged_profiles_dir(), "%s.zip" % profile_name
+            )
+            content_hash = _get_file_hash(zipped_profile)
+            template = os.path.join(
+                self.get_cache_dir(), "%s_%s" % (profile_name, content_hash[:16])
+            )
+
+            if os.path.isdir(template):
+                logger.debug(
+                    "Using cached %s profile template: %s" % (profile_name, template)
+                )
+            else:
+                self._extract_template(profile_name, zipped_profile, template)
+                self._prune_templates(profile_name, template)
+
+            self._templates[profile_name] = template
+            return template
+
+    def clone(self, profile_name: str, destination: str) -> str:
+        """Creates a new test profile from a staged profile template.
+
+        :param profile_name: Name of the staged profile (Ex. like_new, ten_bookmarks).
+        :param destination: Path of the new profile. It must not exist.
+        :return: Path of the new profile.
+        """
+        template = self.get_template(profile_name)
+        parent = os.path.dirname(destination)
+        if not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+
+        logger.debug("Cloning profile template %s to %s" % (template, destination))
+        if not _clone_tree(template, destination):
+            shutil.copytree(template, destination)
+
+        for lock_file in PROFILE_LOCK_FILES:
+            lock_path = os.path.join(destination, lock_file)
+            if os.path.lexists(lock_path):
+                os.remove(lock_path)
+        return destination
+
+    @staticmethod
+    def _extract_template(profile_name, zipped_profile, template):
+        """Extracts a zipped profile into the template directory.
+
+        Extraction happens in a temporary folder which is then renamed, so concurrent sessions sharing the same
+        working directory never see a partially extracted template.
+        """
+        staging_dir = tempfile.mkdtemp(
+            prefix="%s%s_" % (STAGING_PREFIX, profile_name),
+            dir=os.path.dirname(template),
+        )
+        try:
+            _unzip(zipped_profile, staging_dir)
+            extracted_profile = os.path.join(staging_dir, profile_name)
+            if not os.path.isdir(extracted_profile):
+                raise Exception("Unable to unzip profile.")
+            try:
+                os.rename(extracted_profile, template)
+                logger.debug(
+                    "Created %s profile template: %s" % (profile_name, template)
+                )
+            except OSError:
+                if not os.path.isdir(template):
+                    raise
+                logger.debug(
+                    "Profile template created by another session: %s" % template
+                )
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    @staticmethod
+    def _prune_templates(profile_name, current_template):
+        """Removes templates extracted from previous versions of a zipped profile.
+
+        Only entries named like templates of this profile are removed, never the staging folders other sessions are
+        extracting into.
+        """
+        cache_dir = os.path.dirname(current_template)
+        template_name = re.compile(r"^%s_[0-9a-f]{16}$" % re.escape(profile_name))
+        for entry in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, entry)
+            if (
+                template_name.match(entry)
+                and path != current_template
+                and os.path.isdir(path)
+            ):
+                logger.debug("Removing outdated profile template: %s" % path)
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _get_file_hash(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _unzip(zipped_file: str, destination: str):
+    """Extracts an archive with 7zip when available, with the zipfile module otherwise."""
+    sz_bin = find_executable("7z")
+    if sz_bin is None:
+        logger.debug("7zip not found, unzipping profile with zipfile.")
+        with zipfile.ZipFile(zipped_file) as archive:
+            archive.extractall(destination)
+        return
+
+    cmd = [sz_bin, "x", "-y", "-bd", "-o%s" % destination, zipped_file]
+    logger.debug('Unzipping profile with command "%s"' % " ".join(cmd))
+    try:
+        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError as e:
+        logger.error("7zip failed: %s" % repr(e.output))
+        raise Exception("Unable to unzip profile.")
+    logger.debug("7zip succeeded: %s" % repr(output))
+
+
+def _clone_tree(source: str, destination: str) -> bool:
+    """Copies a directory tree using copy-on-write clones when the platform supports them.
+
+    On Linux 'cp --reflink=auto' shares the file extents on btrfs/xfs and silently degrades to a regular copy on
+    other file systems. On macOS 'cp -c' uses APFS clonefile(). Both copy the whole tree in a single process.
+
+    :return: True if the tree was copied, False if the caller should fall back to a plain copy.
+    """
+    if OSHelper.is_linux():
+        cmd = ["cp", "-R", "--reflink=auto", source, destination]
+    elif OSHelper.is_mac():
+        cmd = ["cp", "-c", "-R", source, destination]
+    else:
+        return False
+
+    try:
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug("Profile clone failed, falling back to plain copy: %s" % e)
+        shutil.rmtree(destination, ignore_errors=True)
+        return False
+
+
+profile_templates = ProfileTemplateCache()
@@ -0,0 +1,202 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from targets.firefox.firefox_app.browser_reuse import (
+    get_profile_preferences,
+    get_reuse_key,
+)
+from targets.firefox.firefox_app.fx_browser import (
+    FirefoxApp,
+    FirefoxProfile,
+    Profiles,
+    kill_proc_tree,
+)
+from targets.firefox.firefox_app.profile_cache import PROFILE_LOCK_FILES
+from targets.firefox.firefox_app.profile_reaper import profile_reaper
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_TIMEOUT = 60
+
+
+class ProfilePool:
+    """Prepares the profile of the next test while the current test is running.
+
+    The pool follows the collected item order: when a test gets its profile, the pool starts building the profile of
+    the following item in a background thread, using that item's 'profile' and 'preferences' markers. Staged profiles
+    are also started once with a headless Firefox, so the first-run work (profile migration, startup cache, extension
+    database) is already done when the test launches the visible browser.
+
+    BRAND_NEW profiles are only created, never started, so tests of first-run behavior still see a pristine profile.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.keep_profiles = False
+        self._executor = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, item, app: FirefoxApp):
+        """Returns the profile for a test item, prepared in the background if possible.
+
+        :param item: The pytest item that needs a profile.
+        :param app: The Firefox application the test runs with.
+        :return: MozProfile instance for the test.
+        """
+        profile_type, preferences = _get_profile_markers(item)
+        key = _get_profile_key(item, app, profile_type, preferences)
+
+        profile = None
+        with self._lock:
+            pending = self._pending
+            if pending is not None and pending[0] == key:
+                self._pending = None
+            else:
+                pending = None
+
+        if pending is not None:
+            try:
+                profile = pending[1].result()
+                self.hits += 1
+                logger.debug("Using prepared profile: %s" % profile.profile)
+            except Exception as e:
+                logger.debug("Profile preparation failed: %s" % e)
+
+        if profile is None:
+            if self.enabled:
+                self.misses += 1
+            profile = FirefoxProfile.make_profile(profile_type, preferences)
+
+        if self.enabled:
+            self._prepare_next(item, app)
+        return profile
+
+    def close(self):
+        """Discards the profile prepared for a test that never ran."""
+        with self._lock:
+            pending = self._pending
+            self._pending = None
+        if pending is not None:
+            self._discard(pending[1])
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.enabled:
+            logger.info(
+                "Profile pool: %s prepared profile(s) used, %s created on demand."
+                % (self.hits, self.misses)
+            )
+
+    def _prepare_next(self, item, app):
+        items = item.session.items
+        try:
+            next_item = items[items.index(item) + 1]
+        except (ValueError, IndexError):
+            return
+
+        if "firefox" not in getattr(next_item, "fixturenames", ()):
+            return
+        reuse_key = get_reuse_key(next_item, app)
+        if reuse_key is not None and reuse_key == get_reuse_key(item, app):
+            return
+
+        profile_type, preferences = _get_profile_markers(next_item)
+        key = _get_profile_key(next_item, app, profile_type, preferences)
+        with self._lock:
+            if self._pending is not None:
+                if self._pending[0] == key:
+                    return
+                self._discard(self._pending[1])
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="ProfilePool"
+                )
+            future = self._executor.submit(
+                _prepare_profile,
+                app,
+                profile_type,
+                preferences,
+                str(next_item.fspath),
+            )
+            self._pending = (key, future)
+
+    def _discard(self, future):
+        def reap(done_future):
+            if done_future.exception() is None and not self.keep_profiles:
+                profile_reaper.reap(done_future.result().profile)
+
+        future.add_done_callback(reap)
+
+
+def _get_profile_markers(item):
+    values = item.own_markers[0].kwargs if item.own_markers else {}
+    return values.get("profile"), get_profile_preferences(values)
+
+
+def _get_profile_key(item, app, profile_type, preferences):
+    return (
+        item.nodeid,
+        app.path,
+        repr(profile_type),
+        repr(sorted(preferences.items())) if preferences else None,
+    )
+
+
+def _prepare_profile(app, profile_type, preferences, test_file):
+    profile = FirefoxProfile.make_profile(profile_type, preferences, test_file)
+    if profile_type not in (None, Profiles.LIKE_NEW, Profiles.TEN_BOOKMARKS):
+        return profile
+    _warm_up_profile(app.path, profile.profile)
+    return profile
+
+
+def _warm_up_profile(binary: str, profile_path: str):
+    """Starts a headless Firefox on a profile once, so its first-run initialization is done ahead of the test."""
+    work_dir = tempfile.mkdtemp(prefix="iris_warm_up_")
+    cmd = [
+        binary,
+        "-headless",
+        "-no-remote",
+        "-profile",
+        profile_path,
+        "-screenshot",
+        "about:blank",
+    ]
+    env = dict(os.environ, MOZ_HEADLESS="1")
+    logger.debug('Warming up profile with command "%s"' % " ".join(cmd))
+    try:
+        process = subprocess.Popen(
+            cmd,
+            cwd=work_dir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            process.wait(WARM_UP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.debug("Profile warm up timed out: %s" % profile_path)
+            kill_proc_tree(process.pid)
+    except OSError as e:
+        logger.debug("Unable to warm up profile %s: %s" % (profile_path, e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for lock_file in PROFILE_LOCK_FILES:
+            lock_path = os.path.join(profile_path, lock_file)
+            if os.path.lexists(lock_path):
+                os.remove(lock_path)
+
+
+profile_pool = ProfilePool()
@@ -0,0 +1,195 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import psutil
+
+from targets.firefox.firefox_app.fx_browser import DEFAULT_FIREFOX_TIMEOUT
+from targets.firefox.run_log import annotate_run_log
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING_PROFILES = 5
+MAX_DELETE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+
+class ProfileReaper:
+    """Background worker that takes ownership of finished Firefox processes and profile directories.
+
+    Teardown hands over the Firefox process ID and the profile path as soon as the browser was asked to quit. The
+    process tree is listed right away, while the parent is still running: on Windows the child processes are not
+    reparented and could not be found once the parent exited. The reaper waits for every process of the tree to exit
+    (killing the ones left after a grace period), then deletes the profile, retrying while files such as the sqlite
+    databases are still locked. At most MAX_PENDING_PROFILES profiles can be waiting
+    for deletion; beyond that, reap() blocks so a slow disk can't fill up with orphaned profiles.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_PROFILES):
+        self._jobs = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.pending_deletions = 0
+        self.deleted_profiles = 0
+        self.failed_deletions = 0
+        self.bytes_reclaimed = 0
+        self.killed_processes = 0
+
+    def reap(self, profile_path: str = None, process_id: int = None):
+        """Queues a profile directory and/or a Firefox process for cleanup.
+
+        :param profile_path: Profile directory to delete, None to keep the profile on disk.
+        :param process_id: ID of the Firefox process that is shutting down.
+        :return: None.
+        """
+        if profile_path is None and process_id is None:
+            return
+
+        processes = _get_process_tree(process_id) if process_id is not None else []
+        self._start()
+        with self._lock:
+            if profile_path is not None:
+                self.pending_deletions += 1
+        self._jobs.put((profile_path, processes))
+
+    def drain(self, timeout: float = None):
+        """Waits until all queued profiles and processes are cleaned up.
+
+        :param timeout: Maximum number of seconds to wait, None to wait until the queue is empty.
+        :return: True if the queue was drained.
+        """
+        if self._thread is None:
+            return True
+
+        end_time = None if timeout is None else time.time() + timeout
+        while self._jobs.unfinished_tasks > 0:
+            if end_time is not None and time.time() > end_time:
+                logger.warning(
+                    "Profile reaper still has %s pending job(s)."
+                    % self._jobs.unfinished_tasks
+                )
+                return False
+            time.sleep(0.1)
+        return True
+
+    def get_summary(self):
+        """Returns the reaper counters in a printable format."""
+        return (
+            "Profiles deleted: %s, Pending deletions: %s, Failed deletions: %s, "
+            "Reclaimed: %.1f MB, Killed processes: %s"
+            % (
+                self.deleted_profiles,
+                self.pending_deletions,
+                self.failed_deletions,
+                self.bytes_reclaimed / (1024 * 1024),
+                self.killed_processes,
+            )
+        )
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "deleted_profiles": self.deleted_profiles,
+                "pending_deletions": self.pending_deletions,
+                "failed_deletions": self.failed_deletions,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "killed_processes": self.killed_processes,
+            }
+
+    def annotate_run_log(self):
+        """Adds the reaper counters to run.json and logs them."""
+        logger.info("Profile cleanup: %s" % self.get_summary())
+        annotate_run_log({"profile_cleanup": self.get_stats()})
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="ProfileReaper", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            profile_path, processes = self._jobs.get()
+            try:
+                if len(processes) > 0:
+                    self._wait_for_processes(processes)
+                if profile_path is not None:
+                    self._delete_profile(profile_path)
+            except Exception as e:
+                logger.debug("Profile reaper error: %s" % e)
+            finally:
+                self._jobs.task_done()
+
+    def _wait_for_processes(self, processes):
+        _, alive = psutil.wait_procs(processes, timeout=DEFAULT_FIREFOX_TIMEOUT)
+        if len(alive) == 0:
+            return
+
+        logger.debug(
+            "Firefox process %s did not exit, killing %s process(es)."
+            % (processes[0].pid, len(alive))
+        )
+        killed = 0
+        for process in alive:
+            try:
+                process.kill()
+                killed += 1
+            except psutil.NoSuchProcess:
+                pass
+        psutil.wait_procs(alive, timeout=5)
+        with self._lock:
+            self.killed_processes += killed
+
+    def _delete_profile(self, profile_path):
+        size = _get_directory_size(profile_path)
+        for attempt in range(1, MAX_DELETE_ATTEMPTS + 1):
+            shutil.rmtree(profile_path, ignore_errors=True)
+            if not os.path.exists(profile_path):
+                break
+            logger.debug(
+                "Profile %s still locked, attempt %s of %s."
+                % (profile_path, attempt, MAX_DELETE_ATTEMPTS)
+            )
+            time.sleep(RETRY_DELAY * attempt)
+
+        with self._lock:
+            self.pending_deletions -= 1
+            if os.path.exists(profile_path):
+                logger.warning("Unable to delete profile: %s" % profile_path)
+                self.failed_deletions += 1
+                self.bytes_reclaimed += size - _get_directory_size(profile_path)
+            else:
+                self.deleted_profiles += 1
+                self.bytes_reclaimed += size
+
+
+def _get_process_tree(process_id: int) -> list:
+    """Returns a process and its descendants, or an empty list if the process already exited."""
+    try:
+        process = psutil.Process(process_id)
+        return [process] + process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return []
+
+
+def _get_directory_size(path: str) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+profile_reaper = ProfileReaper()
@@ -0,0 +1,156 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+
+from moziris.api.os_helpers import OSHelper
+from moziris.api.screen.display import DisplayCollection
+from moziris.api.screen.region import Region
+from moziris.api.settings import Settings
+from targets.firefox.firefox_ui.helpers.multi_find import find_any
+from targets.firefox.firefox_ui.nav_bar import NavBar
+from targets.firefox.firefox_ui.window_controls import MainWindow
+from targets.firefox.window_bounds import window_bounds
+
+logger = logging.getLogger(__name__)
+
+# Pixels added above, below and beside the navigation bar anchors.
+NAV_BAR_PADDING = 10
+# Part of the window width the sidebar region covers (Ex 3 for a third).
+SIDEBAR_FRACTION = 3
+
+NAVIGATION_BUTTONS = [
+    NavBar.BACK_BUTTON,
+    NavBar.RELOAD_BUTTON,
+    NavBar.BACK_BUTTON_RTL,
+    NavBar.RELOAD_BUTTON_RTL,
+]
+
+if OSHelper.is_mac():
+    WINDOW_CONTROLS = MainWindow.MAIN_WINDOW_CONTROLS
+else:
+    WINDOW_CONTROLS = MainWindow.CLOSE_BUTTON
+
+
+class ChromeRegions:
+    """Registry of the regions of the browser chrome: window, tab_strip, nav_bar, url_bar, sidebar and content.
+
+    The regions are measured once, with a single search for the hamburger menu, the navigation buttons and the main
+    window controls, and kept for the window rectangle they were measured in. When the rectangle of the Firefox
+    windows is known, see window_bounds, the regions are measured again as soon as it changes. Otherwise they must be
+    invalidated when a window is launched, opened, closed, resized, maximized or put in full screen, which the window
+    helpers do. Regions measured by the helpers themselves, such as the hamburger menu pop up, can be added and are
+    invalidated with the others.
+
+    The regions are clipped to the Firefox windows when their rectangle is known, see window_bounds, and to the
+    screen otherwise. If the anchors are not on screen (Ex full screen on Mac) no region is available until the next
+    invalidation, and helpers fall back to their default search area.
+    """
+
+    def __init__(self):
+        self.window = None
+        self.measures = 0
+        self._measured = False
+        self._bounds = None
+        self._regions = {}
+
+    def invalidate(self):
+        """Forgets all regions, they are measured again when next used."""
+        self.window = None
+        self._measured = False
+        self._bounds = None
+        self._regions.clear()
+
+    def get_region(self, name: str, default=None):
+        """Returns a region of the browser chrome.
+
+        :param name: Name of the region (Ex nav_bar).
+        :param default: Returned when the region is not available.
+        :return: Region object.
+        """
+        bounds = _get_window_bounds()
+        if self._measured and bounds is not None and bounds != self._bounds:
+            logger.debug("Firefox windows changed, measuring chrome regions again.")
+            self.invalidate()
+        if not self._measured:
+            self._bounds = bounds
+            self._measure()
+        return self._regions.get(name, default)
+
+    def add_region(self, name: str, region: Region):
+        """Stores a region measured in the current window, until the next invalidation.
+
+        :param name: Name of the region (Ex hamburger_menu).
+        :param region: Region object.
+        :return: None.
+        """
+        if self.window is not None:
+            self._regions[name] = region
+
+    def _measure(self):
+        self._measured = True
+        self.measures += 1
+        anchors = [NavBar.HAMBURGER_MENU, WINDOW_CONTROLS] + NAVIGATION_BUTTONS
+        matches = find_any(anchors, Settings.DEFAULT_UI_DELAY)
+        buttons = [button for button in NAVIGATION_BUTTONS if button in matches]
+        if NavBar.HAMBURGER_MENU not in matches or len(buttons) == 0:
+            logger.debug("Navigation bar not found, chrome regions are not available.")
+            return
+
+        hamburger = _get_bounds(NavBar.HAMBURGER_MENU, matches[NavBar.HAMBURGER_MENU])
+        button_boxes = [_get_bounds(button, matches[button]) for button in buttons]
+        nav_bar = [hamburger] + button_boxes
+        bounds = window_bounds.get_region()
+        if bounds is None:
+            bounds = DisplayCollection[0].bounds
+        left = max(min(box[0] for box in nav_bar) - NAV_BAR_PADDING, bounds.x)
+        right = min(
+            max(box[2] for box in nav_bar) + NAV_BAR_PADDING, bounds.x + bounds.width
+        )
+        nav_top = max(min(box[1] for box in nav_bar) - NAV_BAR_PADDING, bounds.y)
+        nav_bottom = max(box[3] for box in nav_bar) + NAV_BAR_PADDING
+        bottom = bounds.y + bounds.height
+        top = bounds.y
+        if WINDOW_CONTROLS in matches and matches[WINDOW_CONTROLS].y < nav_top:
+            top = matches[WINDOW_CONTROLS].y
+        width = right - left
+
+        # The url bar lies between the navigation buttons and the hamburger menu, in both text directions.
+        buttons_left = min(box[0] for box in button_boxes)
+        buttons_right = max(box[2] for box in button_boxes)
+        if hamburger[0] > buttons_right:
+            url_left, url_right = buttons_right, hamburger[0]
+        else:
+            url_left, url_right = hamburger[2], buttons_left
+
+        self.window = Region(left, top, width, bottom - top)
+        self._regions = {
+            "window": self.window,
+            "nav_bar": Region(left, nav_top, width, nav_bottom - nav_top),
+            "url_bar": Region(
+                url_left, nav_top, url_right - url_left, nav_bottom - nav_top
+            ),
+            "content": Region(left, nav_bottom, width, bottom - nav_bottom),
+            "sidebar": Region(
+                left, nav_bottom, width // SIDEBAR_FRACTION, bottom - nav_bottom
+            ),
+        }
+        if nav_top > top:
+            self._regions["tab_strip"] = Region(left, top, width, nav_top - top)
+        logger.debug("Chrome regions measured in window %s" % self.window)
+
+
+def _get_window_bounds():
+    rectangle = window_bounds.get_region()
+    if rectangle is None:
+        return None
+    return rectangle.x, rectangle.y, rectangle.width, rectangle.height
+
+
+def _get_bounds(pattern, location) -> tuple:
+    width, height = pattern.get_size()
+    return location.x, location.y, location.x + width, location.y + height
+
+
+chrome_regions = ChromeRegions()
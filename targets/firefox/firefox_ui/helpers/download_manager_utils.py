@@ -20,6 +20,7 @@ from targets.firefox.firefox_ui.helpers.keyboard_shortcuts import (
     close_tab,
     open_web_console,
 )
+from targets.firefox.firefox_ui.helpers.multi_find import find_any
 from targets.firefox.firefox_ui.library import Library
 from targets.firefox.firefox_ui.library_menu import LibraryMenu
 from targets.firefox.firefox_ui.nav_bar import NavBar
@@ -163,9 +164,17 @@ def cancel_in_progress_downloads_from_the_library(private_window=False):
         )
 
     # Cancel all 'in progress' downloads.
-    expected = region.exists(DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL, 5)
-    expected_highlighted = region.exists(
-        DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL_HIGHLIGHTED
+    matches = find_any(
+        [
+            DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL,
+            DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL_HIGHLIGHTED,
+        ],
+        5,
+        region,
+    )
+    expected = DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL in matches
+    expected_highlighted = (
+        DownloadManager.DownloadsPanel.DOWNLOAD_CANCEL_HIGHLIGHTED in matches
     )
     if expected or expected_highlighted:
         steps.append(
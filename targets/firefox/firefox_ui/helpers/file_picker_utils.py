@@ -17,6 +17,7 @@ from moziris.api.keyboard.key import KeyModifier
 from moziris.api.keyboard.keyboard import type
 from moziris.api.os_helpers import OSHelper
 from moziris.api.finder.finder import exists
+from targets.firefox.window_bounds import window_bounds
 
 logger = logging.getLogger(__name__)
 
@@ -48,49 +49,53 @@ def select_file_in_folder(
 
     open_directory(directory)
 
-    try:
-        for attempt in range(1, max_num_of_attempts + 1):
-            file_located = exists(filename_pattern)
+    # The file manager is another application, outside of the Firefox windows.
+    with window_bounds.full_screen():
+        try:
+            for attempt in range(1, max_num_of_attempts + 1):
+                file_located = exists(filename_pattern)
 
-            if file_located:
-                logger.debug(
-                    "File {} in directory {} is available.".format(
-                        filename_pattern, directory
-                    )
-                )
-                break
-            else:
-                if attempt == max_num_of_attempts:
+                if file_located:
                     logger.debug(
-                        "File {} is not available after {} attempt(s).".format(
-                            filename_pattern, attempt
+                        "File {} in directory {} is available.".format(
+                            filename_pattern, directory
                         )
                     )
-                    raise Exception
-
-                time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
-                if OSHelper.is_mac():
-                    type(
-                        text=finder_list_view,
-                        modifier=KeyModifier.CMD,
-                        interval=type_delay,
-                    )
+                    break
+                else:
+                    if attempt == max_num_of_attempts:
+                        logger.debug(
+                            "File {} is not available after {} attempt(s).".format(
+                                filename_pattern, attempt
+                            )
+                        )
+                        raise Exception
+
+                    time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+                    if OSHelper.is_mac():
+                        type(
+                            text=finder_list_view,
+                            modifier=KeyModifier.CMD,
+                            interval=type_delay,
+                        )
+
+            click(filename_pattern)
 
-        click(filename_pattern)
-
-        file_option()
-
-    except Exception:
-        raise APIHelperError(
-            "Could not find file {} in folder {}.".format(filename_pattern, directory)
-        )
-    finally:
-        if OSHelper.is_windows():
-            type(text="w", modifier=KeyModifier.CTRL)
-        elif OSHelper.is_linux():
-            type(text="q", modifier=KeyModifier.CTRL)
-        elif OSHelper.is_mac():
-            type(text="w", modifier=[KeyModifier.CMD, KeyModifier.ALT])
+            file_option()
+
+        except Exception:
+            raise APIHelperError(
+                "Could not find file {} in folder {}.".format(
+                    filename_pattern, directory
+                )
+            )
+        finally:
+            if OSHelper.is_windows():
+                type(text="w", modifier=KeyModifier.CTRL)
+            elif OSHelper.is_linux():
+                type(text="q", modifier=KeyModifier.CTRL)
+            elif OSHelper.is_mac():
+                type(text="w", modifier=[KeyModifier.CMD, KeyModifier.ALT])
 
 
 def copy_file(original, copy):
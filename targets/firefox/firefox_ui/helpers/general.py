@@ -7,9 +7,12 @@ import json
 import time
 import os
 
+import numpy as np
+
 from moziris.api.enums import Alignment
 from moziris.api.errors import APIHelperError
 from moziris.api.errors import FindError
+from moziris.api.errors import ScreenshotError
 from moziris.api.finder.finder import wait, exists, wait_vanish
 from moziris.api.finder.image_search import image_find
 from moziris.api.finder.pattern import Pattern
@@ -24,11 +27,13 @@ from moziris.api.os_helpers import OSHelper, OSPlatform
 from moziris.api.rectangle import Rectangle
 from moziris.api.screen.region import Region
 from moziris.api.screen.screen import Screen
+from moziris.api.screen.screenshot_image import ScreenshotImage
 from moziris.api.settings import Settings
 from moziris.util.arg_parser import get_core_args
 from moziris.util.logger_manager import logger
 from moziris.util.region_utils import RegionUtils
 from targets.firefox.firefox_ui.content_blocking import ContentBlocking
+from targets.firefox.firefox_ui.helpers.chrome_regions import chrome_regions
 from targets.firefox.firefox_ui.helpers.keyboard_shortcuts import (
     new_tab,
     close_tab,
@@ -40,10 +45,18 @@ from targets.firefox.firefox_ui.library_menu import LibraryMenu
 from targets.firefox.firefox_ui.nav_bar import NavBar
 from targets.firefox.firefox_ui.window_controls import MainWindow, AuxiliaryWindow
 from targets.firefox.firefox_ui.location_bar import LocationBar
+from targets.firefox.location_hints import location_hints
 from targets.firefox.settings import FirefoxSettings
 
 INVALID_GENERIC_INPUT = "Invalid input"
 INVALID_NUMERIC_INPUT = "Expected numeric value"
+# Identical consecutive frames after which wait_until_stable considers the UI settled.
+STABLE_FRAMES = 3
+# Seconds wait_until_stable waits for the UI to start changing before it trusts a screen that never changed.
+STABLE_FIRST_CHANGE_TIMEOUT = 0.5
+STABLE_FRAME_INTERVAL = 0.05
+# Only every STABLE_FRAME_STEP-th pixel of every STABLE_FRAME_STEP-th row is compared.
+STABLE_FRAME_STEP = 4
 args = get_core_args()
 
 
@@ -83,15 +96,15 @@ def change_preference(pref_name, value):
     try:
         new_tab()
         navigate("about:config")
-        time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
 
         type(Key.SPACE)
-        time.sleep(Settings.DEFAULT_UI_DELAY)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
         paste(pref_name)
-        time.sleep(Settings.DEFAULT_UI_DELAY)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
         type(Key.TAB)
-        time.sleep(Settings.DEFAULT_UI_DELAY)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
         try:
             retrieved_value = copy_to_clipboard().split("\t")[1]
@@ -129,18 +142,18 @@ def check_preference(pref_name, value):
     select_location_bar()
 
     paste("about:config")
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
     type(Key.ENTER)
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
     type(Key.SPACE)
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
     paste(pref_name)
 
-    time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
     type(Key.TAB)
-    time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
 
     try:
         retrieved_value = copy_to_clipboard().split("\t")[1]
@@ -172,7 +185,7 @@ def click_hamburger_menu_option(option):
     :return: The region created starting from the hamburger menu pattern.
     """
     hamburger_menu_pattern = NavBar.HAMBURGER_MENU
-    region = Screen.UPPER_RIGHT_CORNER
+    region = chrome_regions.get_region("nav_bar", Screen.UPPER_RIGHT_CORNER)
     try:
         region.wait(hamburger_menu_pattern, 5)
         logger.debug("Hamburger menu found.")
@@ -236,7 +249,7 @@ def close_customize_page():
         wait(customize_done_button_pattern, 10)
         logger.debug("Done button found.")
         click(customize_done_button_pattern)
-        time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
     except FindError:
         raise APIHelperError("Can't find the Done button in the page, aborting.")
 
@@ -294,13 +307,13 @@ def confirm_firefox_launch(image=None):
 
 def copy_to_clipboard():
     """Return the value copied to clipboard."""
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
     edit_select_all()
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
     edit_copy()
+    # Copying does not change the screen, the clipboard still needs the fixed delay.
     time.sleep(Settings.DEFAULT_UI_DELAY)
     value = get_clipboard()
-    time.sleep(Settings.DEFAULT_UI_DELAY)
     logger.debug("Copied to clipboard: %s" % value)
     return value
 
@@ -319,45 +332,38 @@ def create_region_for_awesome_bar():
 
 
 def create_region_for_hamburger_menu():
-    """Create region for hamburger menu pop up."""
+    """Open the hamburger menu and create region for its pop up.
+
+    The region is measured the first time the menu is opened in a window and then reused, as long as the last entry
+    of the menu, whose position depends on the menu items, is still inside it.
+    """
 
     hamburger_menu_pattern = NavBar.HAMBURGER_MENU
-    region = Screen.UPPER_RIGHT_CORNER
+    region = chrome_regions.get_region("nav_bar", Screen.UPPER_RIGHT_CORNER)
+    menu_region = chrome_regions.get_region("hamburger_menu")
+    if OSHelper.is_linux():
+        last_menu_pattern = Pattern("quit.png")
+    elif OSHelper.is_mac():
+        last_menu_pattern = Pattern("help.png")
+    else:
+        last_menu_pattern = Pattern("exit.png")
     try:
         region.wait(hamburger_menu_pattern, 5)
         region.click(hamburger_menu_pattern)
         sign_in_to_firefox_pattern = Pattern("sign_in_to_firefox.png")
-        region.wait(sign_in_to_firefox_pattern, 10)
-        if OSHelper.is_linux():
-            quit_menu_pattern = Pattern("quit.png")
-            wait(quit_menu_pattern, 5)
-            return RegionUtils.create_region_from_patterns(
-                None,
-                sign_in_to_firefox_pattern,
-                quit_menu_pattern,
-                None,
-                padding_right=20,
-            )
-        elif OSHelper.is_mac():
-            help_menu_pattern = Pattern("help.png")
-            wait(help_menu_pattern, 5)
-            return RegionUtils.create_region_from_patterns(
-                None,
-                sign_in_to_firefox_pattern,
-                help_menu_pattern,
-                None,
-                padding_right=20,
-            )
-        else:
-            exit_menu_pattern = Pattern("exit.png")
-            wait(exit_menu_pattern, 5)
-            return RegionUtils.create_region_from_patterns(
-                None,
-                sign_in_to_firefox_pattern,
-                exit_menu_pattern,
-                None,
-                padding_right=20,
-            )
+        if menu_region is not None:
+            menu_region.wait(sign_in_to_firefox_pattern, 10)
+            if menu_region.exists(last_menu_pattern, Settings.DEFAULT_UI_DELAY):
+                return menu_region
+            logger.debug("Hamburger menu changed, measuring its region again.")
+
+        Screen.UPPER_RIGHT_CORNER.wait(sign_in_to_firefox_pattern, 10)
+        wait(last_menu_pattern, 5)
+        menu_region = RegionUtils.create_region_from_patterns(
+            None, sign_in_to_firefox_pattern, last_menu_pattern, None, padding_right=20
+        )
+        chrome_regions.add_region("hamburger_menu", menu_region)
+        return menu_region
     except (FindError, ValueError):
         raise APIHelperError(
             "Can't create a region for the hamburger menu, aborting test."
@@ -450,6 +456,8 @@ def full_screen_control(window_type):
                 MainWindow.MAIN_WINDOW_CONTROLS.target_offset(width - 10, height / 2),
                 align=Alignment.TOP_LEFT,
             )
+            location_hints.set_geometry("full_screen")
+        chrome_regions.invalidate()
     else:
         raise APIHelperError("Full screen mode applicable only for MAC")
 
@@ -515,15 +523,15 @@ def get_pref_value(pref_name):
     select_location_bar()
     paste("about:config")
     type(Key.ENTER)
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
     type(Key.SPACE)
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
     paste(pref_name)
-    time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
     type(Key.TAB)
-    time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
 
     try:
         value = copy_to_clipboard().split(";"[0])[1]
@@ -542,7 +550,7 @@ def get_support_info():
     select_location_bar()
     paste("about:support")
     type(Key.ENTER)
-    time.sleep(Settings.DEFAULT_UI_DELAY)
+    wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
 
     try:
         click(copy_raw_data_to_clipboard)
@@ -645,6 +653,8 @@ def minimize_window_control(window_type):
             )
         else:
             click(MainWindow.MINIMIZE_BUTTON)
+        location_hints.set_geometry("minimized")
+        chrome_regions.invalidate()
 
 
 def maximize_window_control(window_type):
@@ -681,6 +691,8 @@ def maximize_window_control(window_type):
             key_up(Key.ALT)
         else:
             click(MainWindow.MAXIMIZE_BUTTON)
+        location_hints.set_geometry("maximized")
+        chrome_regions.invalidate()
 
 
 def navigate(url):
@@ -740,7 +752,7 @@ def open_bookmarks_toolbar():
     navbar_context_menu = home_button.target_offset(horizontal_offset, 0)
 
     try:
-        right_click(navbar_context_menu)
+        right_click(navbar_context_menu, region=chrome_regions.get_region("nav_bar"))
         click(NavBar.ContextMenu.BOOKMARKS_TOOLBAR)
         logger.debug(
             "Click is performed successfully on Bookmarks Toolbar option from navigation bar context menu."
@@ -777,11 +789,13 @@ def open_library_menu(option):
     else:
         value = 4
 
+    nav_bar = chrome_regions.get_region("nav_bar")
     try:
-        wait(library_menu_pattern, 10)
+        wait(library_menu_pattern, 10, nav_bar)
+        library_menu_location = image_find(library_menu_pattern, region=nav_bar)
         region = Region(
-            image_find(library_menu_pattern).x - Screen().width / value,
-            image_find(library_menu_pattern).y,
+            library_menu_location.x - Screen().width / value,
+            library_menu_location.y,
             Screen().width / value,
             Screen().height / value,
         )
@@ -789,11 +803,10 @@ def open_library_menu(option):
     except FindError:
         raise APIHelperError("Can't find the library menu in the page, aborting test.")
     else:
-        time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
         click(library_menu_pattern)
-        time.sleep(Settings.DEFAULT_UI_DELAY_SHORT)
         try:
-            time.sleep(Settings.DEFAULT_UI_DELAY_SHORT)
+            wait_until_stable(region, Settings.DEFAULT_UI_DELAY)
             region.wait(option, 10)
             logger.debug("Option found.")
             region.click(option)
@@ -941,15 +954,16 @@ def reset_mouse():
 def restore_firefox_focus():
     """Restore Firefox focus by clicking the panel near HOME or REFRESH button."""
 
+    nav_bar_region = chrome_regions.get_region("nav_bar")
     try:
-        if exists(NavBar.HOME_BUTTON, Settings.DEFAULT_UI_DELAY):
+        if exists(NavBar.HOME_BUTTON, Settings.DEFAULT_UI_DELAY, nav_bar_region):
             target_pattern = NavBar.HOME_BUTTON
         else:
             target_pattern = NavBar.RELOAD_BUTTON
         w, h = target_pattern.get_size()
         horizontal_offset = w * 1.7
         click_area = target_pattern.target_offset(horizontal_offset, 0)
-        click(click_area)
+        click(click_area, region=nav_bar_region)
     except FindError:
         raise APIHelperError("Could not restore firefox focus.")
 
@@ -990,6 +1004,8 @@ def restore_window_control(window_type):
             if OSHelper.is_linux():
                 reset_mouse()
             click(MainWindow.RESIZE_BUTTON)
+        location_hints.set_geometry("restored")
+        chrome_regions.invalidate()
 
 
 def restore_window_from_taskbar(option=None):
@@ -1025,7 +1041,7 @@ def right_click_and_type(target, delay=None, keyboard_action=None):
     if delay:
         time.sleep(delay)
     else:
-        time.sleep(Settings.DEFAULT_UI_DELAY_LONG)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY_LONG)
     type(text=keyboard_action)
 
 
@@ -1113,6 +1129,52 @@ def select_zoom_menu_option(option_number):
     type(text=Key.ENTER)
 
 
+def wait_until_stable(
+    region: Region = None,
+    timeout: float = Settings.DEFAULT_UI_DELAY_LONG,
+    frames: int = STABLE_FRAMES,
+) -> bool:
+    """Wait until the UI stops changing, for example at the end of an animation.
+
+    Downsampled frames of the region are captured until the last 'frames' ones are identical. The UI often starts
+    changing a little after the input that triggers it, so a screen that did not change yet is only considered
+    settled after STABLE_FIRST_CHANGE_TIMEOUT seconds.
+
+    :param region: Region to watch, the whole screen by default.
+    :param timeout: Maximum number of seconds to wait, usually the fixed delay the call replaces.
+    :param frames: Number of identical consecutive frames.
+    :return: True if the region settled before the timeout, False otherwise.
+    """
+    start_time = time.time()
+    end_time = start_time + timeout
+    first_change_time = start_time + min(STABLE_FIRST_CHANGE_TIMEOUT, timeout)
+    previous = None
+    changed = False
+    identical = 1
+    while True:
+        try:
+            frame = ScreenshotImage(region).get_gray_array()[
+                ::STABLE_FRAME_STEP, ::STABLE_FRAME_STEP
+            ]
+        except ScreenshotError:
+            logger.debug("Unable to capture the screen, waiting %s seconds." % timeout)
+            time.sleep(max(end_time - time.time(), 0))
+            return False
+
+        if previous is not None and np.array_equal(frame, previous):
+            identical += 1
+        else:
+            changed = changed or previous is not None
+            identical = 1
+        if identical >= frames and (changed or time.time() >= first_change_time):
+            return True
+        if time.time() >= end_time:
+            logger.debug("UI did not settle in %s seconds." % timeout)
+            return False
+        previous = frame
+        time.sleep(STABLE_FRAME_INTERVAL)
+
+
 def zoom_with_mouse_wheel(nr_of_times=1, zoom_type=None):
     """Zoom in/Zoom out using the mouse wheel.
 
@@ -1145,7 +1207,7 @@ def zoom_with_mouse_wheel(nr_of_times=1, zoom_type=None):
         else:
             key_up("ctrl")
 
-        time.sleep(Settings.DEFAULT_UI_DELAY)
+        wait_until_stable(timeout=Settings.DEFAULT_UI_DELAY)
     Mouse().move(Location(0, 0))
 
 
@@ -1201,10 +1263,10 @@ def find_in_region_from_pattern(
     except FindError:
         raise APIHelperError("Can't find the outer pattern.")
 
+    outer_location = image_find(outer_pattern)
+
     width, height = outer_pattern.get_size()
-    region = Region(
-        image_find(outer_pattern).x, image_find(outer_pattern).y, width, height
-    )
+    region = Region(outer_location.x, outer_location.y, width, height)
 
     pattern_found = exists(inner_pattern, inner_pattern_timeout, region=region)
 
@@ -15,8 +15,10 @@ from moziris.api.location import Location
 from moziris.api.os_helpers import OSHelper
 from moziris.api.screen.region import click, drag_drop, find, wait, wait_vanish
 from moziris.api.settings import Settings
+from targets.firefox.firefox_ui.helpers.chrome_regions import chrome_regions
 from targets.firefox.firefox_ui.location_bar import LocationBar
 from targets.firefox.firefox_ui.menus import SidebarBookmarks
+from targets.firefox.location_hints import location_hints
 
 logger = logging.getLogger(__name__)
 
@@ -387,6 +389,9 @@ def close_window():
         type(text="w", modifier=[KeyModifier.CMD, KeyModifier.SHIFT])
     else:
         type(text="w", modifier=[KeyModifier.CTRL, KeyModifier.SHIFT])
+    # The window behind it gets the focus, its state is not known.
+    location_hints.set_geometry("closed_window")
+    chrome_regions.invalidate()
 
 
 def force_close():
@@ -409,6 +414,7 @@ def full_screen():
         type(text="f", modifier=[KeyModifier.CMD, KeyModifier.SHIFT])
     else:
         type(text=Key.F11)
+    chrome_regions.invalidate()
 
 
 def maximize_window():
@@ -440,6 +446,8 @@ def maximize_window():
     else:
         type(text=Key.UP, modifier=[KeyModifier.CTRL, KeyModifier.META])
     time.sleep(Settings.DEFAULT_UI_DELAY)
+    location_hints.set_geometry("maximized")
+    chrome_regions.invalidate()
 
 
 def minimize_window():
@@ -451,6 +459,8 @@ def minimize_window():
     else:
         type(text=Key.DOWN, modifier=[KeyModifier.CTRL, KeyModifier.META])
     time.sleep(Settings.DEFAULT_UI_DELAY)
+    location_hints.set_geometry("minimized")
+    chrome_regions.invalidate()
 
 
 def new_tab():
@@ -468,6 +478,8 @@ def new_window():
         type(text="n", modifier=KeyModifier.CMD)
     else:
         type(text="n", modifier=KeyModifier.CTRL)
+    location_hints.set_geometry("new_window")
+    chrome_regions.invalidate()
 
 
 def new_private_window():
@@ -476,6 +488,8 @@ def new_private_window():
         type(text="p", modifier=[KeyModifier.CMD, KeyModifier.SHIFT])
     else:
         type(text="p", modifier=[KeyModifier.CTRL, KeyModifier.SHIFT])
+    location_hints.set_geometry("private_window")
+    chrome_regions.invalidate()
 
 
 def next_tab():
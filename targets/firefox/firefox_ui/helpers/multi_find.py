@@ -0,0 +1,137 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import datetime
+import logging
+import time
+
+import cv2
+from PIL import Image
+
+from moziris.api.errors import ScreenshotError
+from moziris.api.finder.finder import highlight
+from moziris.api.finder.pattern import Pattern
+from moziris.api.location import Location
+from moziris.api.rectangle import Rectangle
+from moziris.api.save_debug_image.save_image import save_debug_image
+from moziris.api.screen.display import DisplayCollection
+from moziris.api.settings import Settings
+from targets.firefox.frame_cache import frame_cache
+from targets.firefox.window_bounds import window_bounds
+
+logger = logging.getLogger(__name__)
+
+FIND_METHOD = cv2.TM_CCOEFF_NORMED
+# Seconds between two rounds of debug images, as in the moziris finder.
+DEBUG_IMAGE_INTERVAL = 1
+
+_last_debug_image_time = datetime.datetime.now()
+
+
+def find_all_of(patterns: list, region: Rectangle = None) -> dict:
+    """Match several Patterns against a single capture of the screen.
+
+    :param patterns: List of Patterns.
+    :param region: Rectangle object in order to minimize the area, the Firefox windows by default.
+    :return: Dictionary of the Patterns found to their Location, in the order of 'patterns'.
+    """
+    global _last_debug_image_time
+    for pattern in patterns:
+        if not isinstance(pattern, Pattern):
+            raise ValueError("Invalid input")
+
+    search_region = region
+    if search_region is None:
+        search_region = window_bounds.get_region()
+    if search_region is None:
+        search_region = DisplayCollection[0].bounds
+    try:
+        stack_image = frame_cache.get_frame(search_region)
+    except ScreenshotError:
+        logger.warning("Screenshot failed.")
+        return {}
+
+    matches = {}
+    debug_locations = {}
+    for pattern in patterns:
+        p_width, p_height = pattern.get_size()
+        if p_width > stack_image.width or p_height > stack_image.height:
+            logger.debug(
+                "Pattern %s is larger than the searched region."
+                % pattern.get_filename()
+            )
+            continue
+        if pattern.similarity == 0.99:
+            res = cv2.matchTemplate(
+                stack_image.get_color_array(), pattern.get_color_array(), FIND_METHOD
+            )
+        else:
+            res = cv2.matchTemplate(
+                stack_image.get_gray_array(), pattern.get_gray_array(), FIND_METHOD
+            )
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        debug_locations[pattern] = []
+        if max_val >= pattern.similarity:
+            matches[pattern] = Location(
+                max_loc[0] + search_region.x, max_loc[1] + search_region.y
+            )
+            debug_locations[pattern].append(Location(max_loc[0], max_loc[1]))
+            # Stored for the region the caller passed, which is the one the following click() looks up.
+            frame_cache.add_location(pattern, region, matches[pattern])
+
+    next_write_time = _last_debug_image_time + datetime.timedelta(
+        seconds=DEBUG_IMAGE_INTERVAL
+    )
+    if Settings.debug_image and datetime.datetime.now() > next_write_time:
+        for pattern, locations in debug_locations.items():
+            save_debug_image(pattern, _DebugCapture(stack_image), locations)
+        _last_debug_image_time = datetime.datetime.now()
+    if Settings.highlight:
+        for pattern, location in matches.items():
+            highlight(region=region, ps=pattern, location=[location])
+    logger.debug(
+        "Found %s of %s pattern(s): %s"
+        % (
+            len(matches),
+            len(patterns),
+            ", ".join(pattern.get_filename() for pattern in matches),
+        )
+    )
+    return matches
+
+
+class _DebugCapture:
+    """Copy of a capture for save_debug_image, which draws on the image it is given while the frame cache may hand
+    the capture to the next find."""
+
+    def __init__(self, stack_image):
+        self._gray_array = stack_image.get_gray_array().copy()
+
+    def get_gray_array(self):
+        return self._gray_array
+
+    def get_gray_image(self):
+        return Image.fromarray(self._gray_array)
+
+
+def find_any(patterns: list, timeout: float = None, region: Rectangle = None) -> dict:
+    """Wait until at least one of several Patterns appears, capturing the screen once per try for all of them.
+
+    Like wait(), the screen is captured at most Settings.wait_scan_rate times per second. A single Pattern is better
+    waited for with wait().
+
+    :param patterns: List of Patterns, for example the alternatives an element can look like.
+    :param timeout: Number as maximum waiting time in seconds.
+    :param region: Rectangle object in order to minimize the area.
+    :return: Dictionary of the Patterns found in the same capture to their Location, empty if none appeared.
+    """
+    if timeout is None:
+        timeout = Settings.auto_wait_timeout
+
+    end_time = time.time() + timeout
+    while True:
+        matches = find_all_of(patterns, region)
+        if matches or time.time() >= end_time:
+            return matches
+        time.sleep(min(1 / Settings.wait_scan_rate, max(end_time - time.time(), 0)))
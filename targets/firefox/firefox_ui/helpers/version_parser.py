@@ -3,6 +3,9 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import logging
+import operator
+from functools import lru_cache
+
 from packaging.version import Version, InvalidVersion
 
 logger = logging.getLogger(__name__)
@@ -10,6 +13,14 @@ logger = logging.getLogger(__name__)
 version_key = "versions"
 operator_key = "operator"
 
+comparison_operators = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+}
+
 
 def find_str(s, char):
     """Finds a substring in a string.
@@ -90,6 +101,34 @@ def parse_versions(input_str):
     return result
 
 
+@lru_cache(maxsize=None)
+def compile_version_condition(running_condition):
+    """Parses a version condition once and returns a predicate for it.
+
+    :param running_condition: Input string. Examples of accepted formats:
+    '60', '>60', '<60', '>=60', '<=60', '!=60', '60-63'. A '60' version will automatically be converted into '60.0.0'.
+    :return: A function that takes a Version and returns True if the condition is met.
+    """
+    version_dict = parse_versions(running_condition)
+    if version_dict is None:
+        return lambda current_version: False
+
+    condition_operator = version_dict[operator_key]
+    versions = version_dict[version_key]
+    if condition_operator in comparison_operators:
+        compare = comparison_operators[condition_operator]
+        return lambda current_version: compare(current_version, versions)
+    if condition_operator == "-":
+        return lambda current_version: versions[0] <= current_version <= versions[1]
+    return lambda current_version: False
+
+
+@lru_cache(maxsize=None)
+def get_version(version):
+    """Returns the parsed Version of a version string, memoized."""
+    return Version(version)
+
+
 def check_version(version, running_condition):
     """
     :param version: Current firefox version.
@@ -97,26 +136,4 @@ def check_version(version, running_condition):
     '60', '>60', '<60', '>=60', '<=60', '!=60', '60-63'. A '60' version will automatically be converted into '60.0.0'.
     :return: returns True if condition between versions is met, otherwise returns False.
     """
-
-    current_version = Version(version)
-    version_dict = parse_versions(running_condition)
-
-    if version_dict is not None:
-        if version_dict[operator_key] == ">":
-            return current_version > version_dict[version_key]
-        if version_dict[operator_key] == "<":
-            return current_version < version_dict[version_key]
-        if version_dict[operator_key] == ">=":
-            return current_version >= version_dict[version_key]
-        if version_dict[operator_key] == "<=":
-            return current_version <= version_dict[version_key]
-        if version_dict[operator_key] == "!=":
-            return current_version != version_dict[version_key]
-        if version_dict[operator_key] == "-":
-            return (
-                version_dict[version_key][0]
-                <= current_version
-                <= version_dict[version_key][1]
-            )
-
-    return False
+    return compile_version_condition(running_condition)(get_version(version))
@@ -0,0 +1,154 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import functools
+import logging
+import time
+from importlib import import_module
+
+from moziris.api.enums import MatchTemplateType
+from moziris.api.location import Location
+from moziris.api.screen.screenshot_image import ScreenshotImage
+from targets.firefox.finder_hooks import wrap_match_template
+
+logger = logging.getLogger(__name__)
+
+# Seconds a capture of the screen is reused for, unless an input event happens first.
+FRAME_VALIDITY = 0.1
+# Seconds the location of a pattern that was just found is reused for, unless an input event happens first.
+LOCATION_VALIDITY = 0.5
+
+# Keyboard and mouse methods that invalidate the caches: module, class and method names.
+INPUT_METHODS = [
+    (
+        "moziris.api.mouse.mouse_controller",
+        "Mouse",
+        ["move", "press", "release", "general_click", "drag_and_drop", "scroll"],
+    ),
+    ("moziris.api.keyboard.keyboard", "_Keyboard", ["key_down", "key_up", "type"]),
+    ("moziris.api.keyboard.keyboard", "_XKeyboard", ["key_down", "key_up", "type"]),
+]
+
+
+class FrameCache:
+    """Shares screen captures and pattern locations between consecutive finds.
+
+    Helpers often search for the same pattern several times in a row, for example exists() followed by click(). Once
+    installed, a capture of a region is reused by the finds made within FRAME_VALIDITY seconds, and the location of a
+    pattern found in the last LOCATION_VALIDITY seconds is returned without searching again. Any keyboard or mouse
+    input empties both caches, so a find never sees the screen as it was before the input.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self.frame_hits = 0
+        self.location_hits = 0
+        self._frames = {}
+        self._locations = {}
+
+    def install(self):
+        """Routes the captures and single matches of the moziris finder through the cache, and wraps the input
+        methods so they invalidate it."""
+        if self.installed:
+            return
+        for module_name in (
+            "moziris.api.finder.image_search",
+            "moziris.api.finder.text_search",
+        ):
+            import_module(module_name).ScreenshotImage = self.get_frame
+
+        wrap_match_template("frame_cache", self._wrap_match_template)
+
+        for module_name, class_name, names in INPUT_METHODS:
+            cls = getattr(import_module(module_name), class_name, None)
+            if cls is None:
+                continue
+            for name in names:
+                method = cls.__dict__.get(name)
+                if isinstance(method, staticmethod):
+                    setattr(cls, name, staticmethod(self._wrap_input(method.__func__)))
+                elif method is not None:
+                    setattr(cls, name, self._wrap_input(method))
+        self.installed = True
+
+    def invalidate(self):
+        """Forgets all captures and locations, for changes of the screen that do not come from an input event."""
+        self._frames.clear()
+        self._locations.clear()
+
+    def get_frame(self, region=None, screen_id: int = None) -> ScreenshotImage:
+        """Returns a capture of the region, reusing a recent one when the cache is installed.
+
+        :param region: Rectangle or Region to capture, the whole screen by default.
+        :param screen_id: Screen of the region.
+        :return: ScreenshotImage object.
+        """
+        if not self.installed:
+            return ScreenshotImage(region=region, screen_id=screen_id)
+
+        key = (_get_region_key(region), screen_id)
+        cached = self._frames.get(key)
+        if cached is not None and time.time() - cached[0] <= FRAME_VALIDITY:
+            self.frame_hits += 1
+            return cached[1]
+        frame = ScreenshotImage(region=region, screen_id=screen_id)
+        self._frames[key] = (time.time(), frame)
+        return frame
+
+    def get_location(self, pattern, region=None):
+        """Returns the location a pattern was found at in the last LOCATION_VALIDITY seconds, None otherwise."""
+        cached = self._locations.get(_get_location_key(pattern, region))
+        if cached is None or time.time() - cached[0] > LOCATION_VALIDITY:
+            return None
+        self.location_hits += 1
+        return Location(cached[1].x, cached[1].y)
+
+    def add_location(self, pattern, region, location: Location):
+        """Stores the location a pattern was just found at."""
+        if self.installed:
+            self._locations[_get_location_key(pattern, region)] = (
+                time.time(),
+                Location(location.x, location.y),
+            )
+
+    def _wrap_match_template(self, match_template):
+        @functools.wraps(match_template)
+        def cached_match_template(
+            pattern, region=None, match_type=MatchTemplateType.SINGLE
+        ):
+            if match_type is not MatchTemplateType.SINGLE:
+                return match_template(pattern, region, match_type)
+            location = self.get_location(pattern, region)
+            if location is not None:
+                return [location]
+            locations = match_template(pattern, region, match_type)
+            if len(locations) > 0:
+                self.add_location(pattern, region, locations[0])
+            return locations
+
+        return cached_match_template
+
+    def _wrap_input(self, method):
+        @functools.wraps(method)
+        def input_method(*args, **kwargs):
+            self.invalidate()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.invalidate()
+
+        return input_method
+
+
+def _get_region_key(region):
+    if region is None:
+        return None
+    return region.x, region.y, region.width, region.height
+
+
+def _get_location_key(pattern, region):
+    return pattern.get_file_path(), pattern.similarity, _get_region_key(region)
+
+
+frame_cache = FrameCache()
@@ -28,4 +28,29 @@ function start()
     {
         progressDiv.style.visibility = "hidden";
     }
+    sendLaunchBeacon(obj);
+}
+
+function sendLaunchBeacon(obj)
+{
+    if (!obj || !obj["beacon"] || !obj["token"])
+    {
+        return;
+    }
+    var url = "http://127.0.0.1:" + obj["beacon"] + "/ready?token=" + obj["token"];
+
+    // Wait for the next two frames, so the page has been painted when Iris is told it is ready.
+    window.requestAnimationFrame(function ()
+    {
+        window.requestAnimationFrame(function ()
+        {
+            if (navigator.sendBeacon)
+            {
+                navigator.sendBeacon(url);
+            } else
+            {
+                new Image().src = url;
+            }
+        });
+    });
 }
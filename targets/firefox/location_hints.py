@@ -0,0 +1,115 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import functools
+import logging
+
+from moziris.api.enums import MatchTemplateType
+from moziris.api.location import Location
+from moziris.api.rectangle import Rectangle
+from moziris.api.screen.display import DisplayCollection
+from targets.firefox.finder_hooks import wrap_match_template
+from targets.firefox.run_log import annotate_run_log
+
+logger = logging.getLogger(__name__)
+
+# Pixels added around the last location of a pattern to form the region searched first.
+HINT_PADDING = 40
+MAXIMIZED = "maximized"
+
+
+class LocationHints:
+    """Remembers where each pattern was last found, to search there before scanning the whole screen.
+
+    Browser chrome such as the hamburger menu or the window controls appears at the same place in almost every
+    test. Once installed, a full screen search for a single match first looks in a region HINT_PADDING pixels
+    around the last location of the pattern, and scans the whole screen only if it is not there. Hints are kept for
+    the session, per pattern, screen resolution and geometry of the main window, which the window helpers set.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self.geometry = MAXIMIZED
+        self.hits = 0
+        self.misses = 0
+        self.scans = 0
+        self._hints = {}
+
+    def install(self):
+        """Routes the single matches of the moziris finder through the hints."""
+        if self.installed:
+            return
+        wrap_match_template("location_hints", self._wrap_match_template)
+        self.installed = True
+
+    def set_geometry(self, geometry: str):
+        """Sets the state of the main window (Ex maximized, restored), hints found in another state are not used.
+
+        :param geometry: Name of the window state.
+        :return: None.
+        """
+        self.geometry = geometry
+
+    def get_stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "scans": self.scans}
+
+    def add_stats(self, stats: dict):
+        """Adds the statistics of another process, such as a parallel worker."""
+        self.hits += stats.get("hits", 0)
+        self.misses += stats.get("misses", 0)
+        self.scans += stats.get("scans", 0)
+
+    def annotate_run_log(self):
+        """Adds the hint statistics to run.json and logs them."""
+        logger.info(
+            "Location hints: %s hit(s), %s miss(es), %s full screen scan(s)."
+            % (self.hits, self.misses, self.scans)
+        )
+        annotate_run_log({"location_hints": self.get_stats()})
+
+    def _wrap_match_template(self, match_template):
+        @functools.wraps(match_template)
+        def hinted_match_template(
+            pattern, region=None, match_type=MatchTemplateType.SINGLE
+        ):
+            if region is not None or match_type is not MatchTemplateType.SINGLE:
+                return match_template(pattern, region, match_type)
+
+            bounds = DisplayCollection[0].bounds
+            key = (
+                pattern.get_file_path(),
+                pattern.similarity,
+                bounds.width,
+                bounds.height,
+                self.geometry,
+            )
+            hint = self._hints.get(key)
+            if hint is not None:
+                locations = match_template(
+                    pattern, _get_hint_region(pattern, hint, bounds), match_type
+                )
+                if len(locations) > 0:
+                    self.hits += 1
+                    return locations
+                self.misses += 1
+
+            self.scans += 1
+            locations = match_template(pattern, region, match_type)
+            if len(locations) > 0:
+                self._hints[key] = Location(locations[0].x, locations[0].y)
+            return locations
+
+        return hinted_match_template
+
+
+def _get_hint_region(pattern, hint: Location, bounds: Rectangle) -> Rectangle:
+    width, height = pattern.get_size()
+    left = max(hint.x - HINT_PADDING, bounds.x)
+    top = max(hint.y - HINT_PADDING, bounds.y)
+    right = min(hint.x + width + HINT_PADDING, bounds.x + bounds.width)
+    bottom = min(hint.y + height + HINT_PADDING, bounds.y + bounds.height)
+    return Rectangle(left, top, right - left, bottom - top)
+
+
+location_hints = LocationHints()
@@ -8,8 +8,9 @@ import logging
 import os
 import requests
 import sqlite3
+import time
+from distutils.dir_util import copy_tree
 from multiprocessing import Process
-import shutil
 
 import pytest
 
@@ -23,19 +24,56 @@ from moziris.util.path_manager import PathManager
 from moziris.util.run_report import create_footer
 from moziris.util.test_assert import create_result_object
 from moziris.configuration.config_parser import get_config_property, validate_section
-from targets.firefox.bug_manager import is_blocked
-from targets.firefox.firefox_app.fx_browser import (
-    FXRunner,
-    FirefoxProfile,
-    FirefoxUtils,
+from targets.firefox.asset_manifest import asset_prefetcher
+from targets.firefox.bug_manager import (
+    blocker_cache,
+    get_blocked_by,
+    get_blocked_by_ids,
+    is_blocked,
+    resolve_blockers,
 )
+from targets.firefox.duration_store import duration_store
+from targets.firefox.firefox_app.browser_reuse import (
+    browser_reuse,
+    group_reusable_items,
+)
+from targets.firefox.errors import BuildStoreError
+from targets.firefox.firefox_app.build_store import build_store
+from targets.firefox.firefox_app.fx_browser import FXRunner, FirefoxUtils
 from targets.firefox.firefox_app.fx_collection import FX_Collection
+from targets.firefox.firefox_app.profile_pool import profile_pool
+from targets.firefox.firefox_app.profile_reaper import profile_reaper
+from targets.firefox.firefox_ui.helpers.chrome_regions import chrome_regions
 from targets.firefox.firefox_ui.helpers.keyboard_shortcuts import (
     quit_firefox,
     release_often_used_keys,
 )
 from targets.firefox.firefox_ui.helpers.version_parser import check_version
-from targets.firefox.testrail.testrail_client import report_test_results
+from targets.firefox.frame_cache import frame_cache
+from targets.firefox.location_hints import MAXIMIZED, location_hints
+from targets.firefox.parallel_runner import (
+    DEFAULT_SCREEN,
+    result_from_dict,
+    result_to_dict,
+    run_workers,
+    save_worker_results,
+    select_worker_items,
+)
+from targets.firefox.pattern_bundle import pattern_bundle
+from targets.firefox.results_journal import load_journal, results_journal
+from targets.firefox.retry_queue import DEFAULT_RETRY_BUDGET, retry_queue
+from targets.firefox.scheduler import (
+    format_duration,
+    load_durations,
+    order_longest_first,
+    parse_shard,
+    run_progress,
+    select_shard,
+)
+from targets.firefox.sleep_auditor import sleep_auditor, summarize_sleep_audits
+from targets.firefox.testrail.testrail_reporter import testrail_reporter
+from targets.firefox.tracer import summarize_traces, tracer
+from targets.firefox.window_bounds import window_bounds
 
 logger = logging.getLogger(__name__)
 logger.info("Loading test images...")
@@ -47,6 +85,7 @@ core_args = get_core_args()
 class Target(BaseTarget):
     test_run_object_list = []
     index = 1
+    skipped_tests = 0
     total_tests = None
 
     def __init__(self):
@@ -55,6 +94,7 @@ class Target(BaseTarget):
         target_args = self.get_target_args()
         self.target_name = "Firefox"
         self.process_list = []
+        self.launch_times = {}
         self.cc_settings = [
             {
                 "name": "firefox",
@@ -92,6 +132,33 @@ class Target(BaseTarget):
         )
         if target_args.treeherder:
             Settings.debug_image = False
+        build_store.offline = target_args.offline
+        build_store.archive_url = target_args.archive_url
+        blocker_cache.offline = target_args.offline
+        profile_pool.enabled = target_args.pool
+        profile_pool.keep_profiles = target_args.save
+        browser_reuse.keep_profiles = target_args.save
+        if target_args.durations:
+            duration_store.path = target_args.durations
+        if target_args.journal:
+            results_journal.path = target_args.journal
+        retry_queue.enabled = target_args.retry == "deferred"
+        # The finder wrappers compose in the order of finder_hooks.MATCH_TEMPLATE_LAYERS.
+        if target_args.window_bounds:
+            window_bounds.install()
+        if target_args.frame_cache:
+            frame_cache.install()
+        if target_args.location_hints:
+            location_hints.install()
+        if target_args.pattern_bundle:
+            pattern_bundle.path = target_args.pattern_bundle
+        # Tests load their images from the bundle built by tools/build_pattern_bundle.py, when there is one.
+        pattern_bundle.install()
+        retry_queue.budget = target_args.retry_budget * 60
+        if target_args.worker_items:
+            # Reports and run data clean up are handled by the coordinator.
+            core_args.email = False
+            core_args.clear = False
 
     def get_target_args(self):
         parser = argparse.ArgumentParser(
@@ -132,6 +199,141 @@ class Target(BaseTarget):
             default=False,
             action="store_true",
         )
+        parser.add_argument(
+            "--offline",
+            help="Use Firefox builds and blocking issue states from the local caches only",
+            default=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            "--archive_url",
+            help="Base URL, file:// URL or local directory of a Firefox archive mirror",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--pool",
+            help="Prepare the profile of the next test while the current test runs",
+            default=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            "--frame_cache",
+            help="Reuse screen captures and pattern locations between finds until the next input event",
+            default=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            "--location_hints",
+            help="Search for each pattern around its last location before scanning the whole screen",
+            default=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            "--window_bounds",
+            help="On Linux, search only the Firefox windows when no region is given",
+            default=False,
+            action="store_true",
+        )
+        parser.add_argument(
+            "--schedule",
+            help="Test order: collection order, or longest expected duration first",
+            choices=["collection", "longest"],
+            default="collection",
+        )
+        parser.add_argument(
+            "--durations",
+            help="Path to the test duration database, defaults to data/durations.db in the working directory",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--shard",
+            help="Run one of N duration balanced parts of the suite (Ex. 2/4)",
+            type=parse_shard,
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--shard_durations",
+            help="JSON file of test durations used to compute the shards, static costs are used without it",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--retry",
+            help="Retry failed tests right away, or at the end of the session in a fresh browser",
+            choices=["immediate", "deferred"],
+            default="immediate",
+        )
+        parser.add_argument(
+            "--retry_budget",
+            help="Maximum time spent on deferred retries, in minutes",
+            type=int,
+            action="store",
+            default=DEFAULT_RETRY_BUDGET,
+        )
+        parser.add_argument(
+            "--resume",
+            help="Run directory of an interrupted run, tests finished in that run are not run again",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--workers",
+            help="Number of parallel workers, each on its own Xvfb display (Linux only)",
+            type=int,
+            action="store",
+            default=1,
+        )
+        parser.add_argument(
+            "--worker_screen",
+            help="Screen geometry of the worker displays",
+            action="store",
+            default=DEFAULT_SCREEN,
+        )
+        parser.add_argument(
+            "--trace",
+            help="Write a trace of the UI primitives called by each test to the run directory",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--audit_sleeps",
+            help="Measure the fixed sleeps of the tests and report the ones that could wait for a condition",
+            action="store_true",
+            default=False,
+        )
+        parser.add_argument(
+            "--worker_wm",
+            help="Window manager command started on each worker display",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--worker_items",
+            help="Internal: file with the tests assigned to a worker",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--worker_results",
+            help="Internal: file the worker writes its results to",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--journal",
+            help="Internal: results journal the worker appends to",
+            action="store",
+            default=None,
+        )
+        parser.add_argument(
+            "--pattern_bundle",
+            help="Internal: pattern image bundle of the coordinator",
+            action="store",
+            default=None,
+        )
         return parser.parse_known_args()[0]
 
     def create_ci_report(self):
@@ -143,7 +345,13 @@ class Target(BaseTarget):
         for line in lines:
             if "Passed:" in line and "Total time:" in line:
                 result_str = line
-        ci_report_str = "TinderboxPrint: Iris Summary<br/>%s\n" % result_str
+        shard_str = ""
+        if target_args.shard:
+            shard_str = " (shard %s/%s)" % target_args.shard
+        ci_report_str = "TinderboxPrint: Iris Summary%s<br/>%s\n" % (
+            shard_str,
+            result_str,
+        )
 
         for test in self.completed_tests:
             if test.outcome == "FAILED" or test.outcome == "ERROR":
@@ -156,7 +364,7 @@ class Target(BaseTarget):
                 ci_report_str += "TEST-UNEXPECTED-%s | " % fail_str
                 for section in temp_path:
                     ci_report_str += "%s | " % section
-                ci_report_str += "%s | %s\n" % (test_name, test.message)
+                ci_report_str += "%s | %s%s\n" % (test_name, test.message, shard_str)
         logger.info("CI Test results:\n%s" % ci_report_str)
 
     def send_json_report(self):
@@ -250,17 +458,56 @@ class Target(BaseTarget):
         except IOError:
             logger.critical("Unable to launch local web server, aborting Iris.")
             exit(1)
+        except BuildStoreError as e:
+            logger.critical("%s Aborting Iris." % e)
+            exit(1)
         logger.info("Loading more test images...")
 
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_configure(self, config):
+        max_runs = getattr(config.option, "max_runs", None)
+        if retry_queue.enabled and max_runs:
+            # Failed tests are queued for the end of the session instead of being rerun right away.
+            retry_queue.max_runs = max_runs
+            config.option.max_runs = 1
+
     def pytest_sessionfinish(self, session):
         BaseTarget.pytest_sessionfinish(self, session)
+        retry_queue.annotate_run_log()
+        if location_hints.installed:
+            location_hints.annotate_run_log()
+        if target_args.trace:
+            summary = summarize_traces(PathManager.get_current_run_dir())
+            if summary:
+                logger.info(summary)
+        if target_args.audit_sleeps:
+            summary = summarize_sleep_audits(PathManager.get_current_run_dir())
+            if summary:
+                logger.info(summary)
         for process in self.process_list:
             logger.info("Terminating process.")
             process.terminate()
             process.join()
         logger.debug("Finishing Firefox session")
-        if target_args.report:
-            report_test_results(self)
+        asset_prefetcher.stop()
+        browser_reuse.close()
+        profile_pool.close()
+        profile_reaper.drain(timeout=60)
+        profile_reaper.annotate_run_log()
+        if frame_cache.installed:
+            logger.debug(
+                "Frame cache: %s capture(s) and %s location(s) reused."
+                % (frame_cache.frame_hits, frame_cache.location_hits)
+            )
+        duration_store.close()
+        results_journal.close()
+        if target_args.worker_results:
+            save_worker_results(self, target_args.worker_results)
+            if self.clean_run is not True:
+                exit(1)
+            return
+        if self.args.report:
+            testrail_reporter.finish(self.completed_tests)
         if target_args.sendjson:
             self.send_json_report()
         if target_args.treeherder:
@@ -268,88 +515,257 @@ class Target(BaseTarget):
         if self.clean_run is not True:
             exit(1)
 
+    def pytest_collection_modifyitems(self, session, config, items):
+        if target_args.worker_items:
+            # The coordinator already removed the tests that must not run.
+            select_worker_items(config, items, target_args.worker_items)
+        else:
+            group_reusable_items(items)
+            if target_args.shard:
+                self.select_shard(config, items)
+            if self.args.report:
+                testrail_reporter.start(
+                    self.values["fx_build_id"], self.values["fx_version"], items
+                )
+            if target_args.resume:
+                self.restore_results(config, items)
+            self.deselect_skipped_items(config, items)
+            if target_args.schedule == "longest":
+                order_longest_first(items, duration_store.get_estimates())
+        if target_args.workers < 2:
+            # The coordinator of parallel workers runs no test, the workers prefetch their own images.
+            run_progress.start(items, duration_store.get_estimates())
+            asset_prefetcher.start(items)
+        if target_args.audit_sleeps:
+            sleep_auditor.install()
+        if target_args.trace:
+            # The test modules are imported by now, so their copies of the primitives are wrapped too.
+            tracer.install()
+
+    def select_shard(self, config, items):
+        """Removes the tests that belong to other shards from the session.
+
+        Shards are computed before skipped tests are removed, because blocking issue states may differ between
+        machines while the collected tests don't.
+        """
+        if target_args.shard_durations:
+            try:
+                estimates = load_durations(target_args.shard_durations)
+            except (IOError, ValueError) as e:
+                logger.critical("Unable to read shard durations: %s" % e)
+                exit(1)
+        else:
+            # The local duration history differs between machines, which would compute different shards.
+            logger.info(
+                "No shard durations file, shards are computed from static costs."
+            )
+            estimates = {}
+
+        load, selected, deselected = select_shard(items, target_args.shard, estimates)
+        logger.info(
+            "Running shard %s/%s: %s of %s test(s), expected run time %s."
+            % (
+                target_args.shard[0],
+                target_args.shard[1],
+                len(selected),
+                len(items),
+                format_duration(load),
+            )
+        )
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+    def restore_results(self, config, items):
+        """Restores the results journaled by an interrupted run and removes the tests it finished from the session.
+
+        Tests whose last attempt failed with retries left run again. All journaled attempts are carried over to the
+        journal of this run, so it can be resumed as well.
+        """
+        try:
+            journal = load_journal(target_args.resume)
+        except IOError as e:
+            logger.critical("Unable to resume run %s: %s" % (target_args.resume, e))
+            exit(1)
+
+        selected = []
+        restored = []
+        for item in items:
+            attempts = journal.get(item.nodeid)
+            if not attempts:
+                selected.append(item)
+                continue
+
+            for attempt in attempts:
+                results_journal.append(attempt)
+            retry_queue.outcomes[item.nodeid] = {
+                "first_outcome": attempts[0].get("outcome"),
+                "final_outcome": attempts[-1].get("outcome"),
+                "attempts": len(attempts),
+            }
+            test_result = result_from_dict(item, attempts[-1])
+            if (
+                test_result.outcome in ("FAILED", "ERROR")
+                and retry_queue.enabled
+                and len(attempts) < retry_queue.max_runs
+            ):
+                selected.append(item)
+                continue
+
+            if len(attempts) > 1:
+                test_path = str(test_result.file_name)
+                self.rerun_tests[test_path] = len(attempts) - 1
+                if test_result.outcome == "PASSED":
+                    self.flaky_tests.append((test_path, len(attempts) - 1))
+            if test_result.outcome in ("FAILED", "ERROR"):
+                self.clean_run = False
+            self.completed_tests.append(test_result)
+            restored.append(item)
+
+        logger.info(
+            "Resuming run %s: %s test(s) restored, %s test(s) left."
+            % (target_args.resume, len(restored), len(selected))
+        )
+        run_dir = target_args.resume
+        if os.path.isdir(run_dir):
+            for entry in os.listdir(run_dir):
+                if entry != "workers" and os.path.isdir(os.path.join(run_dir, entry)):
+                    copy_tree(
+                        os.path.join(run_dir, entry),
+                        os.path.join(PathManager.get_current_run_dir(), entry),
+                    )
+        if restored:
+            # Restored results don't count as tests run in this session.
+            Target.skipped_tests += len(restored)
+            config.hook.pytest_deselected(items=restored)
+            items[:] = selected
+
+    def pytest_runtestloop(self, session):
+        if target_args.workers > 1 and not target_args.worker_items and session.items:
+            if OSHelper.is_linux():
+                app = FX_Collection.get(self.args.firefox, core_args.locale)
+                try:
+                    run_workers(
+                        self,
+                        session,
+                        target_args.workers,
+                        app.path,
+                        core_args.port,
+                        target_args.worker_screen,
+                        target_args.worker_wm,
+                    )
+                    return True
+                except OSError as e:
+                    logger.error(
+                        "Unable to start parallel workers, running serially: %s" % e
+                    )
+            else:
+                logger.warning("Parallel workers are only supported on Linux.")
+
+        if not retry_queue.enabled:
+            return None
+        return retry_queue.run_session(session, duration_store.get_estimates())
+
+    def add_test_result(self, test_result):
+        if not retry_queue.add_result(self, test_result):
+            BaseTarget.add_test_result(self, test_result)
+        results_journal.append(result_to_dict(test_result))
+        testrail_reporter.add_result(test_result)
+
     def pytest_runtest_setup(self, item):
         BaseTarget.pytest_runtest_setup(self, item)
+        frame_cache.invalidate()
+        asset_prefetcher.advance(str(item.fspath))
+        tracer.start()
+        sleep_auditor.start()
         if OSHelper.is_mac():
             mouse_reset()
-        if item.name == "run" and not core_args.override:
-            skip_reason_list = []
-            values = item.own_markers[0].kwargs
-            is_disabled = (
-                "enabled" in values
-                and not values.get("enabled")
-                and not core_args.override
-            )
-            is_excluded = "exclude" in values and OSHelper.get_os() in values.get(
-                "exclude"
-            )
-            incorrect_locale = (
-                "locale" in values and core_args.locale not in values.get("locale")
-            )
-            incorrect_platform = "platform" in values and OSHelper.get_os() not in values.get(
-                "platform"
-            )
-            fx_version = self.values.get("fx_version")
-            incorrect_fx_version = "fx_version" in values and not check_version(
-                fx_version, values.get("fx_version")
-            )
 
-            if is_disabled:
-                skip_reason_list.append("Test is disabled")
+    def get_skip_reasons(self, item):
+        """Returns the reasons why a collected test must not run, based on its markers."""
+        skip_reason_list = []
+        if item.name != "run" or core_args.override or not item.own_markers:
+            return skip_reason_list
 
-            if is_excluded:
-                skip_reason_list.append(
-                    "Test is excluded for {}".format(OSHelper.get_os())
-                )
+        values = item.own_markers[0].kwargs
+        is_disabled = "enabled" in values and not values.get("enabled")
+        is_excluded = "exclude" in values and OSHelper.get_os() in values.get(
+            "exclude"
+        )
+        incorrect_locale = "locale" in values and core_args.locale not in values.get(
+            "locale"
+        )
+        incorrect_platform = "platform" in values and OSHelper.get_os() not in values.get(
+            "platform"
+        )
+        fx_version = self.values.get("fx_version")
+        incorrect_fx_version = "fx_version" in values and not check_version(
+            fx_version, values.get("fx_version")
+        )
 
-            if "blocked_by" in values:
-                bug_id = ""
-                platform = OSHelper.get_os()
-                if type(values.get("blocked_by")) is str:
-                    bug_id = values.get("blocked_by")
-                elif type(values.get("blocked_by")) is dict:
-                    try:
-                        bug_id = values.get("blocked_by")["id"]
-                        platform = values.get("blocked_by")["platform"]
-                    except KeyError as e:
-                        logger.debug("Missing key in blocked_by field: %s" % e)
-                logger.debug("Looking up bug #%s..." % bug_id)
-                blocked_platform = OSHelper.get_os() in platform
-                logger.debug("Test has blocking issue: %s" % is_blocked(bug_id))
-                logger.debug("Test is blocked on this platform: %s" % blocked_platform)
-                if is_blocked(bug_id) and blocked_platform:
-                    skip_reason_list.append(
-                        "Test is blocked by [{}] on this platform.".format(bug_id)
-                    )
+        if is_disabled:
+            skip_reason_list.append("Test is disabled")
 
-            if incorrect_locale:
-                skip_reason_list.append(
-                    "Test doesn't support locale [{}]".format(core_args.locale)
-                )
+        if is_excluded:
+            skip_reason_list.append("Test is excluded for {}".format(OSHelper.get_os()))
 
-            if incorrect_platform:
+        if "blocked_by" in values:
+            bug_id, platform = get_blocked_by(values)
+            logger.debug("Looking up bug #%s..." % bug_id)
+            blocked = is_blocked(bug_id)
+            blocked_platform = OSHelper.get_os() in platform
+            logger.debug("Test has blocking issue: %s" % blocked)
+            logger.debug("Test is blocked on this platform: %s" % blocked_platform)
+            if blocked and blocked_platform:
                 skip_reason_list.append(
-                    "Test doesn't support platform [{}]".format(OSHelper.get_os())
+                    "Test is blocked by [{}] on this platform.".format(bug_id)
                 )
 
-            if incorrect_fx_version:
-                skip_reason_list.append(
-                    "Test doesn't support Firefox version [{}]".format(fx_version)
-                )
+        if incorrect_locale:
+            skip_reason_list.append(
+                "Test doesn't support locale [{}]".format(core_args.locale)
+            )
 
-            if len(skip_reason_list) > 0:
-                logger.info(
-                    "Test skipped: - [{}]: {} Reason(s): {}".format(
-                        item.nodeid.split(":")[0],
-                        values.get("description"),
-                        ", ".join(skip_reason_list),
-                    )
+        if incorrect_platform:
+            skip_reason_list.append(
+                "Test doesn't support platform [{}]".format(OSHelper.get_os())
+            )
+
+        if incorrect_fx_version:
+            skip_reason_list.append(
+                "Test doesn't support Firefox version [{}]".format(fx_version)
+            )
+        return skip_reason_list
+
+    def deselect_skipped_items(self, config, items):
+        """Removes the tests that must not run from the session and records them as skipped."""
+        if core_args.override:
+            return
+        resolve_blockers(get_blocked_by_ids(items))
+        selected = []
+        deselected = []
+        for item in items:
+            skip_reason_list = self.get_skip_reasons(item)
+            if len(skip_reason_list) == 0:
+                selected.append(item)
+                continue
+
+            logger.info(
+                "Test skipped: - [{}]: {} Reason(s): {}".format(
+                    item.nodeid.split(":")[0],
+                    item.own_markers[0].kwargs.get("description"),
+                    ", ".join(skip_reason_list),
                 )
-                test_instance = (item, "SKIPPED", None)
-                test_result = create_result_object(test_instance, 0, 0)
-                self.add_test_result(test_result)
-                Target.index += 1
-                pytest.skip(item)
+            )
+            test_instance = (item, "SKIPPED", None)
+            test_result = create_result_object(test_instance, 0, 0)
+            self.add_test_result(test_result)
+            deselected.append(item)
+
+        if deselected:
+            Target.skipped_tests += len(deselected)
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
 
     def pytest_runtest_call(self, item):
         """ called to execute the test ``item``. """
@@ -363,44 +779,86 @@ class Target(BaseTarget):
         )
         try:
             if item.funcargs["firefox"]:
-                item.funcargs["firefox"].start()
+                start_time = time.time()
+                # Searches made while the browser launches are not bounded by the previous test's windows.
+                window_bounds.set_runner(None)
+                with tracer.span("launch"):
+                    browser_reuse.start(item, item.funcargs["firefox"])
+                location_hints.set_geometry(MAXIMIZED)
+                chrome_regions.invalidate()
+                window_bounds.set_runner(item.funcargs["firefox"])
+                self.launch_times[item.nodeid] = time.time() - start_time
         except (AttributeError, KeyError, sqlite3.OperationalError):
             pass
 
     def pytest_runtest_teardown(self, item):
         BaseTarget.pytest_runtest_teardown(self, item)
+        start_time = time.time()
+        with tracer.span("teardown"):
+            self.close_firefox(item)
+        window_bounds.set_runner(None)
+        self.record_duration(item, time.time() - start_time)
+        tracer.stop()
+        sleep_auditor.stop()
+
+    def record_duration(self, item, teardown_time: float):
+        """Stores the duration of the test attempt that just finished and updates the run ETA."""
+        launch_time = self.launch_times.pop(item.nodeid, None)
+        if len(self.completed_tests) == 0 or self.completed_tests[-1].item is not item:
+            return
+        test_result = self.completed_tests[-1]
+        if test_result.outcome == "SKIPPED" or test_result.test_duration is None:
+            return
+        duration_store.record(
+            item.nodeid,
+            test_result.outcome,
+            test_result.test_duration,
+            launch_time,
+            teardown_time,
+            self.values.get("fx_version"),
+            OSHelper.get_os().value,
+        )
+        run_progress.finish(item.nodeid, test_result.test_duration + teardown_time)
 
+    def close_firefox(self, item):
+        """Closes the browser of a test and hands its profile to the reaper, unless the next test reuses it."""
         try:
+            passed = (
+                len(self.completed_tests) > 0
+                and self.completed_tests[-1].item is item
+                and self.completed_tests[-1].outcome == "PASSED"
+                and not retry_queue.is_retry(item)
+            )
+            if browser_reuse.keep(item, item.funcargs["firefox"], passed):
+                return
+
+            process_id = None
             if not OSHelper.is_windows():
                 if (
                     item.funcargs["firefox"].runner
                     and item.funcargs["firefox"].runner.process_handler
                 ):
                     quit_firefox()
-                    status = item.funcargs["firefox"].runner.process_handler.wait(10)
-                    if status is None:
-                        item.funcargs["firefox"].browser.runner.stop()
+                    process_id = item.funcargs["firefox"].runner.process_handler.pid
             else:
-                item.funcargs["firefox"].stop()
+                quit_firefox()
+                process_id = FXRunner.process.pid
+
+            profile_path = None
             if not target_args.save:
                 profile_instance = item.funcargs["firefox"].profile
                 if os.path.exists(profile_instance.profile):
-                    try:
-                        shutil.rmtree(profile_instance.profile, ignore_errors=True)
-                    except sqlite3.OperationalError:
-                        pass
+                    profile_path = profile_instance.profile
                 else:
                     logger.error("Invalid Path: %s" % profile_instance.profile)
 
+            profile_reaper.reap(profile_path, process_id)
+
         except (AttributeError, KeyError):
             pass
 
     @pytest.fixture()
     def firefox(self, request):
-        profile_type = request.node.own_markers[0].kwargs.get("profile")
-        preferences = request.node.own_markers[0].kwargs.get("preferences")
-        profile = FirefoxProfile.make_profile(profile_type, preferences)
-
         fx = target_args.firefox
         locale = get_core_args().locale
         app = FX_Collection.get(fx, locale)
@@ -409,6 +867,12 @@ class Target(BaseTarget):
             FX_Collection.add(fx, locale)
             app = FX_Collection.get(fx, locale)
 
+        reused_runner = browser_reuse.acquire(request.node, app)
+        if reused_runner is not None:
+            profile = reused_runner.profile
+        else:
+            profile = profile_pool.acquire(request.node, app)
+
         if target_args.update_channel:
             FirefoxUtils.set_update_channel_pref(app.path, target_args.update_channel)
 
@@ -419,7 +883,9 @@ class Target(BaseTarget):
                 logger.debug(Target.completed_tests[-1].file_name)
                 logger.debug(request.node.fspath)
                 is_rerun = True
-        if not is_rerun and len(Target.completed_tests) > 0:
+        if retry_queue.is_retry(request.node):
+            is_rerun = True
+        if not is_rerun and len(Target.completed_tests) > Target.skipped_tests:
             logger.debug("Incrementing index")
             Target.index += 1
 
@@ -429,4 +895,8 @@ class Target(BaseTarget):
             "title": os.path.basename(request.node.fspath),
         }
 
-        return FXRunner(app, profile, args)
+        fx_runner = FXRunner(app, profile, args)
+        if reused_runner is not None:
+            fx_runner.runner = getattr(reused_runner, "runner", None)
+            fx_runner.reused = True
+        return fx_runner
@@ -0,0 +1,374 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from distutils.dir_util import copy_tree
+from distutils.spawn import find_executable
+
+from moziris.util.path_manager import PathManager
+from moziris.util.test_assert import TestResult
+from targets.firefox.duration_store import duration_store
+from targets.firefox.location_hints import location_hints
+from targets.firefox.pattern_bundle import pattern_bundle
+from targets.firefox.results_journal import results_journal
+from targets.firefox.retry_queue import retry_queue
+from targets.firefox.scheduler import balance_items, format_duration
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREEN = "1920x1080x24"
+FIRST_DISPLAY = 99
+DISPLAY_START_TIMEOUT = 10
+WORKER_POLL_INTERVAL = 1
+PROGRESS_INTERVAL = 60
+
+
+class XvfbDisplay:
+    """A private virtual X display, owned by one worker.
+
+    Screen capture, mouse, keyboard and clipboard all go through the X server named by DISPLAY, so a worker running
+    on its own display can't see or disturb the windows of another worker.
+    """
+
+    def __init__(self, screen: str = DEFAULT_SCREEN, window_manager: str = None):
+        self.screen = screen
+        self.window_manager = window_manager
+        self.number = None
+        self.process = None
+        self.wm_process = None
+
+    @property
+    def name(self):
+        return ":%s" % self.number
+
+    def start(self, first_display: int = FIRST_DISPLAY):
+        xvfb = find_executable("Xvfb")
+        if xvfb is None:
+            raise OSError("Xvfb not found, it is required to run parallel workers.")
+
+        self.number = _get_free_display(first_display)
+        cmd = [xvfb, self.name, "-screen", "0", self.screen, "-nolisten", "tcp"]
+        logger.debug('Starting virtual display with command "%s"' % " ".join(cmd))
+        self.process = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        socket = "/tmp/.X11-unix/X%s" % self.number
+        end_time = time.time() + DISPLAY_START_TIMEOUT
+        while not os.path.exists(socket):
+            if self.process.poll() is not None or time.time() > end_time:
+                self.stop()
+                raise OSError("Unable to start virtual display %s" % self.name)
+            time.sleep(0.1)
+
+        if self.window_manager:
+            self.wm_process = subprocess.Popen(
+                self.window_manager.split(),
+                env=dict(os.environ, DISPLAY=self.name),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        return self
+
+    def stop(self):
+        for process in (self.wm_process, self.process):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(DISPLAY_START_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        self.wm_process = None
+        self.process = None
+
+
+class Worker:
+    """One Iris child process running a subset of the collected tests on its own display."""
+
+    def __init__(self, index: int, items: list, display: XvfbDisplay, port: int):
+        self.index = index
+        self.items = items
+        self.display = display
+        self.port = port
+        self.process = None
+        self.work_dir = os.path.join(
+            PathManager.get_working_dir(), "workers", str(index)
+        )
+        worker_dir = os.path.join(
+            PathManager.get_current_run_dir(), "workers", str(index)
+        )
+        os.makedirs(worker_dir, exist_ok=True)
+        self.items_file = os.path.join(worker_dir, "items.txt")
+        self.results_file = os.path.join(worker_dir, "results.json")
+        self.log_file = os.path.join(worker_dir, "worker.log")
+
+    def start(self, build_path: str):
+        with open(self.items_file, "w") as f:
+            f.write("\n".join(item.nodeid for item in self.items))
+
+        # Later options override earlier ones, so the worker keeps every argument of the coordinator
+        # except for its own display, port, working directory and test list. Durations go to the coordinator's store.
+        cmd = [sys.executable, sys.argv[0]] + sys.argv[1:]
+        cmd += [
+            "-n",
+            "-p",
+            str(self.port),
+            "-w",
+            self.work_dir,
+            "-f",
+            build_path,
+            "--workers",
+            "1",
+            "--worker_items",
+            self.items_file,
+            "--worker_results",
+            self.results_file,
+            "--durations",
+            duration_store.get_path(),
+            "--journal",
+            results_journal.get_path(),
+            "--pattern_bundle",
+            pattern_bundle.get_path(),
+        ]
+        env = dict(os.environ, DISPLAY=self.display.name)
+        logger.info(
+            "Starting worker %s on display %s with %s test(s)."
+            % (self.index, self.display.name, len(self.items))
+        )
+        logger.debug('Worker command: "%s"' % " ".join(cmd))
+        with open(self.log_file, "w") as log:
+            self.process = subprocess.Popen(
+                cmd, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.is_running():
+            self.process.terminate()
+            try:
+                self.process.wait(DISPLAY_START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def partition_items(items: list, workers: int, estimates: dict = None) -> list:
+    """Splits the collected items into one list per worker, so all workers are expected to finish at the same time.
+
+    Expected durations come from the duration store, consecutive tests that can share a browser are kept on the same
+    worker. Each list starts with its longest tests.
+
+    :return: List of (expected seconds, items) tuples, one per worker that has tests to run.
+    """
+    if estimates is None:
+        estimates = duration_store.get_estimates()
+    return [
+        (load, partition)
+        for load, partition in balance_items(items, workers, estimates)
+        if partition
+    ]
+
+
+def run_workers(
+    target,
+    session,
+    workers: int,
+    build_path: str,
+    port: int,
+    screen: str,
+    window_manager: str = None,
+):
+    """Runs the collected items on parallel workers and merges their results into the target.
+
+    :param target: The Firefox target acting as coordinator.
+    :param session: The pytest session with the collected items.
+    :param workers: Number of workers.
+    :param build_path: Path to the Firefox binary the workers test.
+    :param port: Local web server port of the coordinator, workers use the following ones.
+    :param screen: Xvfb screen geometry (Ex. 1920x1080x24).
+    :param window_manager: Optional window manager command started on each display.
+    :return: None.
+    """
+    pool = []
+    try:
+        next_display = FIRST_DISPLAY
+        partitions = partition_items(session.items, workers)
+        for index, (load, items) in enumerate(partitions):
+            display = XvfbDisplay(screen, window_manager).start(next_display)
+            next_display = display.number + 1
+            worker = Worker(index, items, display, port + index + 1)
+            worker.start(build_path)
+            pool.append(worker)
+            logger.info(
+                "Worker %s expected run time: %s." % (index, format_duration(load))
+            )
+
+        start_time = last_progress = time.time()
+        expected_end = start_time + max(load for load, _ in partitions)
+        running = list(pool)
+        while running:
+            time.sleep(WORKER_POLL_INTERVAL)
+            if time.time() - last_progress >= PROGRESS_INTERVAL:
+                last_progress = time.time()
+                logger.info(
+                    "ETA: %s left, %s worker(s) running, %s elapsed."
+                    % (
+                        format_duration(max(expected_end - last_progress, 0)),
+                        len(running),
+                        format_duration(last_progress - start_time),
+                    )
+                )
+            for worker in list(running):
+                if not worker.is_running():
+                    running.remove(worker)
+                    logger.info(
+                        "Worker %s finished with exit code %s, %s worker(s) still running."
+                        % (worker.index, worker.process.returncode, len(running))
+                    )
+    finally:
+        for worker in pool:
+            worker.stop()
+            worker.display.stop()
+
+    results = {}
+    for worker in pool:
+        results.update(_load_worker_results(target, worker))
+
+    for item in session.items:
+        test_result = results.get(item.nodeid)
+        if test_result is not None:
+            target.completed_tests.append(test_result)
+
+
+def select_worker_items(config, items: list, items_file: str):
+    """Restricts a worker session to the items assigned to it by the coordinator, in the coordinator's order."""
+    with open(items_file, "r") as f:
+        order = [line.strip() for line in f if line.strip()]
+    positions = {node_id: position for position, node_id in enumerate(order)}
+
+    selected = [item for item in items if item.nodeid in positions]
+    deselected = [item for item in items if item.nodeid not in positions]
+    selected.sort(key=lambda item: positions[item.nodeid])
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = selected
+
+
+def save_worker_results(target, results_file: str):
+    """Writes the results of a worker session for the coordinator."""
+    data = {
+        "clean_run": target.clean_run,
+        "run_dir": PathManager.get_current_run_dir(),
+        "tests": [
+            result_to_dict(test_result) for test_result in target.completed_tests
+        ],
+        "rerun_tests": target.rerun_tests,
+        "flaky_tests": target.flaky_tests,
+        "outcomes": retry_queue.outcomes,
+        "retry_time": retry_queue.retry_time,
+        "location_hints": location_hints.get_stats(),
+    }
+    with open(results_file, "w") as f:
+        json.dump(data, f, indent=True)
+
+
+def result_to_dict(test_result: TestResult) -> dict:
+    return {
+        "node_id": test_result.item.nodeid,
+        "outcome": test_result.outcome,
+        "message": _to_str(test_result.message),
+        "actual": _to_str(test_result.actual),
+        "expected": _to_str(test_result.expected),
+        "error": _to_str(test_result.error),
+        "line": _to_str(test_result.line),
+        "traceback": _to_str(test_result.traceback),
+        "node_name": _to_str(test_result.node_name),
+        "file_name": _to_str(test_result.file_name),
+        "test_duration": test_result.test_duration,
+    }
+
+
+def result_from_dict(item, data: dict) -> TestResult:
+    node_name = data.get("node_name")
+    if data.get("outcome") in ("PASSED", "SKIPPED"):
+        node_name = item.__dict__.get("fspath")
+    return TestResult(
+        item,
+        node_name,
+        data.get("outcome"),
+        data.get("message"),
+        data.get("actual"),
+        data.get("expected"),
+        data.get("file_name"),
+        data.get("error"),
+        data.get("line"),
+        data.get("traceback"),
+        data.get("test_duration"),
+    )
+
+
+def _load_worker_results(target, worker):
+    items = {item.nodeid: item for item in worker.items}
+    results = {}
+    try:
+        with open(worker.results_file, "r") as f:
+            data = json.load(f)
+    except (IOError, ValueError) as e:
+        logger.error("No results from worker %s: %s" % (worker.index, e))
+        data = {"clean_run": False, "tests": []}
+
+    for test in data.get("tests"):
+        item = items.get(test.get("node_id"))
+        if item is not None:
+            results[item.nodeid] = result_from_dict(item, test)
+
+    for node_id, item in items.items():
+        if node_id not in results:
+            results[node_id] = TestResult(
+                item,
+                str(item.fspath),
+                "ERROR",
+                "Worker %s exited with code %s before running the test."
+                % (worker.index, worker.process.returncode),
+                None,
+                None,
+                str(item.fspath),
+                "WorkerError",
+                None,
+                None,
+                0,
+            )
+            target.clean_run = False
+
+    if not data.get("clean_run"):
+        target.clean_run = False
+    target.rerun_tests.update(data.get("rerun_tests", {}))
+    target.flaky_tests.extend(tuple(test) for test in data.get("flaky_tests", []))
+    retry_queue.outcomes.update(data.get("outcomes", {}))
+    retry_queue.retry_time = max(retry_queue.retry_time, data.get("retry_time", 0))
+    location_hints.add_stats(data.get("location_hints", {}))
+
+    run_dir = data.get("run_dir")
+    if run_dir and os.path.isdir(run_dir):
+        copy_tree(run_dir, PathManager.get_current_run_dir())
+    return results
+
+
+def _get_free_display(first_display: int) -> int:
+    number = first_display
+    while os.path.exists("/tmp/.X%s-lock" % number) or os.path.exists(
+        "/tmp/.X11-unix/X%s" % number
+    ):
+        number += 1
+    return number
+
+
+def _to_str(value):
+    return None if value is None else str(value)
@@ -0,0 +1,251 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import inspect
+import json
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from moziris.api.finder import pattern as pattern_module
+from moziris.api.os_helpers import OSHelper
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILE = "patterns_%s"
+# Folders of the repository holding pattern images.
+IMAGE_ROOTS = ["targets", "tests"]
+
+
+class PatternBundle:
+    """Memory-mapped bundle of the decoded pattern images of one platform.
+
+    The bundle is built by tools/build_pattern_bundle.py into the 'data' folder of the working directory: a .bin
+    file with the BGR pixels of every image one after the other, and a .json index of their offset and shape by path.
+    Once installed, a Pattern loading an image that is in the bundle reads its pixels from the mapped file instead of
+    decoding the PNG, and Pattern objects no longer inspect the whole call stack when they are created. Images whose
+    size or modification time differ from the ones recorded when the bundle was built are read from disk, and a
+    bundle built from another checkout of the repository is not used.
+
+    Images can also be preloaded ahead of their first use, see asset_manifest. A preloaded image is handed to the
+    Pattern that loads it and then forgotten, or discarded if no Pattern loaded it.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.installed = False
+        self.hits = 0
+        self._index = None
+        self._data = None
+        self._hooked = False
+        self._preloaded = {}
+
+    def get_path(self, platform: str = None):
+        """Returns the path of the bundle files, without extension."""
+        if self.path is None:
+            if platform is None:
+                platform = OSHelper.get_os().value
+            self.path = os.path.join(
+                PathManager.get_working_dir(), "data", BUNDLE_FILE % platform
+            )
+        return self.path
+
+    def install(self) -> bool:
+        """Maps the bundle of the current platform, if it was built, and makes new Patterns load from it.
+
+        :return: True if the bundle is used.
+        """
+        if self.installed:
+            return True
+        path = self.get_path()
+        if not (os.path.exists(path + ".json") and os.path.exists(path + ".bin")):
+            logger.debug("No pattern bundle found at %s" % path)
+            return False
+        try:
+            with open(path + ".json", "r") as f:
+                index = json.load(f)
+            if index.get("module_dir") != _get_module_dir():
+                logger.warning(
+                    "Pattern bundle %s was built from another checkout, rebuild it with "
+                    "tools/build_pattern_bundle.py." % path
+                )
+                return False
+            self._index = index["images"]
+            self._data = np.memmap(path + ".bin", dtype=np.uint8, mode="r")
+        except (IOError, ValueError, KeyError, AttributeError) as e:
+            logger.warning("Unable to load pattern bundle %s: %s" % (path, e))
+            return False
+
+        self._install_hooks()
+        self.installed = True
+        logger.debug("Loaded pattern bundle with %s image(s)." % len(self._index))
+        return True
+
+    def preload(self, path: str) -> bool:
+        """Decodes an image before a Pattern loads it.
+
+        :param path: Path to the image file.
+        :return: True if the image was decoded.
+        """
+        key = _get_image_key(path)
+        if key in self._preloaded:
+            return True
+        image = self._get_bundled_image(key, path)
+        if image is None:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            return False
+        self._install_hooks()
+        self._preloaded[key] = image
+        return True
+
+    def discard(self, path: str) -> bool:
+        """Forgets a preloaded image that was not used.
+
+        :param path: Path to the image file.
+        :return: True if the image was still preloaded.
+        """
+        return self._preloaded.pop(_get_image_key(path), None) is not None
+
+    def get_image(self, path: str):
+        """Returns the BGR pixels of an image that was preloaded or is in the bundle.
+
+        :param path: Path to the image file.
+        :return: np array, or None if the image is not available or changed since the bundle was built.
+        """
+        key = _get_image_key(path)
+        image = self._preloaded.pop(key, None)
+        if image is not None:
+            self.hits += 1
+            return image
+        image = self._get_bundled_image(key, path)
+        if image is not None:
+            self.hits += 1
+        return image
+
+    def _install_hooks(self):
+        if not self._hooked:
+            pattern_module.cv2 = _BundledCv2(self)
+            pattern_module.inspect = _CallerInspect()
+            self._hooked = True
+
+    def _get_bundled_image(self, key, path):
+        if self._index is None:
+            return None
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, shape, file_size, mtime = entry
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size != file_size or stat.st_mtime != mtime:
+            return None
+        size = shape[0] * shape[1] * shape[2]
+        return np.array(self._data[offset : offset + size]).reshape(shape)
+
+
+class _BundledCv2:
+    """Stands in for cv2 in moziris.api.finder.pattern, reading preloaded or bundled color images when possible."""
+
+    def __init__(self, bundle: PatternBundle):
+        self._bundle = bundle
+
+    def __getattr__(self, name):
+        return getattr(cv2, name)
+
+    def imread(self, path, flags=cv2.IMREAD_COLOR):
+        if flags == cv2.IMREAD_COLOR:
+            image = self._bundle.get_image(path)
+            if image is not None:
+                return image
+        return cv2.imread(path, flags)
+
+
+class _CallerInspect:
+    """Stands in for inspect in moziris.api.finder.pattern, where Pattern() only reads the file name of its caller.
+
+    inspect.stack() reads the source lines of every frame of the stack, which is most of the cost of creating one of
+    the thousands of Patterns defined when the test modules are imported.
+    """
+
+    def __getattr__(self, name):
+        return getattr(inspect, name)
+
+    @staticmethod
+    def stack(context: int = 1):
+        frames = [sys._getframe(1), sys._getframe(2)]
+        return [(frame, frame.f_code.co_filename) for frame in frames]
+
+
+def _get_module_dir() -> str:
+    return os.path.realpath(PathManager.get_module_dir())
+
+
+def _get_image_key(path: str) -> str:
+    relative_path = os.path.relpath(
+        os.path.realpath(path), PathManager.get_module_dir()
+    )
+    return relative_path.replace(os.sep, "/")
+
+
+def get_platform_folders(platform: str) -> list:
+    """Returns the image folders Patterns look into on a platform."""
+    if platform == "win":
+        return ["win", "win7", "common"]
+    return [platform, "common"]
+
+
+def build_bundle(platform: str, path: str) -> int:
+    """Decodes the pattern images of a platform into a bundle.
+
+    :param platform: Platform folder name (Ex linux).
+    :param path: Path of the bundle files, without extension.
+    :return: Number of images in the bundle.
+    """
+    folders = get_platform_folders(platform)
+    module_dir = PathManager.get_module_dir()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    index = {}
+    offset = 0
+    with open(path + ".bin.tmp", "wb") as data:
+        for root_name in IMAGE_ROOTS:
+            for root, _, files in os.walk(os.path.join(module_dir, root_name)):
+                parts = os.path.relpath(root, module_dir).split(os.sep)
+                if "images" not in parts or parts.index("images") + 1 >= len(parts):
+                    continue
+                if parts[parts.index("images") + 1] not in folders:
+                    continue
+                for file_name in sorted(files):
+                    if not file_name.endswith(".png"):
+                        continue
+                    image_path = os.path.join(root, file_name)
+                    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+                    if image is None:
+                        logger.warning("Unable to decode %s" % image_path)
+                        continue
+                    data.write(image.tobytes())
+                    stat = os.stat(image_path)
+                    index[_get_image_key(image_path)] = [
+                        offset,
+                        list(image.shape),
+                        stat.st_size,
+                        stat.st_mtime,
+                    ]
+                    offset += image.size
+
+    with open(path + ".json.tmp", "w") as f:
+        json.dump({"module_dir": _get_module_dir(), "images": index}, f)
+    os.replace(path + ".bin.tmp", path + ".bin")
+    os.replace(path + ".json.tmp", path + ".json")
+    return len(index)
+
+
+pattern_bundle = PatternBundle()
@@ -0,0 +1,86 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+import threading
+import time
+
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "results.ndjson"
+
+
+class ResultsJournal:
+    """Append-only log of test results, written to disk as each test attempt completes.
+
+    Every attempt is one JSON line, flushed and synced before the next test starts, so the results of a run survive
+    a crash of the machine. Appends are single writes on a file opened in append mode, which lets parallel workers
+    share the journal of their coordinator.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def get_path(self):
+        if self.path is None:
+            self.path = os.path.join(PathManager.get_current_run_dir(), JOURNAL_FILE)
+        return self.path
+
+    def append(self, data: dict):
+        """Writes the result of one test attempt to the journal.
+
+        :param data: The attempt's result, see parallel_runner.result_to_dict.
+        :return: None.
+        """
+        data.setdefault("recorded", time.time())
+        line = (json.dumps(data, sort_keys=True) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                if self._fd is None:
+                    path = self.get_path()
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+                os.write(self._fd, line)
+                os.fsync(self._fd)
+            except OSError as e:
+                logger.warning("Unable to write results journal: %s" % e)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def load_journal(run_dir: str) -> dict:
+    """Reads the journal of a previous run.
+
+    A line cut short by a crash is ignored.
+
+    :param run_dir: Run directory of the previous run, or the path to its journal file.
+    :return: Dictionary of node id to the list of its attempts, oldest first.
+    """
+    journal_file = run_dir
+    if os.path.isdir(run_dir):
+        journal_file = os.path.join(run_dir, JOURNAL_FILE)
+
+    attempts = {}
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                logger.debug("Ignoring incomplete journal line: %s" % line.strip())
+                continue
+            attempts.setdefault(data.get("node_id"), []).append(data)
+    return attempts
+
+
+results_journal = ResultsJournal()
@@ -0,0 +1,162 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import time
+
+from targets.firefox.run_log import annotate_run_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_BUDGET = 20
+
+
+class RetryQueue:
+    """Retries failed tests at the end of the session instead of right after they fail.
+
+    A failed test goes to the back of the queue and the rest of the suite keeps running. Once every test ran, the
+    queue is replayed in a fresh browser, as many times as the 'max_tries' core argument allows. The total time spent
+    on retries is capped by the budget: no retry starts once it is spent, or when the test is expected to outlast it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.max_runs = 1
+        self.budget = DEFAULT_RETRY_BUDGET * 60
+        self.outcomes = {}
+        self.retry_time = 0.0
+        self._queue = []
+        self._retrying = None
+
+    def add_result(self, target, test_result) -> bool:
+        """Tracks the outcome of a test attempt and queues the test again if it failed.
+
+        A retry result replaces the result of the previous attempt in the target, and updates its rerun and flaky
+        test lists the way immediate reruns do.
+
+        :param target: The Firefox target.
+        :param test_result: Result of the attempt.
+        :return: True if the result was stored, False if the target must store it.
+        """
+        item = test_result.item
+        node_id = item.nodeid
+        outcome = self.outcomes.get(node_id)
+        if outcome is None:
+            outcome = {"first_outcome": test_result.outcome, "attempts": 0}
+            self.outcomes[node_id] = outcome
+        outcome["final_outcome"] = test_result.outcome
+        outcome["attempts"] += 1
+
+        if (
+            self.enabled
+            and test_result.outcome in ("FAILED", "ERROR")
+            and outcome["attempts"] < self.max_runs
+        ):
+            self._queue.append(item)
+
+        if item is not self._retrying:
+            return False
+
+        for index, previous in enumerate(target.completed_tests):
+            if previous.item is item:
+                del target.completed_tests[index]
+                break
+        test_path = str(test_result.file_name)
+        target.rerun_tests[test_path] = target.rerun_tests.get(test_path, 0) + 1
+        if test_result.outcome == "PASSED":
+            target.flaky_tests.append((test_path, target.rerun_tests[test_path]))
+        target.completed_tests.append(test_result)
+        return True
+
+    def is_retry(self, item) -> bool:
+        return item is self._retrying
+
+    def run_session(self, session, estimates: dict) -> bool:
+        """Runs the collected tests like the default pytest loop, then the queued retries.
+
+        :param session: The pytest session.
+        :param estimates: Dictionary of node id to expected seconds, see DurationStore.get_estimates.
+        :return: True, the session has been run.
+        """
+        if (
+            session.testsfailed
+            and not session.config.option.continue_on_collection_errors
+        ):
+            raise session.Interrupted(
+                "%d errors during collection" % session.testsfailed
+            )
+        if session.config.option.collectonly:
+            return True
+
+        for index, item in enumerate(session.items):
+            next_item = (
+                session.items[index + 1] if index + 1 < len(session.items) else None
+            )
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=next_item)
+            if session.shouldfail:
+                raise session.Failed(session.shouldfail)
+            if session.shouldstop:
+                raise session.Interrupted(session.shouldstop)
+        self.run(session, estimates)
+        return True
+
+    def run(self, session, estimates: dict):
+        """Runs the queued tests until they pass, run out of attempts, or the budget is spent.
+
+        :param session: The pytest session.
+        :param estimates: Dictionary of node id to expected seconds, see DurationStore.get_estimates.
+        :return: None.
+        """
+        start_time = time.time()
+        while self._queue:
+            items, self._queue = self._queue, []
+            logger.info("Retrying %s failed test(s)." % len(items))
+            for index, item in enumerate(items):
+                remaining = self.budget - (time.time() - start_time)
+                expected = estimates.get(item.nodeid, 0)
+                if remaining <= 0 or expected > remaining:
+                    logger.warning(
+                        "Retry budget spent, not retrying %s test(s)."
+                        % (len(items) - index)
+                    )
+                    for skipped in items[index:]:
+                        self.outcomes[skipped.nodeid]["retry_skipped"] = True
+                    self._queue = []
+                    break
+
+                next_item = items[index + 1] if index + 1 < len(items) else None
+                self._retrying = item
+                try:
+                    item.config.hook.pytest_runtest_protocol(
+                        item=item, nextitem=next_item
+                    )
+                finally:
+                    self._retrying = None
+                    self.retry_time = time.time() - start_time
+                if session.shouldfail:
+                    raise session.Failed(session.shouldfail)
+                if session.shouldstop:
+                    raise session.Interrupted(session.shouldstop)
+
+    def annotate_run_log(self):
+        """Adds the first attempt and final outcome of each test to run.json, keyed by test node id."""
+        failed = ("FAILED", "ERROR")
+        meta = {
+            "retry_policy": "deferred" if self.enabled else "immediate",
+            "retry_time": self.retry_time,
+            "first_attempt_failures": len(
+                [o for o in self.outcomes.values() if o["first_outcome"] in failed]
+            ),
+            "recovered": len(
+                [
+                    o
+                    for o in self.outcomes.values()
+                    if o["first_outcome"] in failed and o["final_outcome"] == "PASSED"
+                ]
+            ),
+        }
+        annotate_run_log(meta, tests={"outcomes": self.outcomes})
+
+
+retry_queue = RetryQueue()
@@ -0,0 +1,33 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+
+def annotate_run_log(meta: dict, tests: dict = None):
+    """Adds entries to the run.json of the current run, once moziris has written it.
+
+    :param meta: Entries added to the meta section.
+    :param tests: Entries added to the tests section.
+    :return: None.
+    """
+    run_file = os.path.join(PathManager.get_current_run_dir(), "run.json")
+    try:
+        with open(run_file, "r") as f:
+            run_data = json.load(f)
+    except (IOError, ValueError) as e:
+        logger.debug("Unable to read run log: %s" % e)
+        return
+
+    run_data["meta"].update(meta)
+    if tests:
+        run_data["tests"].update(tests)
+    with open(run_file, "w") as f:
+        json.dump(run_data, f, sort_keys=True, indent=True)
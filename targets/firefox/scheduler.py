@@ -0,0 +1,213 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+import json
+import logging
+import statistics
+import time
+from functools import lru_cache
+
+from targets.firefox.firefox_app.browser_reuse import get_reuse_group
+
+logger = logging.getLogger(__name__)
+
+# Static cost of a test that never ran: browser launch and teardown, plus some time per line of test code.
+STATIC_BASE_DURATION = 15
+STATIC_LINE_DURATION = 0.5
+
+
+def get_item_costs(items: list, estimates: dict) -> dict:
+    """Returns the expected duration of each item in seconds.
+
+    Tests without history get a static cost based on the size of their test file, scaled so the median static cost
+    of the tests with history matches their median recorded duration.
+
+    :param items: Collected test items.
+    :param estimates: Dictionary of node id to seconds, see DurationStore.get_estimates.
+    :return: Dictionary of node id to seconds.
+    """
+    static_costs = {item.nodeid: get_static_cost(str(item.fspath)) for item in items}
+    known = [item.nodeid for item in items if item.nodeid in estimates]
+    scale = 1
+    if known:
+        scale = statistics.median(estimates[node_id] for node_id in known) / max(
+            statistics.median(static_costs[node_id] for node_id in known), 1
+        )
+    return {
+        item.nodeid: estimates.get(item.nodeid, static_costs[item.nodeid] * scale)
+        for item in items
+    }
+
+
+@lru_cache()
+def get_static_cost(test_file: str) -> float:
+    """Returns the expected duration of a test from the number of code lines in its file."""
+    lines = 0
+    try:
+        with open(test_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    lines += 1
+    except IOError:
+        pass
+    return STATIC_BASE_DURATION + lines * STATIC_LINE_DURATION
+
+
+def get_scheduling_units(items: list, costs: dict) -> list:
+    """Splits the items into runs of consecutive tests that can share a browser, paired with their total cost.
+
+    A run is the unit of scheduling, so reordering or partitioning never breaks a browser reuse sequence.
+    """
+    runs = []
+    for item in items:
+        group = get_reuse_group(item)
+        if runs and group is not None and get_reuse_group(runs[-1][-1]) == group:
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    return [(sum(costs[item.nodeid] for item in run), run) for run in runs]
+
+
+def order_longest_first(items: list, estimates: dict):
+    """Sorts the items in place, longest expected duration first.
+
+    Ties keep the collection order, so the result is the same on every machine sharing the same history.
+    """
+    units = get_scheduling_units(items, get_item_costs(items, estimates))
+    units.sort(key=lambda unit: -unit[0])
+    items[:] = [item for _, run in units for item in run]
+
+
+def balance_items(items: list, bins: int, estimates: dict) -> list:
+    """Splits the items into lists of about the same expected duration.
+
+    Scheduling units are assigned longest first to the list with the smallest total so far (greedy LPT), which keeps
+    the longest list within 4/3 of the best possible split.
+
+    :param items: Collected test items.
+    :param bins: Number of lists.
+    :param estimates: Dictionary of node id to seconds, see DurationStore.get_estimates.
+    :return: List of (expected seconds, items) tuples, one per list, including empty ones.
+    """
+    units = get_scheduling_units(items, get_item_costs(items, estimates))
+    units.sort(key=lambda unit: -unit[0])
+
+    loads = [0.0] * bins
+    partitions = [[] for _ in range(bins)]
+    for cost, run in units:
+        index = loads.index(min(loads))
+        loads[index] += cost
+        partitions[index].extend(run)
+    return list(zip(loads, partitions))
+
+
+def select_shard(items: list, shard: tuple, estimates: dict) -> tuple:
+    """Returns the items that belong to one shard of the suite, and the other items.
+
+    The split only depends on the collected items and the estimates, so every machine given the same tests and the
+    same durations file computes the same shards. Selected items keep their collection order.
+
+    :param items: Collected test items.
+    :param shard: Tuple of (shard number starting at 1, number of shards).
+    :param estimates: Dictionary of node id to seconds.
+    :return: Tuple of (expected seconds, selected items, deselected items).
+    """
+    index, count = shard
+    load, partition = balance_items(items, count, estimates)[index - 1]
+    node_ids = {item.nodeid for item in partition}
+    selected = [item for item in items if item.nodeid in node_ids]
+    deselected = [item for item in items if item.nodeid not in node_ids]
+    return load, selected, deselected
+
+
+def parse_shard(value: str) -> tuple:
+    """Parses a shard argument (Ex. 2/4) into a tuple of (shard number, number of shards)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Shard must look like i/N, got %s" % value)
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            "Shard number must be between 1 and %s, got %s" % (count, value)
+        )
+    return index, count
+
+
+def load_durations(durations_file: str) -> dict:
+    """Reads a JSON file of node id to seconds, as written by tools/export_durations.py."""
+    with open(durations_file, "r") as f:
+        return {node_id: float(seconds) for node_id, seconds in json.load(f).items()}
+
+
+class RunProgress:
+    """Estimates the time left in a run from the expected durations of the tests that didn't finish yet.
+
+    The estimate is scaled by how much faster or slower than expected the finished tests were.
+    """
+
+    def __init__(self):
+        self.costs = {}
+        self.finished = set()
+        self.expected = 0.0
+        self.actual = 0.0
+        self.start_time = None
+
+    def start(self, items: list, estimates: dict):
+        self.costs = get_item_costs(items, estimates)
+        self.finished = set()
+        self.expected = 0.0
+        self.actual = 0.0
+        self.start_time = time.time()
+        logger.info(
+            "Expected run time: %s for %s test(s)."
+            % (format_duration(sum(self.costs.values())), len(self.costs))
+        )
+
+    def finish(self, node_id: str, duration: float):
+        """Marks a test as finished and logs the time left.
+
+        :param node_id: Node id of the test.
+        :param duration: Seconds the attempt took, retries are added to the first attempt.
+        :return: None.
+        """
+        if node_id not in self.costs:
+            return
+        self.actual += duration
+        if node_id in self.finished:
+            return
+        self.finished.add(node_id)
+        self.expected += self.costs[node_id]
+
+        seconds, count = self.get_eta()
+        if count == 0:
+            return
+        logger.info(
+            "ETA: %s left for %s test(s), %s elapsed."
+            % (
+                format_duration(seconds),
+                count,
+                format_duration(time.time() - self.start_time),
+            )
+        )
+
+    def get_eta(self) -> tuple:
+        """Returns a tuple of (expected seconds left, number of tests left)."""
+        remaining = [
+            cost for node, cost in self.costs.items() if node not in self.finished
+        ]
+        ratio = self.actual / self.expected if self.expected > 0 else 1
+        return sum(remaining) * ratio, len(remaining)
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "%sh%02dm" % (hours, minutes)
+    return "%sm%02ds" % (minutes, seconds)
+
+
+run_progress = RunProgress()
@@ -0,0 +1,195 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from moziris.api.screen.screenshot_image import ScreenshotImage
+from moziris.util.path_manager import PathManager
+from targets.firefox import tracer
+from targets.firefox.tracer import load_attempt_files, write_attempt_file
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FILE = "sleep_audit.json"
+SUMMARY_SIZE = 20
+# Seconds between two screen captures during an audited sleep.
+SAMPLE_INTERVAL = 0.1
+# Pixels that must differ between two captures for the screen to count as changed, so a blinking caret does not.
+CHANGED_PIXELS = 200
+# Modules whose wrappers of time.sleep can stand between a call site and the auditor.
+WRAPPER_FILES = [__file__, tracer.__file__]
+
+
+class SleepAuditor:
+    """Measures the fixed sleeps of the tests and whether the screen changed while they ran.
+
+    Once installed, time.sleep is replaced by a version that, for calls made from Iris code by the test thread while
+    a test runs, captures the screen every SAMPLE_INTERVAL seconds until the sleep is over. The time after the last
+    change of the screen is idle: a condition wait could have returned that much earlier. The calls are aggregated
+    per call site (file:line), and every test attempt writes its sites to a sleep_audit.json next to its debug images.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self.sites = None
+        self._sleep = time.sleep
+        self._thread = None
+        self._auditing = False
+
+    def install(self):
+        if self.installed:
+            return
+        self._sleep = time.sleep
+        time.sleep = self.sleep
+        self.installed = True
+
+    def start(self):
+        """Starts auditing the sleeps of the current thread."""
+        if self.installed:
+            self.sites = {}
+            self._thread = threading.current_thread()
+
+    def stop(self):
+        """Stops auditing and writes the sleep sites of the test attempt.
+
+        :return: Path to the audit file, or None if nothing was audited.
+        """
+        if self.sites is None:
+            return None
+        sites, self.sites = self.sites, None
+        return write_attempt_file(
+            AUDIT_FILE, {"test": os.environ.get("CURRENT_TEST"), "sites": sites}
+        )
+
+    def sleep(self, seconds: float):
+        """Sleeps for the given seconds, auditing the call when it comes from Iris code during a test."""
+        if (
+            self.sites is None
+            or self._auditing
+            or threading.current_thread() is not self._thread
+        ):
+            return self._sleep(seconds)
+
+        site = _get_call_site(_get_caller_frame(sys._getframe(1)))
+        if site is None:
+            return self._sleep(seconds)
+
+        self._auditing = True
+        try:
+            start = time.perf_counter()
+            deadline = start + seconds
+            last_change = None
+            previous = _grab_frame()
+            while previous is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._sleep(min(SAMPLE_INTERVAL, remaining))
+                current = _grab_frame()
+                if current is not None and _has_changed(previous, current):
+                    last_change = time.perf_counter() - start
+                previous = current
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                self._sleep(remaining)
+            slept = time.perf_counter() - start
+        finally:
+            self._auditing = False
+
+        stats = self.sites.setdefault(
+            site, {"calls": 0, "slept": 0.0, "idle": 0.0, "changed": 0}
+        )
+        stats["calls"] += 1
+        stats["slept"] += slept
+        stats["idle"] += slept - (last_change or 0)
+        stats["changed"] += 1 if last_change is not None else 0
+
+
+def _get_caller_frame(frame):
+    """Returns the first frame of the stack that is not a wrapper of time.sleep (Ex the tracer's)."""
+    wrapper_files = [os.path.realpath(file_name) for file_name in WRAPPER_FILES]
+    while (
+        frame is not None
+        and os.path.realpath(frame.f_code.co_filename) in wrapper_files
+    ):
+        frame = frame.f_back
+    return frame
+
+
+def _get_call_site(frame):
+    """Returns the file:line of a call made from Iris code, relative to the Iris module directory."""
+    if frame is None:
+        return None
+    file_name = os.path.relpath(frame.f_code.co_filename, PathManager.get_module_dir())
+    if file_name.startswith(".."):
+        return None
+    return "%s:%s" % (file_name, frame.f_lineno)
+
+
+def _grab_frame():
+    try:
+        return ScreenshotImage().get_gray_array()
+    except Exception as e:
+        logger.debug("Unable to capture the screen: %s" % e)
+        return None
+
+
+def _has_changed(previous, current) -> bool:
+    if previous.shape != current.shape:
+        return True
+    return np.count_nonzero(previous != current) >= CHANGED_PIXELS
+
+
+def summarize_sleep_audits(run_dir: str, size: int = SUMMARY_SIZE) -> str:
+    """Builds a report of the sleep sites of a run, ranked by the idle time a condition wait would save.
+
+    :param run_dir: Run directory holding the audit files.
+    :param size: Number of sites listed.
+    :return: The report as a string, empty if no audit was found.
+    """
+    sites = {}
+    for audit in load_attempt_files(run_dir, AUDIT_FILE):
+        for site, stats in audit.get("sites", {}).items():
+            total = sites.setdefault(
+                site, {"calls": 0, "slept": 0.0, "idle": 0.0, "changed": 0, "tests": 0}
+            )
+            for key in ("calls", "slept", "idle", "changed"):
+                total[key] += stats.get(key, 0)
+            total["tests"] += 1
+    if not sites:
+        return ""
+
+    lines = [
+        "Fixed sleeps: %s call(s) at %s site(s), %.1fs slept, %.1fs idle."
+        % (
+            sum(stats["calls"] for stats in sites.values()),
+            len(sites),
+            sum(stats["slept"] for stats in sites.values()),
+            sum(stats["idle"] for stats in sites.values()),
+        ),
+        "Sleep sites that could wait for a condition (tests, calls, screen changed, slept, idle):",
+    ]
+    ranked = sorted(sites.items(), key=lambda entry: -entry[1]["idle"])[:size]
+    for site, stats in ranked:
+        lines.append(
+            "  %5s %6s %5s%% %9.1fs %9.1fs  %s"
+            % (
+                stats["tests"],
+                stats["calls"],
+                int(100 * stats["changed"] / stats["calls"]),
+                stats["slept"],
+                stats["idle"],
+                site,
+            )
+        )
+    return "\n".join(lines)
+
+
+sleep_auditor = SleepAuditor()
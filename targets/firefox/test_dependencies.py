@@ -23,6 +23,9 @@ from targets.firefox.local_web.web_links.local_web import LocalWeb
 from targets.firefox.firefox_ui.utils import Utils
 from targets.firefox.firefox_ui.helpers.general import *
 from targets.firefox.firefox_ui.helpers.history_test_utils import *
+from targets.firefox.firefox_ui.helpers.multi_find import find_any, find_all_of
+from targets.firefox.firefox_ui.helpers.chrome_regions import chrome_regions
+from targets.firefox.window_bounds import window_bounds
 from targets.firefox.firefox_ui.tabs import Tabs
 from targets.firefox.firefox_ui.download_dialog import DownloadDialog
 from targets.firefox.firefox_ui.about_preferences import AboutPreferences
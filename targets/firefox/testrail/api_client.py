@@ -1,19 +1,29 @@
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
-import base64
-from base64 import b64encode
 import json
-from urllib import request, error
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from targets.firefox.errors import TestRailError
 
+REQUEST_TIMEOUT = 60
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 1
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
 
 class APIClient:
     def __init__(self, url: str):
         self.user = ""
         self.password = ""
         self.__url = url
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(max_retries=_get_retry())
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
 
     def send_get(self, uri: str):
 
@@ -32,44 +42,58 @@ class APIClient:
         """
         return self.__send_request("POST", uri, data)
 
+    def close(self):
+        self.__session.close()
+
     def __send_request(self, method: str, uri: str, payload=None):
 
-        """
+        """Sends a request over the client's keep-alive session.
+
+        GET requests failing with a connection error, rate limiting (HTTP 429, honoring Retry-After) or a server error
+        are retried with an exponential backoff before an error is raised. POST requests are sent once.
+
         :param method: HTTP Method (GET,POST)
         :param uri: TestRail URL
         :param payload: JsonObject submitted on the POST request
         :return: response Object
         """
         url = self.__url + uri
-        auth = str(
-            base64.b64encode(bytes("%s:%s" % (self.user, self.password), "utf-8")),
-            "ascii",
-        ).strip()
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": "Basic %s" % auth,
-            "cache-control": "no-cache",
-        }
-
-        if method == "POST":
-            api_request = request.Request(
-                url, data=json.dumps(payload).encode("utf-8"), headers=headers
-            )
-        else:
-            api_request = request.Request(url, data=None, headers=headers)
+        headers = {"Content-Type": "application/json", "cache-control": "no-cache"}
+        data = json.dumps(payload).encode("utf-8") if method == "POST" else None
 
         try:
-            response = request.urlopen(api_request).read()
-        except error.HTTPError as e:
-            response = e.read()
+            response = self.__session.request(
+                method,
+                url,
+                data=data,
+                headers=headers,
+                auth=(self.user, self.password),
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            raise TestRailError("TestRail API request failed (%s)" % e)
+
+        if not response.ok:
             raise TestRailError(
-                "TestRail API returned HTTP %s (%s)" % (e.code, response)
+                "TestRail API returned HTTP %s (%s)"
+                % (response.status_code, response.content)
             )
-        else:
-            if response:
-                result = json.loads(response)
-            else:
-                result = {}
+        if response.content:
+            return response.json()
+        return {}
+
 
-        return result
+def _get_retry():
+    # POST requests add results and plans, retrying one the server already handled would report them twice.
+    retry_methods = frozenset(["GET"])
+    options = {
+        "total": RETRY_TOTAL,
+        "backoff_factor": RETRY_BACKOFF_FACTOR,
+        "status_forcelist": RETRY_STATUSES,
+        "raise_on_status": False,
+    }
+    try:
+        return Retry(allowed_methods=retry_methods, **options)
+    except TypeError:
+        # urllib3 before 1.26.
+        return Retry(method_whitelist=retry_methods, **options)
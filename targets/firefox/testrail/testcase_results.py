@@ -4,10 +4,23 @@
 
 
 import ast
+from functools import lru_cache
 
 from moziris.configuration.config_parser import get_config_property
 
 
+@lru_cache()
+def get_suite_dictionary():
+    """Returns the suite name to suite id mapping of config.ini, parsed once."""
+    return ast.literal_eval(get_config_property("Test_rail", "suite_dictionary"))
+
+
+@lru_cache()
+def get_suite_names():
+    """Returns the suite id to suite name mapping of config.ini."""
+    return {suite_id: name for name, suite_id in get_suite_dictionary().items()}
+
+
 class TestRailTests:
     def __init__(
         self,
@@ -60,9 +73,7 @@ class TestRailTests:
 
 
 class TestSuiteMap:
-    suite_dictionary = ast.literal_eval(
-        get_config_property("Test_rail", "suite_dictionary")
-    )
+    suite_dictionary = get_suite_dictionary()
 
     suite_name = ""
 
@@ -84,6 +95,4 @@ class TestSuiteMap:
         suite_dictionary
 
         """
-        for key in self.suite_dictionary:
-            if self.suite_id == self.suite_dictionary.get(key):
-                self.suite_name = key
+        self.suite_name = get_suite_names().get(self.suite_id, self.suite_name)
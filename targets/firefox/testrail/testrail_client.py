@@ -3,36 +3,43 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-import ast
 from datetime import date
 
 from moziris.configuration.config_parser import get_config_property, logger
 from moziris.util.test_assert import TestResult
 from targets.firefox.errors import TestRailError
 from moziris.api.os_helpers import OSHelper
-from moziris.util.report_utils import Color
 from targets.firefox.testrail import api_client
-from targets.firefox.testrail.testcase_results import TestSuiteMap, TestRailTests
+from targets.firefox.testrail.testcase_results import (
+    TestSuiteMap,
+    TestRailTests,
+    get_suite_dictionary,
+)
 
 
 class TestRail:
     project_name = "Firefox Desktop"
     run_name = ""
 
-    def __init__(self):
+    def __init__(self, test_rail_url: str = None):
         logger.info("Starting TestRail reporting.")
-        self.test_rail_url = get_config_property("Test_rail", "test_rail_url")
+        self.test_rail_url = test_rail_url or get_config_property(
+            "Test_rail", "test_rail_url"
+        )
         self.client = api_client.APIClient(self.test_rail_url)
         self.client.user = get_config_property("Test_rail", "username")
         self.client.password = get_config_property("Test_rail", "password")
+        self._projects = None
+        self._runs = {}
 
     def get_all_projects(self):
-        """Retrieve all projects from Test_Rail."""
-        try:
-            projects = self.client.send_get("get_projects")
-        except Exception:
-            raise TestRailError("No projects found")
-        return projects
+        """Retrieve all projects from Test_Rail, once per TestRail instance."""
+        if self._projects is None:
+            try:
+                self._projects = self.client.send_get("get_projects")
+            except Exception:
+                raise TestRailError("No projects found")
+        return self._projects
 
     def get_project_id(self, project_name: str):
         """Retrieve project from Test_Rail based on project name.
@@ -57,6 +64,8 @@ class TestRail:
         :return: a list of test runs from a project
         """
         project_id = self.get_project_id(project_name)
+        if project_id in self._runs:
+            return self._runs[project_id]
         try:
             test_runs = self.client.send_get("get_runs/%s" % project_id)
         except Exception:
@@ -64,6 +73,7 @@ class TestRail:
                 "Error: no runs found in this specific project %s" % project_name
             )
         else:
+            self._runs[project_id] = test_runs
             return test_runs
 
     def get_specific_run_id(self, project_name, test_run_name):
@@ -105,6 +115,21 @@ class TestRail:
         :param test_case_object_list: a list of TestRailTests objects
         :return: None
         """
+        test_run_list, suite_runs = self.add_test_plan(
+            build_id, firefox_version, test_case_object_list
+        )
+        self.add_test_results(test_run_list, suite_runs)
+
+    def add_test_plan(
+        self, build_id: str, firefox_version: str, test_case_object_list: list
+    ):
+        """Creates a Test Plan with one Test Run per suite of the test cases, without results.
+
+        :param build_id:  firefox_build (Ex 20180704003137)
+        :param firefox_version: actual version of Firefox (Ex 61.03)
+        :param test_case_object_list: a list of TestRailTests objects
+        :return: a tuple of the created runs and the list of suite objects
+        """
         self.run_name = self.generate_test_plan_name(firefox_version)
         data_array = []
         payload = {}
@@ -158,7 +183,7 @@ class TestRail:
             else:
                 raise TestRailError("Invalid API Response format")
 
-            self.add_test_results(test_run_list, suite_runs)
+            return test_run_list, suite_runs
 
     def add_test_results(self, test_run_list: list, suite_runs: list):
         """
@@ -183,21 +208,7 @@ class TestRail:
                     if suite.suite_name in run.get("name"):
                         suite_id_tests = suite.test_results_list
                         for test in suite_id_tests:
-                            payload = {}
-                            test_results = test.get_test_status()
-
-                            if (test.blocked_by) is not None:
-                                payload["status_id"] = 2
-                                payload["defects"] = str(test.blocked_by)
-                            elif test_results.__contains__(
-                                "FAILED"
-                            ) or test_results.__contains__("ERROR"):
-                                payload["status_id"] = 5
-                            else:
-                                payload["status_id"] = 1
-                            # payload['comment'] = complete_test_assert
-                            payload["case_id"] = test.test_case_id
-                            object_list.append(payload)
+                            object_list.append(self.get_result_payload(test))
                             results["results"] = object_list
 
                         if run_id is not None:
@@ -222,6 +233,26 @@ class TestRail:
                 else:
                     raise TestRailError("Invalid API Response")
 
+    @staticmethod
+    def get_result_payload(test: TestRailTests):
+        """
+        :param test: a TestRailTests object
+        :return: the TestRail result of the test case
+        """
+        payload = {}
+        test_results = test.get_test_status()
+
+        if (test.blocked_by) is not None:
+            payload["status_id"] = 2
+            payload["defects"] = str(test.blocked_by)
+        elif test_results.__contains__("FAILED") or test_results.__contains__("ERROR"):
+            payload["status_id"] = 5
+        else:
+            payload["status_id"] = 1
+        # payload['comment'] = complete_test_assert
+        payload["case_id"] = test.test_case_id
+        return payload
+
     @staticmethod
     def generate_test_plan_name(firefox_version: str):
         """
@@ -260,18 +291,15 @@ class TestRail:
         :return: a list of TestSuiteMap
         """
         test_suite_array = []
-        suite_dictionary = ast.literal_eval(
-            get_config_property("Test_rail", "suite_dictionary")
-        )
-        suite_ids = []
-        for suite in suite_dictionary:
-            suite_ids.append(suite_dictionary.get(suite))
-        for suite_id in suite_ids:
-            test_case_ids = []
-            for test_result in test_rail_tests:
-                if isinstance(test_result, TestRailTests):
-                    if suite_id == test_result.section_id:
-                        test_case_ids.append(test_result)
+        suite_dictionary = get_suite_dictionary()
+        tests_by_suite = {}
+        for test_result in test_rail_tests:
+            if isinstance(test_result, TestRailTests):
+                tests_by_suite.setdefault(test_result.section_id, []).append(
+                    test_result
+                )
+        for suite_id in suite_dictionary.values():
+            test_case_ids = tests_by_suite.get(suite_id)
             if not test_case_ids:
                 continue
             else:
@@ -301,24 +329,3 @@ def create_testrail_test_map(collected_tests):
         test_object_list.append(test_object)
 
     return test_object_list
-
-
-def report_test_results(app_test):
-    """
-           :param app_test: Target object that contains test runned
-           :return: none
-
-    """
-
-    logger.info(
-        " --------------------------------------------------------- "
-        + Color.BLUE
-        + "Starting Test Rail report:"
-        + Color.END
-        + " ----------------------------------------------------------\n"
-    )
-    test_rail_tests = create_testrail_test_map(app_test.completed_tests)
-    test_rail_report = TestRail()
-    test_rail_report.create_test_plan(
-        app_test.values["fx_build_id"], app_test.values["fx_version"], test_rail_tests
-    )
@@ -0,0 +1,175 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import queue
+import threading
+import time
+
+from moziris.util.report_utils import Color
+from targets.firefox.errors import TestRailError
+from targets.firefox.testrail.testcase_results import TestRailTests
+from targets.firefox.testrail.testrail_client import TestRail, create_testrail_test_map
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 30
+FINISH_TIMEOUT = 300
+
+
+class TestRailReporter:
+    """Reports test results to TestRail while the session runs.
+
+    The test plan is created from the collected items when the session starts. Results are queued as tests complete
+    and uploaded by a background thread, in batches of up to BATCH_SIZE results per run or every FLUSH_INTERVAL
+    seconds, over the keep-alive connection of one TestRail client. At the end of the session every final result that
+    was not uploaded yet, such as the results of parallel workers or of a resumed run, is sent as well.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.test_rail_url = None
+        self.uploaded = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._run_ids = {}
+        self._statuses = {}
+
+    def start(self, build_id: str, firefox_version: str, items: list):
+        """Creates the test plan in the background and starts accepting results.
+
+        :param build_id: Firefox build id (Ex 20180704003137).
+        :param firefox_version: Firefox version (Ex 61.03).
+        :param items: The collected test items, every one of them gets a test case in the plan.
+        :return: None.
+        """
+        tests = []
+        for item in items:
+            values = item.own_markers[0].kwargs if item.own_markers else {}
+            if values.get("test_case_id") is None:
+                continue
+            tests.append(
+                TestRailTests(
+                    values.get("description"),
+                    values.get("test_suite_id"),
+                    values.get("blocked_by"),
+                    values.get("test_case_id"),
+                    None,
+                )
+            )
+
+        self.enabled = True
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(build_id, firefox_version, tests),
+            name="TestRailReporter",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def add_result(self, test_result):
+        """Queues the result of a test attempt for upload."""
+        if self.enabled:
+            self._queue.put(test_result)
+
+    def finish(self, completed_tests: list, timeout: float = FINISH_TIMEOUT):
+        """Uploads the final results that are still missing and waits for the uploads to end.
+
+        :param completed_tests: The final results of the session.
+        :param timeout: Maximum seconds to wait for the uploads.
+        :return: None.
+        """
+        if not self.enabled:
+            return
+        logger.info(
+            " --------------------------------------------------------- "
+            + Color.BLUE
+            + "Finishing Test Rail report:"
+            + Color.END
+            + " ----------------------------------------------------------\n"
+        )
+        for test_result in completed_tests:
+            self._queue.put(test_result)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("TestRail upload did not finish in %s seconds." % timeout)
+        self.enabled = False
+        logger.info(
+            "TestRail report: %s result(s) uploaded, %s failed."
+            % (self.uploaded, self.failed)
+        )
+
+    def _run(self, build_id, firefox_version, tests):
+        test_rail = TestRail(self.test_rail_url)
+        try:
+            test_run_list, suite_runs = test_rail.add_test_plan(
+                build_id, firefox_version, tests
+            )
+        except Exception as e:
+            logger.error("Unable to create TestRail test plan: %s" % e)
+            self.enabled = False
+            test_rail.client.close()
+            return
+
+        for run in test_run_list:
+            for suite in suite_runs:
+                if suite.suite_name and suite.suite_name in run.get("name", ""):
+                    self._run_ids[suite.suite_id] = run.get("id")
+
+        batch = []
+        last_flush = time.time()
+        done = False
+        while not done:
+            try:
+                test_result = self._queue.get(timeout=FLUSH_INTERVAL)
+                if test_result is None:
+                    done = True
+                else:
+                    batch.append(test_result)
+            except queue.Empty:
+                pass
+            if (
+                done
+                or len(batch) >= BATCH_SIZE
+                or time.time() - last_flush >= FLUSH_INTERVAL
+            ):
+                self._upload(test_rail, batch)
+                batch = []
+                last_flush = time.time()
+        test_rail.client.close()
+
+    def _upload(self, test_rail, batch):
+        results = {}
+        for test in create_testrail_test_map(batch):
+            run_id = self._run_ids.get(test.section_id)
+            if run_id is None or test.test_case_id is None:
+                continue
+            payload = test_rail.get_result_payload(test)
+            if self._statuses.get(test.test_case_id) == payload["status_id"]:
+                continue
+            # A later attempt of the same test in the batch replaces the earlier one.
+            results.setdefault(run_id, {})[test.test_case_id] = payload
+
+        for run_id, payloads in results.items():
+            try:
+                test_rail.client.send_post(
+                    "add_results_for_cases/%s" % run_id,
+                    {"results": list(payloads.values())},
+                )
+            except TestRailError as e:
+                logger.error("Failed to update TestRail run %s: %s" % (run_id, e))
+                self.failed += len(payloads)
+                continue
+            for case_id, payload in payloads.items():
+                self._statuses[case_id] = payload["status_id"]
+            self.uploaded += len(payloads)
+            logger.debug(
+                "Uploaded %s result(s) to TestRail run %s" % (len(payloads), run_id)
+            )
+
+
+testrail_reporter = TestRailReporter()
@@ -0,0 +1,304 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib import import_module
+
+from moziris.util.path_manager import PathManager
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = "trace.json"
+SUMMARY_SIZE = 10
+
+# Primitives wrapped by the tracer: category, defining module and function names.
+TRACED_FUNCTIONS = [
+    (
+        "finder",
+        "moziris.api.finder.finder",
+        ["find", "find_all", "wait", "exists", "wait_vanish"],
+    ),
+    ("keyboard", "moziris.api.keyboard.keyboard", ["type", "key_down", "key_up"]),
+    ("keyboard", "moziris.api.keyboard.keyboard_api", ["paste"]),
+    (
+        "mouse",
+        "moziris.api.mouse.mouse",
+        [
+            "move",
+            "hover",
+            "press",
+            "release",
+            "click",
+            "right_click",
+            "double_click",
+            "middle_click",
+            "drag_drop",
+            "scroll_down",
+            "scroll_up",
+            "scroll_left",
+            "scroll_right",
+        ],
+    ),
+    ("sleep", "time", ["sleep"]),
+]
+
+# Modules whose references to the primitives are replaced, which covers the names re-exported through
+# targets.firefox.test_dependencies and imported by the tests.
+PATCHED_MODULE_PREFIXES = ("moziris.", "targets.", "tests.")
+
+
+class Tracer:
+    """Records a timeline of the UI primitives called by each test, in the Chrome trace event format.
+
+    Once installed, the finder, keyboard, mouse and sleep functions are replaced by wrappers, in their own modules and
+    in every Iris module or test that imported them. Only calls made by the test thread while a test runs are
+    recorded, and only the outermost call: a wait() made by exists() is part of the exists() event. The Firefox launch
+    and teardown are recorded as spans by the target.
+
+    Each test attempt writes a trace.json next to its debug images, which can be opened in chrome://tracing or
+    https://ui.perfetto.dev.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self._originals = {}
+        self._events = None
+        self._start_time = None
+        self._thread = None
+        self._depth = 0
+
+    def install(self):
+        """Wraps the traced primitives, then replaces the references to them in all loaded Iris modules and tests.
+
+        Calling it again only replaces the references found in modules loaded since the previous call.
+        """
+        if not self.installed:
+            for category, module_name, names in TRACED_FUNCTIONS:
+                module = import_module(module_name)
+                for name in names:
+                    original = getattr(module, name, None)
+                    if original is None:
+                        continue
+                    wrapper = self._wrap(category, name, original)
+                    self._originals[original] = wrapper
+                    setattr(module, name, wrapper)
+            self.installed = True
+
+        for module_name, module in list(sys.modules.items()):
+            if module is None or not module_name.startswith(PATCHED_MODULE_PREFIXES):
+                continue
+            for name, value in list(vars(module).items()):
+                try:
+                    wrapper = self._originals.get(value)
+                except TypeError:
+                    continue
+                if wrapper is not None:
+                    setattr(module, name, wrapper)
+
+    def start(self):
+        """Starts recording the primitives called by the current thread."""
+        if not self.installed:
+            return
+        self._events = []
+        self._start_time = time.perf_counter()
+        self._thread = threading.current_thread()
+        self._depth = 0
+
+    def stop(self):
+        """Stops recording and writes the trace of the test attempt.
+
+        :return: Path to the trace file, or None if nothing was recorded.
+        """
+        if self._events is None:
+            return None
+        events, self._events = self._events, None
+        events.insert(
+            0,
+            self._get_event(
+                "test",
+                "test",
+                self._start_time,
+                time.perf_counter(),
+                {"test": os.environ.get("CURRENT_TEST")},
+            ),
+        )
+
+        return write_attempt_file(
+            TRACE_FILE, {"traceEvents": events, "displayTimeUnit": "ms"}
+        )
+
+    @contextmanager
+    def span(self, name: str, category: str = "firefox"):
+        """Records the enclosed block as one event of the current test, including the primitives it calls."""
+        if not self._is_recording():
+            yield
+            return
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._events is not None:
+                self._events.append(
+                    self._get_event(name, category, start, time.perf_counter())
+                )
+
+    def _is_recording(self):
+        return (
+            self._events is not None
+            and self._depth == 0
+            and threading.current_thread() is self._thread
+        )
+
+    def _wrap(self, category, name, function):
+        def traced(*args, **kwargs):
+            if not self._is_recording():
+                return function(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                self._depth -= 1
+                if self._events is not None:
+                    self._events.append(
+                        self._get_event(
+                            name,
+                            category,
+                            start,
+                            time.perf_counter(),
+                            _describe_call(category, args, kwargs, result),
+                        )
+                    )
+
+        traced.__name__ = getattr(function, "__name__", name)
+        traced.__doc__ = getattr(function, "__doc__", None)
+        traced.__wrapped__ = function
+        return traced
+
+    def _get_event(self, name, category, start, end, args=None):
+        return {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int((start - self._start_time) * 1000000),
+            "dur": int((end - start) * 1000000),
+            "pid": os.getpid(),
+            "tid": 1,
+            "args": args or {},
+        }
+
+
+def _describe_call(category, args, kwargs, result):
+    if category == "sleep":
+        return {"seconds": args[0] if args else None}
+
+    target = args[0] if args else kwargs.get("ps", kwargs.get("text"))
+    if hasattr(target, "get_filename"):
+        target = target.get_filename()
+    description = {"target": str(target)[:80] if target is not None else None}
+    if category == "finder":
+        description["found"] = result is not None and result is not False
+    return description
+
+
+def write_attempt_file(file_name: str, data: dict):
+    """Writes a JSON file of the current test attempt to the test's directory in the run directory.
+
+    Files of later attempts of the same test get the attempt number as a suffix (Ex trace_2.json).
+
+    :param file_name: Name of the file for the first attempt.
+    :param data: Content of the file.
+    :return: Path to the file, or None if it could not be written.
+    """
+    test_dir = os.path.dirname(PathManager.get_debug_image_directory())
+    name, extension = os.path.splitext(file_name)
+    path = os.path.join(test_dir, file_name)
+    attempt = 1
+    while os.path.exists(path):
+        attempt += 1
+        path = os.path.join(test_dir, "%s_%s%s" % (name, attempt, extension))
+    try:
+        os.makedirs(test_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+    except IOError as e:
+        logger.debug("Unable to write %s: %s" % (path, e))
+        return None
+    return path
+
+
+def load_attempt_files(run_dir: str, file_name: str) -> list:
+    """Reads the JSON files written by write_attempt_file for all the tests of a run.
+
+    :param run_dir: Run directory holding the files.
+    :param file_name: Name of the file for the first attempt.
+    :return: List of the content of each file.
+    """
+    name, extension = os.path.splitext(file_name)
+    contents = []
+    for root, _, files in os.walk(run_dir):
+        for found in files:
+            if not (
+                found == file_name
+                or found.startswith(name + "_")
+                and found.endswith(extension)
+            ):
+                continue
+            try:
+                with open(os.path.join(root, found), "r") as f:
+                    contents.append(json.load(f))
+            except (IOError, ValueError):
+                continue
+    return contents
+
+
+def summarize_traces(run_dir: str, size: int = SUMMARY_SIZE) -> str:
+    """Builds a table of where the time of a run went, from the trace files of all its tests.
+
+    :param run_dir: Run directory holding the trace files.
+    :param size: Number of patterns listed.
+    :return: The table as a string, empty if no trace was found.
+    """
+    totals = {}
+    patterns = {}
+    traces = load_attempt_files(run_dir, TRACE_FILE)
+    for trace in traces:
+        for event in trace.get("traceEvents", []):
+            seconds = event.get("dur", 0) / 1000000.0
+            key = (
+                event.get("cat") if event.get("cat") != "firefox" else event.get("name")
+            )
+            totals[key] = totals.get(key, 0) + seconds
+            if event.get("cat") == "finder":
+                target = event.get("args", {}).get("target")
+                stats = patterns.setdefault(target, [0, 0, 0.0])
+                stats[0] += 1
+                stats[1] += 0 if event.get("args", {}).get("found") else 1
+                stats[2] += seconds
+    if not traces:
+        return ""
+
+    lines = ["Trace summary of %s test attempt(s):" % len(traces)]
+    for key in ("test", "launch", "teardown", "finder", "sleep", "keyboard", "mouse"):
+        if key in totals:
+            lines.append("  %-10s %10.1fs" % (key, totals[key]))
+    slowest = sorted(patterns.items(), key=lambda entry: -entry[1][2])[:size]
+    if slowest:
+        lines.append("Slowest patterns (calls, misses, total time):")
+        for target, (calls, misses, seconds) in slowest:
+            lines.append("  %6s %6s %10.1fs  %s" % (calls, misses, seconds, target))
+    return "\n".join(lines)
+
+
+tracer = Tracer()
@@ -0,0 +1,144 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import contextlib
+import functools
+import logging
+import subprocess
+import time
+from distutils.spawn import find_executable
+
+from moziris.api.enums import MatchTemplateType
+from moziris.api.os_helpers import OSHelper
+from moziris.api.rectangle import Rectangle
+from moziris.api.screen.display import DisplayCollection
+from targets.firefox.finder_hooks import wrap_match_template
+
+logger = logging.getLogger(__name__)
+
+# Seconds the rectangle of the Firefox windows is reused for before asking the X server again.
+WINDOW_VALIDITY = 0.5
+XDOTOOL_TIMEOUT = 5
+
+
+class WindowBounds:
+    """Bounds the searches without a region to the windows of the running Firefox, on Linux.
+
+    The windows are the visible top-level X11 windows of the Firefox process, found with xdotool through its PID.
+    Dialogs Firefox opens itself, such as the file picker, are windows of the same process and are included. Searches
+    capture the whole screen when Firefox has no visible window (Ex minimized), between tests, and inside
+    full_screen(), for helpers and tests that look at other applications such as the file manager. The bound is
+    opt-in, with the --window_bounds argument.
+    """
+
+    def __init__(self):
+        self.installed = False
+        self.runner = None
+        self._xdotool = None
+        self._full_screen = 0
+        self._rectangle = None
+        self._time = 0
+
+    def install(self):
+        """Routes the searches without a region of the moziris finder to the Firefox windows."""
+        if self.installed or not OSHelper.is_linux():
+            return
+        self._xdotool = find_executable("xdotool")
+        if self._xdotool is None:
+            logger.warning(
+                "xdotool not found, searches are not bounded to the Firefox window."
+            )
+            return
+
+        wrap_match_template("window_bounds", self._wrap_match_template)
+        self.installed = True
+
+    def set_runner(self, runner):
+        """Sets the Firefox whose windows bound the searches.
+
+        :param runner: FXRunner object of the running Firefox.
+        :return: None.
+        """
+        self.runner = runner
+        self._rectangle = None
+        self._time = 0
+
+    @contextlib.contextmanager
+    def full_screen(self):
+        """Searches the whole screen inside the block, for windows of other applications (Ex a file manager)."""
+        self._full_screen += 1
+        try:
+            yield
+        finally:
+            self._full_screen -= 1
+
+    def get_region(self) -> Rectangle or None:
+        """Returns the rectangle containing the visible Firefox windows, or None to search the whole screen."""
+        if not self.installed or self._full_screen > 0 or self.runner is None:
+            return None
+        if time.time() - self._time > WINDOW_VALIDITY:
+            self._rectangle = self._get_window_rectangle()
+            self._time = time.time()
+        return self._rectangle
+
+    def _get_window_rectangle(self):
+        process_handler = getattr(
+            getattr(self.runner, "runner", None), "process_handler", None
+        )
+        if process_handler is None or process_handler.pid is None:
+            return None
+        cmd = [
+            self._xdotool,
+            "search",
+            "--onlyvisible",
+            "--pid",
+            str(process_handler.pid),
+            "getwindowgeometry",
+            "--shell",
+            "%@",
+        ]
+        try:
+            output = subprocess.check_output(
+                cmd, stderr=subprocess.DEVNULL, timeout=XDOTOOL_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError):
+            # xdotool exits with an error when the process has no visible window.
+            return None
+
+        windows = []
+        geometry = {}
+        for line in output.decode("utf-8", "replace").splitlines():
+            name, _, value = line.partition("=")
+            if name in ("X", "Y", "WIDTH", "HEIGHT"):
+                geometry[name] = int(value)
+            if len(geometry) == 4:
+                windows.append(geometry)
+                geometry = {}
+        if len(windows) == 0:
+            return None
+
+        bounds = DisplayCollection[0].bounds
+        left = max(min(w["X"] for w in windows), bounds.x)
+        top = max(min(w["Y"] for w in windows), bounds.y)
+        right = min(max(w["X"] + w["WIDTH"] for w in windows), bounds.x + bounds.width)
+        bottom = min(
+            max(w["Y"] + w["HEIGHT"] for w in windows), bounds.y + bounds.height
+        )
+        if right <= left or bottom <= top:
+            return None
+        return Rectangle(left, top, right - left, bottom - top)
+
+    def _wrap_match_template(self, match_template):
+        @functools.wraps(match_template)
+        def bounded_match_template(
+            pattern, region=None, match_type=MatchTemplateType.SINGLE
+        ):
+            if region is None:
+                region = self.get_region()
+            return match_template(pattern, region, match_type)
+
+        return bounded_match_template
+
+
+window_bounds = WindowBounds()
@@ -99,8 +99,8 @@ class Test(FirefoxTest):
         paste("cnn")
 
         if OSHelper.is_windows():
-            cookies_is_not_saved = exists(prosport_cookies_pattern) or exists(
-                prosport_cookies_0_pattern
+            cookies_is_not_saved = find_any(
+                [prosport_cookies_pattern, prosport_cookies_0_pattern]
             )
         else:
             cookies_is_not_saved = exists(prosport_cookies_pattern)
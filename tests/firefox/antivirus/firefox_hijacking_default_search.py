@@ -29,8 +29,11 @@ class Test(FirefoxTest):
         assert exists(picker_pattern), "Picker displayed."
 
         click(picker_pattern)
-        assert exists(default_search_engines_list_pattern) or exists(
-            default_search_engines_list_small_pattern
+        assert find_any(
+            [
+                default_search_engines_list_pattern,
+                default_search_engines_list_small_pattern,
+            ]
         ), "The default search engine list is not changed."
 
         restore_firefox_focus()
@@ -47,8 +50,11 @@ class Test(FirefoxTest):
         time.sleep(Settings.DEFAULT_UI_DELAY)
 
         click(picker_pattern)
-        assert exists(default_search_engines_list_pattern) or exists(
-            default_search_engines_list_small_pattern
+        assert find_any(
+            [
+                default_search_engines_list_pattern,
+                default_search_engines_list_small_pattern,
+            ]
         ), "The default search engine list is not changed after antivirus was installed."
 
         restore_firefox_focus()
@@ -76,7 +76,11 @@ class Test(FirefoxTest):
 
         next_tab()
 
-        expected = exists(new_tab_twitter_search_results_pattern, 10) or exists(
-            new_tab_twitter_search_results_2_pattern, 5
+        expected = find_any(
+            [
+                new_tab_twitter_search_results_pattern,
+                new_tab_twitter_search_results_2_pattern,
+            ],
+            15,
         )
         assert expected, "A new tab with the Twitter search results is opened."
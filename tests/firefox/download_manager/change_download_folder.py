@@ -114,17 +114,19 @@ class Test(FirefoxTest):
 
         region_5_mb.click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        # Workaround to avoid 1513494 bug on Linux.
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            # Workaround to avoid 1513494 bug on Linux.
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
 
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Default Downloads folder is displayed."
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Default Downloads folder is displayed."
 
-        expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
-        assert expected is True, "Downloaded file is found."
+            expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
+            assert expected is True, "Downloaded file is found."
 
-        close_tab()
+            close_tab()
 
         # Refocus the firefox window.
         click(NavBar.HOME_BUTTON.target_offset(70, 0))
@@ -143,17 +145,19 @@ class Test(FirefoxTest):
 
         region_10_mb.click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        # Workaround to avoid 1513494 bug on Linux.
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            # Workaround to avoid 1513494 bug on Linux.
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
 
-        expected = exists(DownloadManager.NEW_DOWNLOADS_FOLDER, 10)
-        assert expected is True, "New Downloads folder is displayed."
+            expected = exists(DownloadManager.NEW_DOWNLOADS_FOLDER, 10)
+            assert expected is True, "New Downloads folder is displayed."
 
-        expected = exists(DownloadFiles.FOLDER_VIEW_10MB_HIGHLIGHTED, 10)
-        assert expected is True, "10mb file is displayed in the newly downloads folder."
+            expected = exists(DownloadFiles.FOLDER_VIEW_10MB_HIGHLIGHTED, 10)
+            assert expected is True, "10mb file is displayed in the newly downloads folder."
 
-        close_tab()
+            close_tab()
 
         # Refocus the firefox window.
         click(NavBar.HOME_BUTTON.target_offset(70, 0))
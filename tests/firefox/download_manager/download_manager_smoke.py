@@ -52,24 +52,26 @@ class Test(FirefoxTest):
         # Navigate to Downloads folder.
         click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
 
-        expected = exists(
-            DownloadManager.DOWNLOADS_FOLDER, FirefoxSettings.FIREFOX_TIMEOUT
-        )
-        assert expected is True, "Downloads folder is displayed."
+            expected = exists(
+                DownloadManager.DOWNLOADS_FOLDER, FirefoxSettings.FIREFOX_TIMEOUT
+            )
+            assert expected is True, "Downloads folder is displayed."
 
-        if OSHelper.is_mac():
-            time.sleep(FirefoxSettings.TINY_FIREFOX_TIMEOUT)
-            type("2", modifier=KeyModifier.CMD)
+            if OSHelper.is_mac():
+                time.sleep(FirefoxSettings.TINY_FIREFOX_TIMEOUT)
+                type("2", modifier=KeyModifier.CMD)
 
-        expected = exists(
-            DownloadFiles.FIREFOX_INSTALLER_HIGHLIGHTED, FirefoxSettings.FIREFOX_TIMEOUT
-        )
-        assert expected is True, "Firefox installer is displayed in downloads folder."
+            expected = exists(
+                DownloadFiles.FIREFOX_INSTALLER_HIGHLIGHTED, FirefoxSettings.FIREFOX_TIMEOUT
+            )
+            assert expected is True, "Firefox installer is displayed in downloads folder."
 
-        click_window_control("close")
+            click_window_control("close")
 
         expected = exists(NavBar.DOWNLOADS_BUTTON, FirefoxSettings.FIREFOX_TIMEOUT)
         assert expected is True, "Download button found in the page."
@@ -42,28 +42,30 @@ class Test(FirefoxTest):
         # Navigate to Downloads folder.
         click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Downloads folder is displayed."
-
-        expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
-        assert expected is True, "Downloaded file is found."
-
-        delete_selected_file()
-
-        try:
-            expected = wait_vanish(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
-            assert expected is True, "The file was successfully deleted."
-        except FindError:
-            raise FindError("The file was not deleted.")
-
-        # Close download folder window.
-        click_window_control("close")
-
-        try:
-            expected = wait_vanish(DownloadManager.DOWNLOADS_FOLDER, 10)
-            assert expected is True, "The downloads folder was closed."
-        except FindError:
-            raise FindError("The downloads folder was not closed.")
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Downloads folder is displayed."
+
+            expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
+            assert expected is True, "Downloaded file is found."
+
+            delete_selected_file()
+
+            try:
+                expected = wait_vanish(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
+                assert expected is True, "The file was successfully deleted."
+            except FindError:
+                raise FindError("The file was not deleted.")
+
+            # Close download folder window.
+            click_window_control("close")
+
+            try:
+                expected = wait_vanish(DownloadManager.DOWNLOADS_FOLDER, 10)
+                assert expected is True, "The downloads folder was closed."
+            except FindError:
+                raise FindError("The downloads folder was not closed.")
 
         # Switch the focus on firefox browser.
         expected = exists(NavBar.DOWNLOADS_BUTTON, 10)
@@ -36,18 +36,20 @@ class Test(FirefoxTest):
         # Navigate to Downloads folder.
         click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        # Workaround to avoid 1513494 bug on Linux.
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            # Workaround to avoid 1513494 bug on Linux.
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
 
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Downloads folder is displayed."
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Downloads folder is displayed."
 
-        expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
-        assert expected is True, "Downloaded file is found."
+            expected = exists(DownloadFiles.FOLDER_VIEW_5MB_HIGHLIGHTED, 10)
+            assert expected is True, "Downloaded file is found."
 
-        # Close download folder window.
-        close_tab()
+            # Close download folder window.
+            close_tab()
 
         # Switch the focus on firefox browser.
         click(NavBar.FORWARD_BUTTON.target_offset(-50, 0))
@@ -50,15 +50,17 @@ class Test(FirefoxTest):
 
         click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
 
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
 
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Downloads folder is displayed."
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Downloads folder is displayed."
 
-        # Delete the downloads folder
-        force_delete_folder(PathManager.get_downloads_dir())
-        click_window_control("close")
+            # Delete the downloads folder
+            force_delete_folder(PathManager.get_downloads_dir())
+            click_window_control("close")
 
         expected = exists(NavBar.DOWNLOADS_BUTTON, 10)
         assert expected is True, "Download button found in the page."
@@ -112,16 +114,18 @@ class Test(FirefoxTest):
         assert expected is True, "Missing 5 MB file is displayed."
 
         click(DownloadManager.DownloadsPanel.OPEN_CONTAINING_FOLDER)
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Downloads folder was recreated."
-
-        if OSHelper.is_linux():
-            click(Pattern("linux_folder_icon.png"))
-
-        # Assert the newly created downloads folder
-        expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
-        assert expected is True, "Downloads folder was recreated."
-        click_window_control("close")
+        # The folder opens in the file manager, outside of the Firefox window.
+        with window_bounds.full_screen():
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Downloads folder was recreated."
+
+            if OSHelper.is_linux():
+                click(Pattern("linux_folder_icon.png"))
+
+            # Assert the newly created downloads folder
+            expected = exists(DownloadManager.DOWNLOADS_FOLDER, 10)
+            assert expected is True, "Downloads folder was recreated."
+            click_window_control("close")
 
         click(DownloadManager.DownloadsPanel.DOWNLOADS_BUTTON.target_offset(-50, 0))
 
@@ -112,11 +112,15 @@ class Test(FirefoxTest):
             assert expected is True, "Library window is displayed."
             assert expected is True, (step.resolution, step.message)
 
-        expected = exists(DownloadFiles.DOWNLOAD_TYPE_ICON.similar(0.95), 5) or exists(
-            DownloadFiles.DOWNLOAD_TYPE_ICON_ZIP.similar(0.95), 5
+        expected = find_any(
+            [
+                DownloadFiles.DOWNLOAD_TYPE_ICON.similar(0.95),
+                DownloadFiles.DOWNLOAD_TYPE_ICON_ZIP.similar(0.95),
+            ],
+            5,
         )
         assert (
-            expected is False
+            not expected
         ), "There are no downloads displayed in Library, Downloads section."
 
         click_window_control("close")
@@ -0,0 +1,106 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import re
+import tempfile
+from urllib.parse import urlparse
+
+from targets.firefox.bug_manager import BlockerCache
+from targets.firefox.fx_testcase import *
+from tests.firefox.unit_tests.stand_in_server import StandInServer
+
+BUGS = {
+    "1001": {"id": 1001, "status": "RESOLVED", "op_sys": "All", "platform": "All"},
+    "1002": {"id": 1002, "status": "NEW", "op_sys": "Linux", "platform": "x86_64"},
+}
+ISSUES = {7: {"state": "OPEN", "title": "Broken on linux"}}
+
+
+def get_bugs(request):
+    ids = request.query.get("id", [""])[0].split(",")
+    return 200, {"bugs": [BUGS[bug_id] for bug_id in ids if bug_id in BUGS]}
+
+
+def get_issues(request):
+    numbers = [int(n) for n in re.findall(r"i(\d+): issue", request.body["query"])]
+    repository = {"i%s" % number: ISSUES.get(number) for number in numbers}
+    return 200, {"data": {"viewer": {"repository": repository}}}
+
+
+# The Bugzilla REST and GitHub GraphQL queries made by the blocker cache.
+ROUTES = [
+    ("GET", r"^/broken/", lambda request: (503, {"error": "Unavailable"})),
+    ("GET", r"^/rest/bug\?", get_bugs),
+    ("POST", r"^/graphql$", get_issues),
+]
+
+
+def get_requests(server):
+    return [urlparse(path).path for path in server.get_paths()]
+
+
+class Test(FirefoxTest):
+    @pytest.mark.details(description="Unit tests for the blocking issue cache.")
+    def run(self):
+        cache_file = tempfile.mktemp(suffix=".json")
+
+        try:
+            with StandInServer(ROUTES) as server:
+                base_url = server.url
+                cache = BlockerCache()
+                cache.cache_file = cache_file
+                cache.bugzilla_url = base_url + "/rest/"
+                cache.github_url = base_url
+                cache.resolve(["1001", "1002", "1003", "issue_7"])
+
+                assert sorted(get_requests(server)) == [
+                    "/graphql",
+                    "/rest/bug",
+                ], "Each tracker is queried once for all ids."
+                assert cache.get("1001")["status"] == "RESOLVED", "Bug state is cached."
+                assert cache.get("issue_7")["state"] == "open", "Issue state is cached."
+                assert len(server.requests) == 2, "Cached ids are not fetched again."
+                assert (
+                    cache.get("1003") is None
+                ), "Ids the tracker doesn't know stay unknown."
+                assert (
+                    len(server.requests) == 2
+                ), "Unknown ids are cached and not fetched again."
+                cache.missing_ttl = -1
+                cache.get("1003")
+                assert (
+                    len(server.requests) == 3
+                ), "Unknown ids are fetched again once their entry expired."
+
+                broken_cache = BlockerCache()
+                broken_cache.cache_file = cache_file
+                broken_cache.bugzilla_url = base_url + "/broken/rest/"
+                broken_cache.resolve(["2001", "2002"])
+                assert (
+                    len(server.requests) == 4
+                ), "Failed ids are queried once, in a single batch."
+                assert broken_cache.get("2001") is None, "Failed ids are unresolved."
+                broken_cache.resolve(["2002"])
+                assert (
+                    len(server.requests) == 4
+                ), "Ids of a failed query are not queried again in the same session."
+                assert (
+                    broken_cache.get("1001")["status"] == "RESOLVED"
+                ), "Entries cached before the failure are still used."
+
+                offline_cache = BlockerCache()
+                offline_cache.cache_file = cache_file
+                offline_cache.offline = True
+                offline_cache.ttl = 0
+                assert (
+                    offline_cache.get("1002")["op_sys"] == "Linux"
+                ), "Offline mode reads the cache from disk, whatever its age."
+                assert (
+                    offline_cache.get("1003") is None
+                ), "Unknown ids stay unresolved offline."
+                assert len(server.requests) == 4, "Offline mode makes no request."
+        finally:
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
@@ -0,0 +1,148 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import io
+import json
+import pathlib
+import shutil
+import tarfile
+import tempfile
+
+from targets.firefox.errors import BuildStoreError
+from targets.firefox.firefox_app.build_store import BuildStore, build_store
+from targets.firefox.firefox_app.fx_collection import FirefoxCollection
+from targets.firefox.fx_testcase import *
+
+VERSION = "68.0"
+LOCALE = "en-US"
+PLATFORM = "linux64"
+# Folder of the linux64 builds in the Firefox archive, see mozdownload.
+PLATFORM_FOLDER = "linux-x86_64"
+
+APPLICATION_INI = """[App]
+Vendor=Mozilla
+Name=Firefox
+Version=%(version)s
+BuildID=%(build_id)s
+SourceRepository=https://hg.mozilla.org/releases/mozilla-release
+"""
+
+PLATFORM_INI = """[Build]
+BuildID=%(build_id)s
+Milestone=%(version)s
+SourceRepository=https://hg.mozilla.org/releases/mozilla-release
+"""
+
+
+def add_build(mirror_dir, build_number, binary_content=None):
+    """Adds a Firefox candidate build to a local archive mirror, as a tarball holding a stand-in binary."""
+    values = {"version": VERSION, "build_id": "2019010100000%s" % build_number}
+    files = {
+        "firefox/firefox": binary_content or "build%s" % build_number,
+        "firefox/application.ini": APPLICATION_INI % values,
+        "firefox/platform.ini": PLATFORM_INI % values,
+    }
+    build_dir = os.path.join(
+        mirror_dir,
+        "firefox",
+        "candidates",
+        "%s-candidates" % VERSION,
+        "build%s" % build_number,
+        PLATFORM_FOLDER,
+        LOCALE,
+    )
+    os.makedirs(build_dir, exist_ok=True)
+    with tarfile.open(
+        os.path.join(build_dir, "firefox-%s.tar.bz2" % VERSION), "w:bz2"
+    ) as archive:
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            archive.addfile(info, io.BytesIO(data))
+
+
+def get_details():
+    return {"version": VERSION, "locale": LOCALE, "platform": PLATFORM}
+
+
+def read(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+class Test(FirefoxTest):
+    @pytest.mark.details(
+        description="Unit tests for the Firefox build store.",
+        exclude=[OSPlatform.MAC, OSPlatform.WINDOWS],
+    )
+    def run(self):
+        temp_dir = tempfile.mkdtemp()
+        mirror_dir = os.path.join(temp_dir, "mirror")
+        try:
+            store = BuildStore()
+            store.root = os.path.join(temp_dir, "store")
+            store.archive_url = pathlib.Path(mirror_dir).as_uri()
+            add_build(mirror_dir, 1)
+
+            binary = store.get_build(VERSION, LOCALE, "candidate", get_details())
+            assert read(binary) == "build1", "A build is installed from a local mirror."
+
+            # A new download of the same build URL would store a second installer.
+            add_build(mirror_dir, 1, "rebuilt")
+            assert (
+                store.get_build(VERSION, LOCALE, "candidate", get_details()) == binary
+            ), "A stored build is looked up by its build URL."
+            assert read(binary) == "build1" and (
+                len(os.listdir(os.path.join(store.root, "installers"))) == 1
+            ), "A stored build is not downloaded again."
+
+            add_build(mirror_dir, 2)
+            latest_binary = store.get_build(VERSION, LOCALE, "candidate", get_details())
+            assert (
+                read(latest_binary) == "build2" and latest_binary != binary
+            ), "A new build of the same version is stored under its own key."
+            with open(os.path.join(store.root, "index.json"), "r") as f:
+                index = json.load(f)
+            assert len(index["builds"]) == 2, "Both builds are in the index."
+            alias_key = "%s|%s|%s" % (VERSION, LOCALE, PLATFORM)
+            assert (
+                "/build2/" in index["aliases"][alias_key]
+            ), "The requested version points to the build it last resolved to."
+
+            offline_store = BuildStore()
+            offline_store.root = store.root
+            offline_store.offline = True
+            assert (
+                offline_store.get_build(VERSION, LOCALE, "candidate", get_details())
+                == latest_binary
+            ), "Offline lookups return the build the version last resolved to."
+            try:
+                offline_store.get_build(VERSION, "de", "candidate", get_details())
+                raise AssertionError("Offline lookups of unknown builds fail.")
+            except BuildStoreError as e:
+                assert "prefetch_builds" in str(
+                    e
+                ), "The error tells how to make the build available."
+
+            saved = build_store.root, build_store.offline, build_store.archive_url
+            build_store.root = os.path.join(temp_dir, "prefetched")
+            build_store.offline = False
+            build_store.archive_url = mirror_dir
+            try:
+                collection = FirefoxCollection()
+                failed = collection.prefetch([VERSION], [LOCALE, "de"], jobs=2)
+            finally:
+                build_store.root, build_store.offline, build_store.archive_url = saved
+            assert failed == [
+                (VERSION, "de")
+            ], "Builds missing from the archive are reported."
+            app = collection.get(VERSION, LOCALE)
+            assert (
+                app is not None and read(app.path) == "build2"
+            ), "Prefetched builds are installed from the latest candidate."
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
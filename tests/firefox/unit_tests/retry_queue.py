@@ -0,0 +1,111 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+from types import SimpleNamespace
+
+from targets.firefox.retry_queue import RetryQueue
+from targets.firefox.fx_testcase import *
+
+
+class SessionStandIn:
+    """Runs the items of a session through a retry queue, failing each test as many times as planned."""
+
+    def __init__(self, queue, failures):
+        self.queue = queue
+        self.failures = dict(failures)
+        self.runs = []
+        self.target = SimpleNamespace(
+            completed_tests=[], rerun_tests={}, flaky_tests=[]
+        )
+        self.session = SimpleNamespace(
+            testsfailed=0,
+            shouldfail=False,
+            shouldstop=False,
+            config=SimpleNamespace(
+                option=SimpleNamespace(
+                    continue_on_collection_errors=False, collectonly=False
+                )
+            ),
+            items=[self.make_item(name) for name in sorted(failures)],
+        )
+
+    def make_item(self, name):
+        hook = SimpleNamespace(pytest_runtest_protocol=self.run_item)
+        return SimpleNamespace(nodeid=name, config=SimpleNamespace(hook=hook))
+
+    def run_item(self, item, nextitem):
+        self.runs.append(item.nodeid)
+        outcome = "PASSED"
+        if self.failures[item.nodeid] > 0:
+            self.failures[item.nodeid] -= 1
+            outcome = "FAILED"
+        result = SimpleNamespace(item=item, outcome=outcome, file_name=item.nodeid)
+        if not self.queue.add_result(self.target, result):
+            self.target.completed_tests.append(result)
+
+
+class Test(FirefoxTest):
+    @pytest.mark.details(description="Unit tests for the deferred retry queue.")
+    def run(self):
+        queue = RetryQueue()
+        queue.enabled = True
+        queue.max_runs = 3
+        stand_in = SessionStandIn(queue, {"a": 1, "b": 0, "c": 5})
+        assert queue.run_session(stand_in.session, {}), "The session has been run."
+        assert stand_in.runs == [
+            "a",
+            "b",
+            "c",
+            "a",
+            "c",
+            "c",
+        ], "Failed tests are retried after the rest of the session, up to max_runs."
+        assert [
+            (result.item.nodeid, result.outcome)
+            for result in stand_in.target.completed_tests
+        ] == [
+            ("b", "PASSED"),
+            ("a", "PASSED"),
+            ("c", "FAILED"),
+        ], "A retry result replaces the result of the previous attempt."
+        assert queue.outcomes["a"] == {
+            "first_outcome": "FAILED",
+            "final_outcome": "PASSED",
+            "attempts": 2,
+        }, "First and final outcomes are tracked."
+        assert stand_in.target.flaky_tests == [("a", 1)], "Recovered tests are flaky."
+        assert stand_in.target.rerun_tests == {"a": 1, "c": 2}, "Reruns are counted."
+
+        queue = RetryQueue()
+        queue.enabled = True
+        queue.max_runs = 2
+        queue.budget = 60
+        stand_in = SessionStandIn(queue, {"a": 1, "b": 1, "c": 1})
+        queue.run_session(stand_in.session, {"a": 10, "b": 100, "c": 10})
+        assert stand_in.runs == [
+            "a",
+            "b",
+            "c",
+            "a",
+        ], "No retry starts when the test is expected to outlast the budget."
+        assert queue.outcomes["b"].get("retry_skipped") and queue.outcomes["c"].get(
+            "retry_skipped"
+        ), "Tests left out of the budget are marked."
+
+        queue = RetryQueue()
+        queue.enabled = True
+        queue.max_runs = 2
+        queue.budget = 0
+        stand_in = SessionStandIn(queue, {"a": 1})
+        queue.run_session(stand_in.session, {})
+        assert stand_in.runs == ["a"], "No retry starts once the budget is spent."
+
+        queue = RetryQueue()
+        queue.max_runs = 3
+        stand_in = SessionStandIn(queue, {"a": 1})
+        queue.run_session(stand_in.session, {})
+        assert stand_in.runs == [
+            "a"
+        ], "Nothing is queued when deferred retries are off."
@@ -0,0 +1,92 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+from types import SimpleNamespace
+
+from targets.firefox.scheduler import (
+    STATIC_BASE_DURATION,
+    RunProgress,
+    balance_items,
+    order_longest_first,
+    select_shard,
+)
+from targets.firefox.fx_testcase import *
+
+
+def make_item(name, reuse=False):
+    values = {"description": name}
+    if reuse:
+        values["reuse_browser"] = True
+    return SimpleNamespace(
+        nodeid="tests/%s.py::Test::run" % name,
+        fspath="tests/%s.py" % name,
+        own_markers=[SimpleNamespace(kwargs=values)],
+    )
+
+
+class Test(FirefoxTest):
+    @pytest.mark.details(description="Unit tests for the test scheduler.")
+    def run(self):
+        durations = {"a": 10, "b": 9, "c": 8, "d": 7, "e": 6, "f": 5, "g": 4}
+        items = [make_item(name) for name in sorted(durations)]
+        estimates = {item.nodeid: durations[item.nodeid[6]] for item in items}
+
+        ordered = list(items)
+        order_longest_first(ordered, estimates)
+        assert [item.nodeid[6] for item in ordered] == list(
+            "abcdefg"
+        ), "Longest tests run first."
+
+        partitions = balance_items(items, 3, estimates)
+        assert [load for load, _ in partitions] == [
+            19,
+            15,
+            15,
+        ], "Each test goes to the lightest partition, longest first."
+        assert sorted(
+            item.nodeid for _, partition in partitions for item in partition
+        ) == sorted(item.nodeid for item in items), "Every test is in one partition."
+        assert (
+            len(balance_items(items[:2], 4, estimates)) == 4
+        ), "Empty partitions are returned too."
+
+        group = [make_item("h1", True), make_item("h2", True)]
+        partitions = balance_items(items + group, 8, estimates)
+        assert any(
+            partition == group for _, partition in partitions
+        ), "Tests sharing a browser stay together, in order."
+
+        unknown = make_item("unknown")
+        load, partition = balance_items([unknown], 1, {})[0]
+        assert load == STATIC_BASE_DURATION, "Tests without history get a static cost."
+
+        progress = RunProgress()
+        progress.start(items[:3], estimates)
+        assert progress.get_eta() == (27, 3), "The ETA starts at the expected total."
+        progress.finish(items[0].nodeid, 20)
+        assert progress.get_eta() == (
+            34,
+            2,
+        ), "The ETA is scaled by how slow the finished tests were."
+        progress.finish(items[0].nodeid, 10)
+        assert progress.get_eta() == (
+            51,
+            2,
+        ), "Retries add to the time of their test."
+        progress.finish("tests/other.py::Test::run", 100)
+        assert progress.get_eta() == (51, 2), "Tests of other runs are ignored."
+
+        suite = items + group + [unknown]
+        for count in (1, 3, 5):
+            shards = [
+                select_shard(suite, (index, count), {}) for index in range(1, count + 1)
+            ]
+            node_ids = [item.nodeid for _, selected, _ in shards for item in selected]
+            assert sorted(node_ids) == sorted(item.nodeid for item in suite), (
+                "Shards 1 to %s together run every test exactly once." % count
+            )
+            assert shards == [
+                select_shard(suite, (index, count), {}) for index in range(1, count + 1)
+            ], "Shards computed from static costs are the same every time."
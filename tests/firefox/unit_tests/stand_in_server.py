@@ -0,0 +1,99 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+import json
+import re
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# A request received by the stand-in server. The attempt is the number of requests made so far with the same method
+# and path, this one included.
+Request = namedtuple(
+    "Request", ["method", "path", "query", "body", "client_port", "attempt"]
+)
+
+
+class StandInServer:
+    """Local HTTP server answering JSON requests from a list of routes, for the unit tests of web API clients.
+
+    A route is a (method, pattern, handler) tuple: the first route whose method matches and whose pattern is found in
+    the request path, query string included, answers the request. The handler takes the Request and returns the status
+    and the JSON data of the response. The server records every request and keeps its connections alive.
+
+    :param routes: List of (method, pattern, handler) tuples.
+    """
+
+    def __init__(self, routes: list):
+        self.routes = routes
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        # Connections the clients keep alive must not hold the shutdown.
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%s" % self._server.server_address[1]
+
+    def get_paths(self) -> list:
+        return [request.path for request in self.requests]
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, method: str, path: str, body, client_port: int):
+        with self._lock:
+            attempt = 1 + len(
+                [r for r in self.requests if r.method == method and r.path == path]
+            )
+            request = Request(
+                method,
+                path,
+                parse_qs(urlparse(path).query),
+                body,
+                client_port,
+                attempt,
+            )
+            self.requests.append(request)
+
+        for route_method, pattern, handler in self.routes:
+            if route_method == method and re.search(pattern, path):
+                return handler(request)
+        return 404, {"error": "No route for %s %s" % (method, path)}
+
+
+def _make_handler(stand_in: StandInServer):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self._send(*stand_in.answer("GET", self.path, None, self.client_address[1]))
+
+        def do_POST(self):
+            data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.loads(data.decode("utf-8")) if data else None
+            self._send(
+                *stand_in.answer("POST", self.path, body, self.client_address[1])
+            )
+
+        def _send(self, status, data):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format_arg, *args):
+            pass
+
+    return StandInHandler
@@ -0,0 +1,105 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+from types import SimpleNamespace
+
+from moziris.util.test_assert import TestResult
+from targets.firefox.errors import TestRailError
+from targets.firefox.testrail.api_client import APIClient
+from targets.firefox.testrail.testrail_reporter import TestRailReporter
+from targets.firefox.fx_testcase import *
+from tests.firefox.unit_tests.stand_in_server import StandInServer
+
+SUITE_ID = "2525"
+RUN_ID = 11
+
+
+def get_projects(request):
+    if request.attempt == 1:
+        return 503, {"error": "Try again"}
+    return 200, [{"id": 1, "name": "Firefox Desktop"}]
+
+
+def add_plan(request):
+    runs = [{"id": RUN_ID, "name": entry["name"]} for entry in request.body["entries"]]
+    return 200, {"id": 1, "entries": [{"runs": runs}]}
+
+
+# The TestRail API calls made by the reporter, failing the first project query and every plan closing.
+ROUTES = [
+    ("GET", r"/api/v2/get_projects$", get_projects),
+    ("POST", r"/api/v2/add_plan/1$", add_plan),
+    ("POST", r"/api/v2/add_results_for_cases/%s$" % RUN_ID, lambda request: (200, [])),
+    ("POST", r"/api/v2/close_plan/1$", lambda request: (503, {"error": "Try again"})),
+]
+
+
+def get_methods(server):
+    return [path.split("/api/v2/")[1] for path in server.get_paths()]
+
+
+def make_result(case_id, outcome):
+    values = {
+        "description": "Test case %s" % case_id,
+        "test_suite_id": SUITE_ID,
+        "test_case_id": case_id,
+    }
+    item = SimpleNamespace(
+        nodeid="tests/%s.py::Test::run" % case_id,
+        own_markers=[SimpleNamespace(kwargs=values)],
+    )
+    return item, TestResult(
+        item, None, outcome, None, None, None, None, None, None, None, 1
+    )
+
+
+class Test(FirefoxTest):
+    @pytest.mark.details(description="Unit tests for the streaming TestRail reporter.")
+    def run(self):
+        with StandInServer(ROUTES) as server:
+            first_item, first_result = make_result("101", "FAILED")
+            second_item, second_result = make_result("102", "PASSED")
+            _, retried_result = make_result("101", "PASSED")
+            retried_result.item = first_item
+
+            reporter = TestRailReporter()
+            reporter.test_rail_url = server.url + "/index.php?/api/v2/"
+            reporter.start("20190101000000", "68.0", [first_item, second_item])
+            reporter.add_result(first_result)
+            reporter.add_result(second_result)
+            reporter.add_result(retried_result)
+            reporter.finish([retried_result, second_result])
+
+            assert get_methods(server)[:3] == [
+                "get_projects",
+                "get_projects",
+                "add_plan/1",
+            ], "A failed query is retried and the test plan is created once, before any result is uploaded."
+            uploads = [
+                request.body["results"]
+                for request in server.requests
+                if "add_results_for_cases" in request.path
+            ]
+            assert len(uploads) == 1, "Results are uploaded in one batch."
+            statuses = {result["case_id"]: result["status_id"] for result in uploads[0]}
+            assert statuses == {
+                "101": 1,
+                "102": 1,
+            }, "The last attempt of a test is reported, once."
+            assert (
+                len({request.client_port for request in server.requests}) == 1
+            ), "All requests share one keep-alive connection."
+            assert reporter.uploaded == 2 and reporter.failed == 0
+
+            client = APIClient(reporter.test_rail_url)
+            try:
+                client.send_post("close_plan/1", {})
+                raise AssertionError("A failed upload raises TestRailError.")
+            except TestRailError:
+                pass
+            assert (
+                get_methods(server).count("close_plan/1") == 1
+            ), "A failed upload is not sent again, the server may have applied it."
+            client.close()
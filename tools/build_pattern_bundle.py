@@ -0,0 +1,63 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Packs the pattern images of a platform into a memory-mapped bundle.
+
+Usage:
+    python tools/build_pattern_bundle.py --platform linux
+
+Runs of the same checkout in the same working directory use the bundle automatically, see
+targets/firefox/pattern_bundle.py. Images changed after the bundle was built are read from disk, so rebuilding is
+only needed to get the speed back, or after moving the checkout.
+Iris core arguments such as -w (working directory) are honored.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from moziris.api.os_helpers import OSHelper  # noqa: E402
+from targets.firefox.pattern_bundle import build_bundle, pattern_bundle  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Build the pattern image bundle of a platform",
+        prog="build_pattern_bundle",
+    )
+    parser.add_argument(
+        "--platform",
+        help="Platform whose images are packed, defaults to the current one",
+        action="store",
+        choices=["linux", "osx", "win"],
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Path of the bundle files, without extension",
+        action="store",
+        default=None,
+    )
+    return parser.parse_known_args()[0]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = get_args()
+    platform = args.platform or OSHelper.get_os().value
+    path = args.output or pattern_bundle.get_path(platform)
+
+    count = build_bundle(platform, path)
+    logger.info("Packed %s %s image(s) into %s" % (count, platform, path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Exports the expected duration of each test from the duration store to a JSON file.
+
+Usage:
+    python tools/export_durations.py -o durations.json
+
+CI machines given the same file with --shard_durations compute the same shards, whatever their local history.
+Iris core arguments such as -w (working directory) are honored, so the store of that working directory is read.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from targets.firefox.duration_store import duration_store  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Export test durations for sharding", prog="export_durations"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Path of the JSON file to write",
+        action="store",
+        default="durations.json",
+    )
+    parser.add_argument(
+        "--durations",
+        help="Path to the test duration database",
+        action="store",
+        default=None,
+    )
+    return parser.parse_known_args()[0]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = get_args()
+    if args.durations:
+        duration_store.path = args.durations
+
+    estimates = duration_store.get_estimates()
+    duration_store.close()
+    with open(args.output, "w") as f:
+        json.dump(
+            {node_id: round(seconds, 1) for node_id, seconds in estimates.items()},
+            f,
+            sort_keys=True,
+            indent=True,
+        )
+    logger.info("Exported %s test duration(s) to %s" % (len(estimates), args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
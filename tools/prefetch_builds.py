@@ -0,0 +1,87 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Downloads and installs a matrix of Firefox builds into the build store before a run.
+
+Usage:
+    python tools/prefetch_builds.py -f 68.0,latest-beta,nightly -l en-US,de -j 4
+
+Iris core arguments such as -w (working directory) are honored, so the builds land in the same store as the run.
+The builds can be fetched from a local copy of the Firefox archive with --archive_url /path/to/mirror.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from targets.firefox.firefox_app.build_store import build_store  # noqa: E402
+from targets.firefox.firefox_app.fx_collection import FX_Collection  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Prefetch Firefox builds into the build store",
+        prog="prefetch_builds",
+    )
+    parser.add_argument(
+        "-f",
+        "--firefox",
+        help="Comma separated list of Firefox versions",
+        action="store",
+        default="latest-beta",
+    )
+    parser.add_argument(
+        "-l",
+        "--locale",
+        help="Comma separated list of locales",
+        action="store",
+        default="en-US",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of builds fetched in parallel",
+        type=int,
+        action="store",
+        default=4,
+    )
+    parser.add_argument(
+        "--archive_url",
+        help="Base URL, file:// URL or local directory of a Firefox archive mirror",
+        action="store",
+        default=None,
+    )
+    parser.add_argument(
+        "--offline",
+        help="Only check which builds are available in the build store",
+        action="store_true",
+    )
+    return parser.parse_known_args()[0]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = get_args()
+    build_store.offline = args.offline
+    build_store.archive_url = args.archive_url
+
+    versions = [version.strip() for version in args.firefox.split(",") if version]
+    locales = [locale.strip() for locale in args.locale.split(",") if locale]
+    failed = FX_Collection.prefetch(versions, locales, jobs=args.jobs)
+    if failed:
+        logger.error(
+            "Failed builds: %s"
+            % ", ".join("%s %s" % (version, locale) for version, locale in failed)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())